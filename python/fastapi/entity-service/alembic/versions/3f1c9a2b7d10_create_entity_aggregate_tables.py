@@ -0,0 +1,79 @@
+"""create entity aggregate tables
+
+Revision ID: 3f1c9a2b7d10
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a2b7d10"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "entity",
+        sa.Column("entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("bar_value_object_attribute_0", sa.TEXT(), nullable=False),
+        sa.Column("bar_value_object_attribute_1", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("entity_id"),
+    )
+    op.create_table(
+        "child_entity",
+        sa.Column("child_entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("attribute_a", sa.TEXT(), nullable=False),
+        sa.Column("attribute_b", sa.Integer(), nullable=False),
+        sa.Column("attribute_c", sa.Numeric(), nullable=False),
+        sa.PrimaryKeyConstraint("child_entity_id"),
+    )
+    op.create_table(
+        "entity_child_entity",
+        sa.Column("entity_child_entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("child_entity_id", postgresql.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["child_entity_id"],
+            ["child_entity.child_entity_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["entity_id"],
+            ["entity.entity_id"],
+        ),
+        sa.PrimaryKeyConstraint("entity_child_entity_id"),
+        sa.UniqueConstraint("entity_id", "child_entity_id"),
+    )
+    op.create_index(
+        op.f("ix_entity_child_entity_child_entity_id"),
+        "entity_child_entity",
+        ["child_entity_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_entity_child_entity_entity_id"),
+        "entity_child_entity",
+        ["entity_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_entity_child_entity_entity_id"), table_name="entity_child_entity"
+    )
+    op.drop_index(
+        op.f("ix_entity_child_entity_child_entity_id"),
+        table_name="entity_child_entity",
+    )
+    op.drop_table("entity_child_entity")
+    op.drop_table("child_entity")
+    op.drop_table("entity")
@@ -0,0 +1,79 @@
+"""create entity document table
+
+Revision ID: 5b2e8f4a7c61
+Revises: c7d35e91f0a4
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5b2e8f4a7c61"
+down_revision = "c7d35e91f0a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "entity_document",
+        sa.Column("entity_id", postgresql.UUID(), nullable=False),
+        sa.Column("bar_value_object_attribute_0", sa.TEXT(), nullable=False),
+        sa.Column("bar_value_object_attribute_1", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("child_entities", postgresql.JSONB(), nullable=False),
+        sa.PrimaryKeyConstraint("entity_id"),
+    )
+    op.create_index(
+        "ix_entity_document_created_at_entity_id",
+        "entity_document",
+        ["created_at", "entity_id"],
+        unique=False,
+    )
+    # copy the aggregates stored in the normalized tables, for the document layout
+    # to start from; the two layouts are not kept in sync afterwards. The normalized
+    # tables record no order of child entities, so each array is ordered by where
+    # its links were written, the order they were created in, as the normalized
+    # layout reads them back
+    op.execute("""
+        INSERT INTO entity_document
+        SELECT
+            entity.entity_id,
+            entity.bar_value_object_attribute_0,
+            entity.bar_value_object_attribute_1,
+            entity.is_active,
+            entity.created_at,
+            entity.updated_at,
+            coalesce(
+                (
+                    SELECT jsonb_agg(
+                        jsonb_build_object(
+                            'child_entity_id', child_entity.child_entity_id,
+                            'attribute_a', child_entity.attribute_a,
+                            'attribute_b', child_entity.attribute_b,
+                            'attribute_c', child_entity.attribute_c
+                        )
+                        ORDER BY entity_child_entity.ctid
+                    )
+                    FROM entity_child_entity
+                    JOIN child_entity
+                        ON child_entity.child_entity_id
+                        = entity_child_entity.child_entity_id
+                    WHERE entity_child_entity.entity_id = entity.entity_id
+                ),
+                '[]'::jsonb
+            )
+        FROM entity
+        """)
+
+
+def downgrade():
+    op.drop_index(
+        "ix_entity_document_created_at_entity_id", table_name="entity_document"
+    )
+    op.drop_table("entity_document")
@@ -0,0 +1,29 @@
+"""add entity keyset pagination index
+
+Revision ID: 8a4e6d2c1b93
+Revises: 3f1c9a2b7d10
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8a4e6d2c1b93"
+down_revision = "3f1c9a2b7d10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_entity_created_at_entity_id",
+        "entity",
+        ["created_at", "entity_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_entity_created_at_entity_id", table_name="entity")
@@ -0,0 +1,34 @@
+"""create outbox event table
+
+Revision ID: c7d35e91f0a4
+Revises: 8a4e6d2c1b93
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "c7d35e91f0a4"
+down_revision = "8a4e6d2c1b93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox_event",
+        sa.Column("outbox_event_id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("event_id", postgresql.UUID(), nullable=False),
+        sa.Column("event_type", sa.TEXT(), nullable=False),
+        sa.Column("aggregate_id", postgresql.UUID(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("outbox_event_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("outbox_event")
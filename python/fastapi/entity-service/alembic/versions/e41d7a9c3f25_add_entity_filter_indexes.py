@@ -0,0 +1,62 @@
+"""add entity filter indexes
+
+Revision ID: e41d7a9c3f25
+Revises: 5b2e8f4a7c61
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e41d7a9c3f25"
+down_revision = "5b2e8f4a7c61"
+branch_labels = None
+depends_on = None
+
+# (index name suffix, columns, partial index predicate),
+# created on both storage layouts of the aggregates
+INDEXES = (
+    ("active_created_at_entity_id", ["created_at", "entity_id"], "is_active"),
+    ("inactive_created_at_entity_id", ["created_at", "entity_id"], "NOT is_active"),
+    (
+        "bar_value_0_created_at_entity_id",
+        ["bar_value_object_attribute_0", "created_at", "entity_id"],
+        None,
+    ),
+    (
+        "bar_value_1_created_at_entity_id",
+        ["bar_value_object_attribute_1", "created_at", "entity_id"],
+        None,
+    ),
+    ("updated_at_entity_id", ["updated_at", "entity_id"], None),
+)
+TABLES = ("entity", "entity_document")
+
+
+def upgrade():
+    # built concurrently, so that writes to a populated table are not blocked meanwhile,
+    # which cannot be done within a transaction
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            for suffix, columns, where in INDEXES:
+                op.create_index(
+                    f"ix_{table}_{suffix}",
+                    table,
+                    columns,
+                    unique=False,
+                    postgresql_where=None if where is None else sa.text(where),
+                    postgresql_concurrently=True,
+                )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            for suffix, _, _ in INDEXES:
+                op.drop_index(
+                    f"ix_{table}_{suffix}",
+                    table_name=table,
+                    postgresql_concurrently=True,
+                )
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import deque
+from typing import Collection, Deque, Dict, Optional
+
+import pydantic
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class AdmissionLimit(pydantic.BaseModel):
+    class Config:
+        allow_mutation = False
+
+    # requests handled at once
+    max_concurrency: int
+    # requests waiting for one of those to finish, beyond which requests are rejected
+    max_queue: int
+    # seconds a request may wait in the queue before it is rejected
+    max_wait: float
+
+
+class _Admission:
+    """_Admission admits up to `limit.max_concurrency` requests at once,
+    queueing up to `limit.max_queue` more in arrival order for up to `limit.max_wait`
+    """
+
+    def __init__(self, limit: AdmissionLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def acquire(self) -> Optional[str]:
+        """acquire waits for a slot, returning why the request was rejected if it was not
+        admitted, or None once it was
+        """
+        if self.in_flight < self.limit.max_concurrency and not self.waiters:
+            self.in_flight += 1
+            return None
+        if len(self.waiters) >= self.limit.max_queue:
+            return "queue_full"
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.limit.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # the slot was handed over just as the wait ended; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return "timeout"
+        return None
+
+    def release(self) -> None:
+        # hand the slot straight to the longest waiting request, if any
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionMiddleware:
+    """AdmissionMiddleware sheds load before requests pile up waiting for a database
+    connection, so that the requests it admits keep their usual latency
+
+    Reads and writes are limited separately, each to a number of requests in flight
+    sized after the connection pools serving them. Requests over the limit wait in
+    a bounded queue, in arrival order, for up to `max_wait` seconds; when the queue is
+    full or the wait runs out, they are answered at once with 503 and a Retry-After
+    header, rather than failing slowly with everyone else. Requests to `exempt_paths`,
+    such as health checks, are never limited.
+
+    Like MetricsMiddleware, written as plain ASGI middleware.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        read_limit: AdmissionLimit,
+        write_limit: AdmissionLimit,
+        retry_after: int = 1,
+        exempt_paths: Collection[str] = ("/health", "/metrics"),
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self._app = app
+        self._admissions: Dict[str, _Admission] = {
+            "read": _Admission(read_limit),
+            "write": _Admission(write_limit),
+        }
+        self._retry_after = retry_after
+        self._exempt_paths = frozenset(exempt_paths)
+        metrics = metrics or MetricsRegistry()
+        queue_depth = metrics.gauge(
+            "http_admission_queue_depth",
+            "Requests waiting to be admitted",
+            ["route_class"],
+        )
+        in_flight = metrics.gauge(
+            "http_admission_in_flight",
+            "Requests admitted and in flight",
+            ["route_class"],
+        )
+        for route_class, admission in self._admissions.items():
+            queue_depth.labels(route_class).set_function(
+                lambda admission=admission: len(admission.waiters)
+            )
+            in_flight.labels(route_class).set_function(
+                lambda admission=admission: admission.in_flight
+            )
+        self._rejected = metrics.counter(
+            "http_admission_rejected_total",
+            "Requests rejected with 503 for being over capacity",
+            ["route_class", "reason"],
+        )
+        self._wait_duration = metrics.histogram(
+            "http_admission_wait_seconds",
+            "Time requests waited to be admitted or rejected",
+            ["route_class"],
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._exempt_paths:
+            await self._app(scope, receive, send)
+            return
+
+        route_class = "read" if scope["method"] in READ_METHODS else "write"
+        admission = self._admissions[route_class]
+        start = time.perf_counter()
+        rejection = await admission.acquire()
+        self._wait_duration.labels(route_class).observe(time.perf_counter() - start)
+        if rejection is not None:
+            self._rejected.labels(route_class, rejection).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service over capacity, retry later"},
+                headers={"Retry-After": str(self._retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            admission.release()
@@ -1,23 +1,207 @@
+import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
 import pydantic
-from fastapi import HTTPException
+from fastapi import Body, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 
-from api.domain.entity_aggregate.entity import Entity, EntityList
-from api.domain.entity_aggregate.entity_errors import EntityNotFoundError
+from api.application.entity_aggregate.entity_validator import EntityValidator
+from api.application.utils.etags import etag_matches, version_etag
+from api.application.utils.responses import ModelJSONResponse, render_json
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityBatchCreateResult,
+    EntityBatchError,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+    InvalidCursorError,
+    InvalidPageError,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
 from api.domain.entity_aggregate.entity_service import EntityService
 
 
+def entity_filter(
+    is_active: Optional[bool] = None,
+    bar_value_attribute_0: Optional[str] = None,
+    bar_value_attribute_1: Optional[int] = None,
+    created_since: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+    updated_since: Optional[datetime.datetime] = None,
+    updated_before: Optional[datetime.datetime] = None,
+) -> EntityFilter:
+    """entity_filter reads the EntityFilter conditions of a listing from its query"""
+    return EntityFilter(
+        is_active=is_active,
+        bar_value_attribute_0=bar_value_attribute_0,
+        bar_value_attribute_1=bar_value_attribute_1,
+        created_since=created_since,
+        created_before=created_before,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+
 class EntityHandler:
-    def __init__(self, service: EntityService):
+    MAX_GET_MANY_SIZE = 100
+    MAX_CREATE_MANY_SIZE = 10000
+    MAX_PAGE_SIZE = IEntityRepo.MAX_PAGE_SIZE
+
+    def __init__(
+        self, service: EntityService, validator: Optional[EntityValidator] = None
+    ):
         self._service = service
+        self._validator = validator or EntityValidator()
 
-    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+    async def get(
+        self,
+        entity_id: pydantic.UUID4,
+        if_none_match: Optional[str] = Header(None),
+    ) -> Response:
+        """get answers a conditional request for an unchanged Entity with 304 Not Modified,
+        deciding so from its updated_at alone, without loading the aggregate
+        """
         try:
-            return await self._service.get(entity_id)
+            if if_none_match is not None:
+                etag = version_etag(
+                    [(entity_id, await self._service.get_updated_at(entity_id))]
+                )
+                if etag_matches(if_none_match, etag):
+                    return Response(status_code=304, headers={"ETag": etag})
+            entity = await self._service.get(entity_id)
         except EntityNotFoundError as e:
             raise HTTPException(status_code=404, detail=str(e)) from e
+        return ModelJSONResponse(
+            entity,
+            headers={"ETag": version_etag([(entity.entity_id, entity.updated_at)])},
+        )
+
+    async def get_many(
+        self, entity_ids: List[pydantic.UUID4] = Query(..., alias="entity_id")
+    ) -> ModelJSONResponse:
+        if len(entity_ids) > self.MAX_GET_MANY_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot get more than {self.MAX_GET_MANY_SIZE} entities at once",
+            )
+        return ModelJSONResponse(await self._service.get_many(entity_ids))
+
+    async def list(
+        self,
+        page: int = Query(0, ge=0),
+        size: int = Query(IEntityRepo.DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
+        spec: EntityFilter = Depends(entity_filter),
+        if_none_match: Optional[str] = Header(None),
+    ) -> Response:
+        """list gives the `total` number of Entities alongside the page
+        only when asked for, by naming a `count` strategy
+
+        The Entities listed are narrowed by any of the EntityFilter conditions given,
+        and ordered by `sort`; a cursor only continues the listing it was given for.
+        """
+        try:
+            entity_list = await self._service.where(
+                page=page, size=size, cursor=cursor, count=count, spec=spec, sort=sort
+            )
+        except (InvalidCursorError, InvalidPageError) as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        # a page's content is decided by the query, so a page must be loaded to tag it;
+        # a match still saves rendering and sending it
+        etag = self._entity_list_etag(entity_list)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return ModelJSONResponse(entity_list, headers={"ETag": etag})
+
+    @staticmethod
+    def _entity_list_etag(entity_list: EntityList) -> str:
+        return version_etag(
+            [(entity.entity_id, entity.updated_at) for entity in entity_list.entities],
+            context=(
+                f"{entity_list.page}:{entity_list.size}:{entity_list.next_cursor}"
+                f":{entity_list.total}"
+            ),
+        )
+
+    async def stream(
+        self,
+        size: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
+        spec: EntityFilter = Depends(entity_filter),
+    ) -> StreamingResponse:
+        """stream lists Entities as list does, from `cursor` to the end of the listing,
+        sent as newline-delimited JSON as they are read from the repo, so that neither
+        the full result set nor the full response body is held in memory
+
+        Entities are read `size` at a time, a page after another, and each is encoded
+        as list encodes it. The first page is read before responding, so that invalid
+        parameters are still answered with an error status.
+        """
+        try:
+            entity_list = await self._service.where(
+                size=size, cursor=cursor, spec=spec, sort=sort
+            )
+        except (InvalidCursorError, InvalidPageError) as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        return StreamingResponse(
+            self._stream_ndjson(entity_list, spec, sort),
+            media_type="application/x-ndjson",
+        )
+
+    async def _stream_ndjson(
+        self, entity_list: EntityList, spec: EntityFilter, sort: EntitySort
+    ) -> AsyncIterator[bytes]:
+        while True:
+            for entity in entity_list.entities:
+                yield render_json(entity) + b"\n"
+            if entity_list.next_cursor is None:
+                return
+            entity_list = await self._service.where(
+                size=entity_list.size,
+                cursor=entity_list.next_cursor,
+                spec=spec,
+                sort=sort,
+            )
+
+    async def create(self, entity: Entity) -> ModelJSONResponse:
+        try:
+            return ModelJSONResponse(await self._service.create(entity))
+        except EntityAlreadyExistsError as e:
+            raise HTTPException(status_code=409, detail=str(e)) from e
+
+    async def create_many(
+        self, entities_data: List[Dict[str, Any]] = Body(...)
+    ) -> ModelJSONResponse:
+        """create_many validates each submitted entity on its own,
+        so that invalid items are reported back without failing the rest of the batch;
+        see EntityValidator
+        """
+        if len(entities_data) > self.MAX_CREATE_MANY_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot create more than {self.MAX_CREATE_MANY_SIZE} entities at once",
+            )
+        validation = await self._validator.validate(entities_data)
+        errors = list(validation.errors)
 
-    async def list(self, page: int = 0, size: int = 20) -> EntityList:
-        return await self._service.where(page=page, size=size)
+        created_entities = await self._service.create_many(validation.entities)
 
-    async def create(self, entity: Entity) -> Entity:
-        return await self._service.create(entity)
+        created_entity_ids = {entity.entity_id for entity in created_entities}
+        for index, entity in zip(validation.indexes, validation.entities):
+            if entity.entity_id not in created_entity_ids:
+                error = EntityAlreadyExistsError(
+                    field="entity_id", value=str(entity.entity_id)
+                )
+                errors.append(EntityBatchError(index=index, detail=str(error)))
+        errors.sort(key=lambda error: error.index)
+        return ModelJSONResponse(
+            EntityBatchCreateResult(created=created_entities, errors=errors)
+        )
@@ -1,11 +1,24 @@
+from typing import List
+
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute, APIRouter
 
 from api.application.entity_aggregate.entity_handler import EntityHandler
-from api.domain.entity_aggregate.entity import Entity, EntityList
+from api.application.utils.responses import ModelJSONResponse
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityBatchCreateResult,
+    EntityList,
+)
 
 API_PREFIX_V0 = "/api/v0"
 API_V0_ENTITIES_PATH = API_PREFIX_V0 + "/entities"
 API_V0_ENTITIES_ID_PATH = API_PREFIX_V0 + "/entities/{entity_id}"
+API_V0_ENTITIES_BATCH_PATH = API_PREFIX_V0 + "/entities/batch"
+API_V0_ENTITIES_STREAM_PATH = API_PREFIX_V0 + "/entities/stream"
+
+# routes answering If-None-Match with 304 when the client's copy, tagged by ETag, is current
+NOT_MODIFIED_RESPONSES = {304: {"description": "Not Modified"}}
 
 
 def entity_router(handler: EntityHandler) -> APIRouter:
@@ -14,11 +27,21 @@ def entity_router(handler: EntityHandler) -> APIRouter:
     # members of a class, which allows us to inject the Service as a dependency.
     # The cost is some extra boilerplate config like declaring the response model,
     # instead of the magic/introspection provided by the decorators.
+    get_entities_route = APIRoute(
+        path=API_V0_ENTITIES_BATCH_PATH,
+        endpoint=handler.get_many,
+        methods=["GET"],
+        response_model=List[Entity],
+        response_class=ModelJSONResponse,
+        name="Get Entities",
+    )
     get_entity_route = APIRoute(
         path=API_V0_ENTITIES_ID_PATH,
         endpoint=handler.get,
         methods=["GET"],
         response_model=Entity,
+        response_class=ModelJSONResponse,
+        responses=NOT_MODIFIED_RESPONSES,
         name="Get Entity",
     )
     list_entities_route = APIRoute(
@@ -26,15 +49,41 @@ def entity_router(handler: EntityHandler) -> APIRouter:
         endpoint=handler.list,
         methods=["GET"],
         response_model=EntityList,
+        response_class=ModelJSONResponse,
+        responses=NOT_MODIFIED_RESPONSES,
         name="List Entities",
     )
+    stream_entities_route = APIRoute(
+        path=API_V0_ENTITIES_STREAM_PATH,
+        endpoint=handler.stream,
+        methods=["GET"],
+        response_class=StreamingResponse,
+        name="Stream Entities",
+    )
     create_entity_route = APIRoute(
         path=API_V0_ENTITIES_PATH,
         endpoint=handler.create,
         methods=["PUT"],
         response_model=Entity,
+        response_class=ModelJSONResponse,
         name="Create Entity",
     )
+    create_entities_route = APIRoute(
+        path=API_V0_ENTITIES_BATCH_PATH,
+        endpoint=handler.create_many,
+        methods=["PUT"],
+        response_model=EntityBatchCreateResult,
+        response_class=ModelJSONResponse,
+        name="Create Entities",
+    )
     return APIRouter(
-        routes=[get_entity_route, list_entities_route, create_entity_route]
+        # static paths must be matched before the `{entity_id}` path parameter
+        routes=[
+            get_entities_route,
+            stream_entities_route,
+            get_entity_route,
+            list_entities_route,
+            create_entity_route,
+            create_entities_route,
+        ]
     )
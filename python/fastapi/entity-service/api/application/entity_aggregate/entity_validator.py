@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import uuid
+from concurrent.futures import Executor
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pydantic
+
+from api.domain.entity_aggregate.entity import (
+    BarValueObject,
+    ChildEntity,
+    Entity,
+    EntityBatchError,
+)
+
+# (child_entity_id as int, attribute_a, attribute_b, attribute_c)
+_PackedChildEntity = Tuple[int, str, int, Decimal]
+# (entity_id as int, bar_value attribute_0, bar_value attribute_1, is_active,
+# created_at, updated_at, child entities)
+_PackedEntity = Tuple[
+    int,
+    str,
+    int,
+    bool,
+    datetime.datetime,
+    datetime.datetime,
+    Tuple[_PackedChildEntity, ...],
+]
+
+
+class EntityValidation(NamedTuple):
+    """EntityValidation holds the Entities validated from the items of a payload,
+    along with the index of the item each was validated from, and why the other
+    items were invalid
+    """
+
+    entities: List[Entity]
+    indexes: List[int]
+    errors: List[EntityBatchError]
+
+
+class EntityValidator:
+    """EntityValidator validates the items of bulk payloads as Entities one by one,
+    so that invalid items are reported back rather than failing the whole payload
+
+    Items are either mappings, as decoded from a JSON request body, or JSON strings.
+
+    Validating thousands of Entities is CPU bound, and would hold up every other request
+    on the event loop until done. Payloads of `inline_threshold` items or more are
+    split into chunks of `chunk_size`, validated in `executor`, a process pool, while
+    the event loop carries on serving. Validated Entities are sent back as plain tuples
+    and rebuilt with `construct`, as unpickling pydantic models costs more than
+    validating them again. Each chunk is rebuilt as it arrives, holding the event loop
+    for a chunk at a time.
+
+    Smaller payloads, and all of them when no executor is given, are validated inline,
+    where sending them to another process would cost more than it saves.
+
+    Only the first item of a payload with a given entity_id is kept; later ones
+    are reported as duplicates.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        inline_threshold: int = 1000,
+        chunk_size: int = 250,
+    ):
+        self._executor = executor
+        self._inline_threshold = inline_threshold
+        self._chunk_size = chunk_size
+
+    async def validate(self, items: Sequence[Any]) -> EntityValidation:
+        if self._executor is None or len(items) < self._inline_threshold:
+            return _drop_duplicates(_validate(items, 0))
+        loop = asyncio.get_running_loop()
+        chunks = [
+            loop.run_in_executor(
+                self._executor,
+                _validate_packed,
+                items[start : start + self._chunk_size],
+                start,
+            )
+            for start in range(0, len(items), self._chunk_size)
+        ]
+        validation = EntityValidation(entities=[], indexes=[], errors=[])
+        try:
+            for chunk in chunks:
+                packed_entities, indexes, errors = await chunk
+                validation.entities.extend(
+                    _unpack(packed_entity) for packed_entity in packed_entities
+                )
+                validation.indexes.extend(indexes)
+                validation.errors.extend(errors)
+        except BaseException:
+            for chunk in chunks:
+                chunk.cancel()
+            raise
+        return _drop_duplicates(validation)
+
+
+def _validate(items: Sequence[Any], start: int) -> EntityValidation:
+    """_validate validates `items`, numbering them from `start`"""
+    validation = EntityValidation(entities=[], indexes=[], errors=[])
+    for index, item in enumerate(items, start=start):
+        try:
+            validation.entities.append(
+                Entity.parse_raw(item)
+                if isinstance(item, (str, bytes))
+                else Entity.parse_obj(item)
+            )
+            validation.indexes.append(index)
+        except pydantic.ValidationError as e:
+            validation.errors.append(EntityBatchError(index=index, detail=str(e)))
+    return validation
+
+
+def _drop_duplicates(validation: EntityValidation) -> EntityValidation:
+    """_drop_duplicates reports the Entities of `validation` whose entity_id was already
+    validated from an earlier item as errors, in place of validated Entities
+    """
+    first_indexes: Dict[uuid.UUID, int] = {}
+    unique = EntityValidation(entities=[], indexes=[], errors=list(validation.errors))
+    for index, entity in zip(validation.indexes, validation.entities):
+        first_index = first_indexes.setdefault(entity.entity_id, index)
+        if first_index == index:
+            unique.entities.append(entity)
+            unique.indexes.append(index)
+        else:
+            unique.errors.append(
+                EntityBatchError(
+                    index=index,
+                    detail=f"Duplicate of item {first_index} for: "
+                    f"entity_id={entity.entity_id}",
+                )
+            )
+    if len(unique.entities) == len(validation.entities):
+        return validation
+    unique.errors.sort(key=lambda error: error.index)
+    return unique
+
+
+def _validate_packed(
+    items: Sequence[Any], start: int
+) -> Tuple[List[_PackedEntity], List[int], List[EntityBatchError]]:
+    # runs in a worker process, so must stay a module-level function
+    validation = _validate(items, start)
+    return (
+        [_pack(entity) for entity in validation.entities],
+        validation.indexes,
+        validation.errors,
+    )
+
+
+def _pack(entity: Entity) -> _PackedEntity:
+    # UUIDs are sent as ints, which unpickle far faster
+    return (
+        entity.entity_id.int,
+        entity.bar_value.attribute_0,
+        entity.bar_value.attribute_1,
+        entity.is_active,
+        entity.created_at,
+        entity.updated_at,
+        tuple(
+            (
+                child_entity.child_entity_id.int,
+                child_entity.attribute_a,
+                child_entity.attribute_b,
+                child_entity.attribute_c,
+            )
+            for child_entity in entity.child_entities
+        ),
+    )
+
+
+def _unpack(packed_entity: _PackedEntity) -> Entity:
+    # packed Entities were validated before being packed, so validation can be skipped
+    (
+        entity_id,
+        attribute_0,
+        attribute_1,
+        is_active,
+        created_at,
+        updated_at,
+        child_entities,
+    ) = packed_entity
+    return Entity.construct(
+        entity_id=uuid.UUID(int=entity_id),
+        child_entities=tuple(
+            ChildEntity.construct(
+                child_entity_id=uuid.UUID(int=child_entity_id),
+                attribute_a=attribute_a,
+                attribute_b=attribute_b,
+                attribute_c=attribute_c,
+            )
+            for child_entity_id, attribute_a, attribute_b, attribute_c in child_entities
+        ),
+        bar_value=BarValueObject.construct(
+            attribute_0=attribute_0, attribute_1=attribute_1
+        ),
+        is_active=is_active,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
@@ -1,2 +1,21 @@
-def get_service_health():  # pylint: disable=missing-function-docstring
-    return {"status": "ok"}
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    # only the Postgres repo needs the driver loaded
+    from api.infrastructure.datastore.postgres.pg_client import PGClient
+
+
+class HealthHandler:
+    def __init__(self, pg_client: Optional["PGClient"] = None):
+        self._pg_client = pg_client
+
+    async def get_service_health(self) -> dict:
+        """get_service_health reports the service as up, along with live usage of the
+        database connection pool when one is open, so that queuing for connections shows
+        """
+        health = {"status": "ok"}
+        if self._pg_client is not None:
+            pool_stats = self._pg_client.pool_stats()
+            if pool_stats is not None:
+                health["db_pool"] = pool_stats.dict()
+        return health
@@ -0,0 +1,16 @@
+from fastapi.responses import PlainTextResponse
+
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+# starlette appends the charset parameter to text/* media types
+PROMETHEUS_TEXT_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+class MetricsHandler:
+    def __init__(self, metrics: MetricsRegistry):
+        self._metrics = metrics
+
+    async def get_metrics(self) -> PlainTextResponse:
+        return PlainTextResponse(
+            self._metrics.render(), media_type=PROMETHEUS_TEXT_MEDIA_TYPE
+        )
@@ -0,0 +1,70 @@
+import time
+from typing import Callable, Dict, Optional
+
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+UNMATCHED_ROUTE_NAME = "Unmatched"
+
+
+class MetricsMiddleware:
+    """MetricsMiddleware records the latency of every HTTP request, labeled by route name,
+    and the number of requests in flight
+
+    Requests are labeled by the `name` of the route which handled them ("Get Entity",
+    "Create Entity", ...) rather than by raw path, which would make a new label value
+    for every entity_id. Written as plain ASGI middleware rather than with
+    BaseHTTPMiddleware, which adds a task and a memory stream to every request.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: MetricsRegistry):
+        self._app = app
+        self._route_names: Optional[Dict[Callable, str]] = None
+        self._requests_in_flight = metrics.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled"
+        ).labels()
+        self._request_duration = metrics.histogram(
+            "http_request_duration_seconds",
+            "Time from receiving an HTTP request to sending its full response",
+            ["route", "method", "status"],
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self._requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self._app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            self._requests_in_flight.dec()
+            self._request_duration.labels(
+                self._route_name(scope), scope["method"], str(status)
+            ).observe(duration)
+
+    def _route_name(self, scope: Scope) -> str:
+        # the router records the matched route's endpoint in the request scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE_NAME
+        if self._route_names is None:
+            # routes are final once the app has started serving requests
+            self._route_names = {
+                route.endpoint: route.name
+                for route in scope["app"].routes
+                if isinstance(route, BaseRoute) and hasattr(route, "endpoint")
+            }
+        return self._route_names.get(endpoint, UNMATCHED_ROUTE_NAME)
@@ -0,0 +1,207 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import time
+import tracemalloc
+import uuid
+from typing import Collection, List, Optional, Union
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+# carries the token authorizing a profile of the request
+PROFILE_HEADER = b"x-profile"
+# set to "download" for the profile to be returned in place of the response
+PROFILE_OUTPUT_HEADER = b"x-profile-output"
+
+_Allocation = Union[tracemalloc.Statistic, tracemalloc.StatisticDiff]
+
+
+class ProfilingMiddleware:
+    """ProfilingMiddleware profiles single requests on demand, to find where the time
+    of a slow endpoint goes in production
+
+    A request is profiled when it carries an X-Profile header holding `token`,
+    or, at random, one in every 1 / `sample_rate`. Its handling, through the handler,
+    service, repo and adapter, runs under cProfile and, with `trace_allocations`,
+    tracemalloc. The profile is written to `output_dir` as a .prof file, for pstats or
+    snakeviz, alongside a text report of the top functions and allocating lines; its
+    name is returned in an X-Profile-Id header. Requests with an X-Profile-Output:
+    download header, or made with no `output_dir`, get the report as an attachment
+    in place of their response, whose status is returned in an X-Profiled-Status header.
+
+    One request is profiled at a time per process, and others arriving meanwhile are
+    served as usual. The profilers see the whole process, so a profile also holds
+    whatever other requests ran while it was taken.
+
+    Only added to the app when enabled, so it costs nothing otherwise.
+    Like MetricsMiddleware, written as plain ASGI middleware.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: Optional[str] = None,
+        sample_rate: float = 0,
+        output_dir: Optional[str] = None,
+        trace_allocations: bool = False,
+        top: int = 50,
+        exempt_paths: Collection[str] = ("/health", "/metrics"),
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        if sample_rate > 0 and output_dir is None:
+            raise ValueError("Sampled profiles need an output_dir to be written to")
+        self._app = app
+        self._token = token.encode() if token else None
+        self._sample_rate = sample_rate
+        self._output_dir = output_dir
+        self._trace_allocations = trace_allocations
+        self._top = top
+        self._exempt_paths = frozenset(exempt_paths)
+        self._profiling = False
+        metrics = metrics or MetricsRegistry()
+        self._profiled = metrics.counter(
+            "http_profiled_requests_total",
+            "Requests profiled, by what asked for the profile",
+            ["trigger"],
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or self._profiling
+            or scope["path"] in self._exempt_paths
+        ):
+            await self._app(scope, receive, send)
+            return
+        token, output = None, None
+        if self._token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    token = value
+                elif name == PROFILE_OUTPUT_HEADER:
+                    output = value
+        if token is not None and hmac.compare_digest(token, self._token):
+            trigger = "header"
+        elif self._sample_rate > 0 and random.random() < self._sample_rate:
+            trigger = "sample"
+        else:
+            await self._app(scope, receive, send)
+            return
+        self._profiled.labels(trigger).inc()
+        download = trigger == "header" and (
+            output == b"download" or self._output_dir is None
+        )
+        await self._profile(scope, receive, send, download)
+
+    async def _profile(
+        self, scope: Scope, receive: Receive, send: Send, download: bool
+    ) -> None:
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_profiled(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-id", profile_id.encode()),
+                    ],
+                }
+            # a downloaded profile replaces the response
+            if not download:
+                await send(message)
+
+        self._profiling = True
+        started_tracing = self._trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        allocations_before = (
+            tracemalloc.take_snapshot()
+            if self._trace_allocations and not started_tracing
+            else None
+        )
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self._app(scope, receive, send_profiled)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - start
+            allocations = (
+                self._allocations(allocations_before)
+                if self._trace_allocations
+                else None
+            )
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._profiling = False
+
+        title = f"{scope['method']} {scope['path']} {status} in {duration:.3f}s"
+        # sorting and formatting the stats takes a while, so it is done off the loop
+        report = await asyncio.get_running_loop().run_in_executor(
+            None, self._report, title, profiler, allocations
+        )
+        if self._output_dir is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write, profile_id, profiler, report
+            )
+        if download:
+            response = PlainTextResponse(
+                report,
+                headers={
+                    "Content-Disposition": f'attachment; filename="{profile_id}.txt"',
+                    "X-Profile-Id": profile_id,
+                    "X-Profiled-Status": str(status),
+                },
+            )
+            await response(scope, receive, send)
+
+    @staticmethod
+    def _allocations(before: Optional[tracemalloc.Snapshot]) -> List[_Allocation]:
+        """_allocations gives the memory allocated by each line since tracing started,
+        or, when it was already tracing, since `before`, largest first
+        """
+        # leave out the memory tracemalloc took to trace the rest
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        if before is None:
+            return list(snapshot.statistics("lineno"))
+        return list(snapshot.compare_to(before, "lineno"))
+
+    def _report(
+        self,
+        title: str,
+        profiler: cProfile.Profile,
+        allocations: Optional[List[_Allocation]],
+    ) -> str:
+        report = io.StringIO()
+        report.write(f"{title}\n\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(
+            self._top
+        )
+        if allocations is not None:
+            report.write(f"Top {self._top} lines by memory allocated\n\n")
+            for allocation in allocations[: self._top]:
+                report.write(f"{allocation}\n")
+        return report.getvalue()
+
+    def _write(self, profile_id: str, profiler: cProfile.Profile, report: str) -> None:
+        os.makedirs(self._output_dir, exist_ok=True)
+        path = os.path.join(self._output_dir, profile_id)
+        profiler.dump_stats(f"{path}.prof")
+        with open(f"{path}.txt", "w") as report_file:
+            report_file.write(report)
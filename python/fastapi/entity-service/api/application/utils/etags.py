@@ -0,0 +1,44 @@
+import datetime
+import hashlib
+import uuid
+from typing import Iterable, Optional, Tuple
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def version_etag(
+    versions: Iterable[Tuple[uuid.UUID, datetime.datetime]], context: str = ""
+) -> str:
+    """version_etag derives a weak ETag from the (id, updated_at) versions of the resources
+    making up a response, rather than from its bytes, so that it can be computed
+    without rendering the response, or even loading the resources
+
+    The tag is weak as it identifies the state of the resources, not one byte-for-byte
+    representation of them. `context` covers anything else the response depends on,
+    such as pagination state.
+    """
+    digest = hashlib.blake2b(context.encode(), digest_size=16)
+    for resource_id, updated_at in versions:
+        updated_at_us = (updated_at - _EPOCH) // datetime.timedelta(microseconds=1)
+        digest.update(resource_id.bytes)
+        digest.update(updated_at_us.to_bytes(8, "big", signed=True))
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """etag_matches compares an If-None-Match header against an ETag using weak comparison,
+    as specified for If-None-Match in RFC 9110 section 13.1.2
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = _opaque_tag(etag)
+    return any(
+        _opaque_tag(candidate.strip()) == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
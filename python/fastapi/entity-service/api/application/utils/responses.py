@@ -0,0 +1,52 @@
+import uuid
+from decimal import Decimal
+from typing import Any
+
+import orjson
+import pydantic
+from fastapi.responses import JSONResponse
+from pydantic.json import pydantic_encoder
+
+
+def exact_decimal_encoder(obj: Any) -> Any:
+    """exact_decimal_encoder is a `json` encoder for pydantic models which keeps
+    Decimals exact, for output meant to be read back in
+
+    pydantic encodes Decimal as float by default, which is lossy;
+    strings round-trip exactly and are parsed back into Decimal on validation.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return pydantic_encoder(obj)
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, pydantic.BaseModel):
+        return obj.dict()
+    if isinstance(obj, Decimal):
+        # matches FastAPI's default encoding of Decimal
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        # orjson natively serializes uuid.UUID, but not subclasses such as asyncpg's
+        return str(obj)
+    raise TypeError
+
+
+def render_json(content: Any) -> bytes:
+    """render_json serializes pydantic models, and any JSON holding them, as
+    ModelJSONResponse renders its content
+    """
+    return orjson.dumps(content, default=_orjson_default)
+
+
+class ModelJSONResponse(JSONResponse):
+    """ModelJSONResponse serializes pydantic models straight to JSON bytes with orjson
+
+    Handlers returning a model make FastAPI re-validate it against the route's response_model
+    and walk it with `jsonable_encoder` before serializing, which dominates CPU time on the
+    read path for aggregates we have just built ourselves. Returning a ModelJSONResponse
+    instead skips both; the route's `response_model` is still used to document the schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
@@ -119,14 +119,55 @@ class BarValueObject(pydantic.BaseModel):
     attribute_1: int
 
 
+class EntityCountStrategy(str, Enum):
+    """EntityCountStrategy chooses how the `total` of an EntityList is counted,
+    trading accuracy for not counting every Entity on each request
+    """
+
+    # counts every Entity, at the cost of scanning them all
+    EXACT = "exact"
+    # the query planner's estimate, as current as the last VACUUM or ANALYZE
+    ESTIMATE = "estimate"
+    # an exact count, reused by each process for a few seconds
+    CACHED = "cached"
+
+
 class EntityList(pydantic.BaseModel):
     class Config:
         allow_mutation = False
 
     entities: List[Entity]
-    page: int
+    # page is None when the list was fetched by cursor rather than by page number
+    page: Optional[int]
     size: int
+    # opaque cursor pointing past the last of `entities`; None when there are no more
+    next_cursor: Optional[str] = None
+    # count of all Entities, given only when asked for with an EntityCountStrategy
+    total: Optional[int] = None
+
+
+class EntityBatchError(pydantic.BaseModel):
+    """EntityBatchError reports why one item of a batch operation failed
+
+    `index` is the item's position in the batch as submitted,
+    so failed items can be matched back up with the input.
+    """
+
+    class Config:
+        allow_mutation = False
+
+    index: int
+    detail: str
+
+
+class EntityBatchCreateResult(pydantic.BaseModel):
+    class Config:
+        allow_mutation = False
+
+    created: List[Entity]
+    errors: List[EntityBatchError]
 
 
 Entity.update_forward_refs()
 EntityList.update_forward_refs()
+EntityBatchCreateResult.update_forward_refs()
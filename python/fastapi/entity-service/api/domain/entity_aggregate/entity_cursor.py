@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import uuid
+from typing import Optional, Tuple
+
+import pydantic
+
+from api.domain.entity_aggregate.entity import Entity
+from api.domain.entity_aggregate.entity_errors import InvalidCursorError
+from api.domain.entity_aggregate.entity_filter import EntitySort
+
+
+class EntityCursor(pydantic.BaseModel):
+    """EntityCursor is the position of an Entity in the keyset ordering of `IEntityRepo.where`
+
+    Entities are listed in (created_at, entity_id) order, or another EntitySort,
+    and a cursor points just past the last Entity of a page. Repository implementations
+    seek directly to that position instead of counting and skipping every preceding row,
+    which keeps the cost of fetching a page constant no matter how deep into
+    the collection it is. A cursor continues a listing with the same filter and sort.
+
+    Cursors are handed to clients as opaque strings;
+    clients should not parse or construct them.
+    """
+
+    class Config:  # pylint: disable=missing-class-docstring
+        frozen = True
+
+    created_at: datetime.datetime
+    entity_id: pydantic.UUID4
+    # None in cursors handed out before listings could be sorted by updated_at
+    updated_at: Optional[datetime.datetime] = None
+
+    @classmethod
+    def from_entity(cls, entity: Entity) -> EntityCursor:
+        return cls(
+            created_at=entity.created_at,
+            entity_id=entity.entity_id,
+            updated_at=entity.updated_at,
+        )
+
+    def position(self, sort: EntitySort) -> Tuple[datetime.datetime, uuid.UUID]:
+        """position is the sort key of the Entity the cursor points past, in `sort` order
+
+        Raises InvalidCursorError if the cursor does not hold the timestamp sorted on.
+        """
+        timestamp = getattr(self, sort.field)
+        if timestamp is None:
+            raise InvalidCursorError(self.encode())
+        return timestamp, self.entity_id
+
+    @classmethod
+    def decode(cls, cursor: str) -> EntityCursor:
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            return cls.parse_raw(raw)
+        except (binascii.Error, ValueError) as e:
+            # pydantic.ValidationError is a subclass of ValueError
+            raise InvalidCursorError(cursor) from e
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.json().encode()).decode().rstrip("=")
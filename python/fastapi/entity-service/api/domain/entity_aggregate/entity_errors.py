@@ -9,7 +9,24 @@ class EntityNotFoundError(Exception):
     def __init__(self, field: str, value: str):
         self.field = field
         self.value = value
-        super().__init__(self)
+        super().__init__(f"Entity not found for: {field}={value}")
 
-    def __str__(self):
-        return f"Entity not found for: {self.field}={self.value}"
+
+class EntityAlreadyExistsError(Exception):
+    def __init__(self, field: str, value: str):
+        self.field = field
+        self.value = value
+        super().__init__(f"Entity already exists for: {field}={value}")
+
+
+class InvalidCursorError(Exception):
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+        super().__init__(f"Invalid pagination cursor: {cursor}")
+
+
+class InvalidPageError(Exception):
+    def __init__(self, field: str, value: int, allowed: str):
+        self.field = field
+        self.value = value
+        super().__init__(f"Invalid page {field}: {value}, must be {allowed}")
@@ -0,0 +1,30 @@
+import datetime
+import uuid
+from enum import Enum
+from typing import Any, Dict
+
+import pydantic
+
+
+class EntityEventType(str, Enum):
+    CREATED = "entity.created"
+    UPDATED = "entity.updated"
+    DELETED = "entity.deleted"
+
+
+class EntityEvent(pydantic.BaseModel):
+    """EntityEvent records a change to an Entity aggregate, for other services to react to
+
+    `payload` is the whole aggregate as serialized by `Entity.json()`: as it was left by
+    the change, or for a deletion, as it was last stored. Events may be delivered more
+    than once, so consumers should deduplicate them by `event_id`.
+    """
+
+    class Config:  # pylint: disable=missing-class-docstring
+        allow_mutation = False
+
+    event_id: uuid.UUID
+    event_type: EntityEventType
+    entity_id: uuid.UUID
+    payload: Dict[str, Any]
+    occurred_at: datetime.datetime
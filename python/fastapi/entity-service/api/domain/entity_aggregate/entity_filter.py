@@ -0,0 +1,58 @@
+import datetime
+from enum import Enum
+from typing import Optional
+
+import pydantic
+
+
+class EntitySort(str, Enum):
+    """EntitySort orders the Entities listed by `IEntityRepo.where`
+
+    Entities are ordered by a timestamp, with entity_id breaking ties,
+    ascending or, prefixed with "-", descending.
+    """
+
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    UPDATED_AT = "updated_at"
+    UPDATED_AT_DESC = "-updated_at"
+
+    @property
+    def field(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+
+class EntityFilter(pydantic.BaseModel):
+    """EntityFilter specifies which Entities `IEntityRepo.where` lists
+
+    An Entity is listed if it meets every condition given; conditions left as None
+    are not applied. Timestamp ranges include their `_since` bound and exclude their
+    `_before` bound. Repository implementations translate the conditions into
+    queries served by their indexes, rather than loading Entities to test them.
+    """
+
+    class Config:  # pylint: disable=missing-class-docstring
+        frozen = True
+
+    is_active: Optional[bool] = None
+    bar_value_attribute_0: Optional[str] = None
+    bar_value_attribute_1: Optional[int] = None
+    created_since: Optional[datetime.datetime] = None
+    created_before: Optional[datetime.datetime] = None
+    updated_since: Optional[datetime.datetime] = None
+    updated_before: Optional[datetime.datetime] = None
+
+    @pydantic.validator(
+        "created_since", "created_before", "updated_since", "updated_before"
+    )
+    def assume_utc(cls, value: Optional[datetime.datetime]):
+        """assume_utc reads timestamps given without a timezone as UTC,
+        the timezone Entity timestamps are recorded in
+        """
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value
@@ -1,8 +1,15 @@
+import datetime
 import uuid
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
 
-from api.domain.entity_aggregate.entity import Entity, EntityList
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_errors import InvalidPageError
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
 
 
 class IEntityRepo(ABC):
@@ -20,30 +27,132 @@ class IEntityRepo(ABC):
 
     Without applying a Unit of Work or similar pattern, multiple calls to methods of
     a Repository implementation are not assumed to be ACID-transactional.
+    EntityUnitOfWork collects changes to many aggregates and applies them atomically,
+    through `write_changes`.
     """
 
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
     @abstractmethod
     async def get(self, entity_id: uuid.UUID) -> Entity:
         pass
 
+    @abstractmethod
+    async def get_many(self, entity_ids: Sequence[uuid.UUID]) -> List[Entity]:
+        """get_many loads many Entities at once, in the order of `entity_ids`
+
+        IDs with no matching Entity are left out of the result rather than raising,
+        so the caller can tell which were not found by comparing against the result.
+        """
+
+    @abstractmethod
+    async def get_updated_at(self, entity_id: uuid.UUID) -> datetime.datetime:
+        """get_updated_at reads only when an Entity was last changed, which is enough
+        to tell whether a copy held elsewhere is current without loading the aggregate
+
+        Raises EntityNotFoundError if there is no Entity with `entity_id`.
+        """
+
     @abstractmethod
     async def where(
-        self, page: Optional[int] = None, size: Optional[int] = None
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
     ) -> EntityList:
-        pass
+        """where lists the Entities meeting `spec`, or all of them,
+        in (created_at, entity_id) order, or the order given by `sort`
+
+        Passing a `cursor` taken from the `next_cursor` of a previous EntityList
+        continues the listing just past that page; `page` is ignored in that case.
+        Without a cursor, `page` selects the page by number for backward compatibility,
+        at a cost which grows the deeper the page is.
+
+        With a `count` strategy, the EntityList also gives the `total` number of Entities
+        meeting `spec`, counted as the strategy says, or exactly where counting is cheap
+        anyway or the strategy cannot apply to `spec`.
+
+        Raises InvalidCursorError if `cursor` was not produced by a previous listing,
+        and InvalidPageError if `page` is negative or `size` is not between 1 and
+        MAX_PAGE_SIZE.
+        """
+
+    @classmethod
+    def _page_bounds(cls, page: Optional[int], size: Optional[int]) -> Tuple[int, int]:
+        """_page_bounds gives the `page` and `size` a listing is made with,
+        defaulting those not given, and rejecting those out of range
+        """
+        page = 0 if page is None else page
+        size = cls.DEFAULT_PAGE_SIZE if size is None else size
+        if page < 0:
+            raise InvalidPageError("page", page, "0 or more")
+        if not 1 <= size <= cls.MAX_PAGE_SIZE:
+            raise InvalidPageError("size", size, f"between 1 and {cls.MAX_PAGE_SIZE}")
+        return page, size
+
+    @abstractmethod
+    def iterate(self) -> AsyncIterator[Entity]:
+        """iterate yields every Entity in (created_at, entity_id) order
+
+        Implementations stream Entities from the underlying datastore as they are consumed,
+        so that memory use does not grow with the number of Entities stored.
+        """
 
     @abstractmethod
     async def create(self, entity: Entity) -> Entity:
         pass
 
+    @abstractmethod
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        """create_many writes many Entities, `batch_size` at a time
+
+        Each batch is written atomically, but a failed batch does not roll back
+        batches already written. Entities whose entity_id already exists are skipped,
+        and left out of the result.
+        """
+
     @abstractmethod
     async def create_or_update(self, entity: Entity) -> Entity:
-        pass
+        """create_or_update writes the whole aggregate, creating the Entity if it is new
+
+        The stored child entities are replaced by those of `entity`: child entities it
+        no longer holds are deleted. The created_at of an existing Entity is kept.
+        """
 
     @abstractmethod
     async def update(self, entity: Entity) -> Entity:
-        pass
+        """update writes the whole aggregate of an existing Entity,
+        as `create_or_update` does
+
+        Raises EntityNotFoundError if there is no Entity with `entity.entity_id`.
+        """
 
     @abstractmethod
     async def delete(self, entity_id) -> Entity:
-        pass
+        """delete removes the whole aggregate, returning it as it was last stored
+
+        Raises EntityNotFoundError if there is no Entity with `entity_id`.
+        """
+
+    @abstractmethod
+    async def write_changes(
+        self,
+        *,
+        new: Sequence[Entity] = (),
+        dirty: Sequence[Entity] = (),
+        deleted: Sequence[uuid.UUID] = (),
+    ) -> None:
+        """write_changes creates the `new` aggregates, rewrites the `dirty` ones
+        as `update` does, and deletes those with `deleted` IDs, all atomically
+
+        No Entity may appear more than once across the three. If any change cannot be
+        made, nothing is written: EntityAlreadyExistsError is raised for a new Entity
+        which already exists, and EntityNotFoundError for a dirty or deleted Entity
+        which does not.
+        """
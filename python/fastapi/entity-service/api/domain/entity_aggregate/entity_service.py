@@ -1,9 +1,17 @@
-from typing import Optional
+import datetime
+from typing import AsyncIterator, List, Optional, Sequence
 
 import pydantic
 
-from api.domain.entity_aggregate.entity import Entity, EntityList
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
 from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.domain.entity_aggregate.entity_unit_of_work import EntityUnitOfWork
+from api.domain.utils.datetime_utils import datetime_now_with_utc_timezone
 
 
 class EntityService:
@@ -25,21 +33,56 @@ class EntityService:
         self._repo = repo
 
     async def get(self, entity_id: pydantic.UUID4) -> Entity:
-        pass
+        return await self._repo.get(entity_id)
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        return await self._repo.get_many(entity_ids)
+
+    async def get_updated_at(self, entity_id: pydantic.UUID4) -> datetime.datetime:
+        return await self._repo.get_updated_at(entity_id)
 
     async def where(
-        self, page: Optional[int] = None, size: Optional[int] = None
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
     ) -> EntityList:
-        pass
+        return await self._repo.where(
+            page=page, size=size, cursor=cursor, count=count, spec=spec, sort=sort
+        )
+
+    def iterate(self) -> AsyncIterator[Entity]:
+        return self._repo.iterate()
 
     async def create(self, entity: Entity) -> Entity:
         return await self._repo.create(entity)
 
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        return await self._repo.create_many(entities, batch_size=batch_size)
+
     async def create_or_update(self, entity: Entity) -> Entity:
-        pass
+        return await self._repo.create_or_update(self._touch(entity))
 
     async def update(self, entity: Entity) -> Entity:
-        pass
+        return await self._repo.update(self._touch(entity))
 
     async def delete(self, entity_id) -> Entity:
-        pass
+        return await self._repo.delete(entity_id)
+
+    def unit_of_work(self) -> EntityUnitOfWork:
+        """unit_of_work begins tracking changes to many Entities, to be written atomically
+        when the unit is committed
+        """
+        return EntityUnitOfWork(self._repo)
+
+    @staticmethod
+    def _touch(entity: Entity) -> Entity:
+        """_touch stamps a changed Entity with the time of the change,
+        which is what tells clients holding an earlier copy that theirs is out of date
+        """
+        return entity.copy(update={"updated_at": datetime_now_with_utc_timezone()})
@@ -0,0 +1,117 @@
+import uuid
+from types import TracebackType
+from typing import Dict, Optional, Type
+
+from api.domain.entity_aggregate.entity import Entity
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+)
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.domain.utils.datetime_utils import datetime_now_with_utc_timezone
+
+
+class EntityUnitOfWork:
+    """EntityUnitOfWork is an implementation of the Unit of Work pattern for Entity aggregates
+
+    It keeps track of the aggregates a business operation creates, changes and deletes,
+    without writing anything, and then writes all of those changes at once on `commit`.
+    The changes are applied atomically, by `IEntityRepo.write_changes`, which lets
+    a repository write many aggregates with a handful of statements rather than
+    one or more per aggregate.
+
+    Used as an async context manager, it commits when the block completes
+    and discards the changes it tracked if the block raises:
+
+        async with entity_service.unit_of_work() as unit_of_work:
+            unit_of_work.register_new(entity)
+            unit_of_work.register_dirty(other_entity)
+    """
+
+    def __init__(self, repo: IEntityRepo):
+        self._repo = repo
+        # dicts keep the order changes were registered in, and one change per Entity
+        self._new: Dict[uuid.UUID, Entity] = {}
+        self._dirty: Dict[uuid.UUID, Entity] = {}
+        self._deleted: Dict[uuid.UUID, None] = {}
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self._new or self._dirty or self._deleted)
+
+    def register_new(self, entity: Entity) -> None:
+        """register_new tracks an Entity to be created
+
+        Raises EntityAlreadyExistsError if the Entity is already tracked by this unit.
+        """
+        entity_id = entity.entity_id
+        if (
+            entity_id in self._new
+            or entity_id in self._dirty
+            or entity_id in self._deleted
+        ):
+            raise EntityAlreadyExistsError(field="entity_id", value=str(entity_id))
+        self._new[entity_id] = entity
+
+    def register_dirty(self, entity: Entity) -> None:
+        """register_dirty tracks a changed Entity to be written
+
+        Registering a new Entity again keeps it new, with its latest state.
+        Raises EntityNotFoundError if the Entity is tracked to be deleted.
+        """
+        entity_id = entity.entity_id
+        if entity_id in self._deleted:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        if entity_id in self._new:
+            self._new[entity_id] = entity
+        else:
+            self._dirty[entity_id] = entity
+
+    def register_deleted(self, entity_id: uuid.UUID) -> None:
+        """register_deleted tracks an Entity to be deleted
+
+        A new Entity is simply forgotten, as it has not been written yet.
+        """
+        if self._new.pop(entity_id, None) is not None:
+            return
+        self._dirty.pop(entity_id, None)
+        self._deleted[entity_id] = None
+
+    async def commit(self) -> None:
+        """commit writes all tracked changes atomically, then stops tracking them
+
+        Changed Entities are stamped with the time of the commit, shared by all of them.
+        On error nothing is written, and the changes stay tracked.
+        """
+        if not self.has_changes:
+            return
+        now = datetime_now_with_utc_timezone()
+        await self._repo.write_changes(
+            new=list(self._new.values()),
+            dirty=[
+                entity.copy(update={"updated_at": now})
+                for entity in self._dirty.values()
+            ],
+            deleted=list(self._deleted),
+        )
+        self.rollback()
+
+    def rollback(self) -> None:
+        """rollback discards all tracked changes"""
+        self._new.clear()
+        self._dirty.clear()
+        self._deleted.clear()
+
+    async def __aenter__(self) -> "EntityUnitOfWork":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            self.rollback()
@@ -0,0 +1,202 @@
+"""entity_transfer streams Entity aggregates out of and back into Postgres as NDJSON
+
+Entities are read from and written to the database and layout configured for the
+service, in the config file named by -c or ENTITY_SERVICE_CONFIG; --layout overrides
+the configured entityRepo.layout, to transfer aggregates between layouts.
+
+Export writes one JSON-serialized Entity per line, read through a server-side cursor:
+
+    python -m api.entity_transfer export > entities.ndjson
+
+Import validates each line as an Entity, spreading each batch across worker processes,
+and writes them in batches; entities which already exist are skipped, and invalid lines
+are reported and skipped:
+
+    python -m api.entity_transfer import < entities.ndjson
+
+Both hold at most one batch of entities in memory regardless of how many are transferred,
+and report progress and throughput in rows per second on stderr.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, TextIO
+
+from api.application.entity_aggregate.entity_validator import EntityValidator
+from api.application.utils.responses import exact_decimal_encoder
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.infrastructure.entity_aggregate.entity_document_repo import (
+    PGEntityDocumentRepo,
+)
+from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+from api.main import (
+    _create_pg_client,
+    CONFIG_PATH_ENV_VAR,
+    DEFAULT_CONFIG_PATH,
+    load_config,
+)
+
+
+class TransferProgress:
+    def __init__(self, verb: str, out: TextIO, report_every: int):
+        self._verb = verb
+        self._out = out
+        self._report_every = report_every
+        self._start = time.perf_counter()
+        self.count = 0
+        self.skipped = 0
+
+    def advance(self, count: int = 1) -> None:
+        previous_count = self.count
+        self.count += count
+        if previous_count // self._report_every != self.count // self._report_every:
+            self.report()
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self._start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        print(
+            f"{self._verb} {self.count} entities, skipped {self.skipped} "
+            f"in {elapsed:.1f}s ({rate:.0f} rows/s)",
+            file=self._out,
+        )
+
+
+async def export_entities(
+    repo: IEntityRepo, out: TextIO, progress: TransferProgress
+) -> None:
+    async for entity in repo.iterate():
+        out.write(entity.json(encoder=exact_decimal_encoder))
+        out.write("\n")
+        progress.advance()
+
+
+async def import_entities(
+    repo: IEntityRepo,
+    source: TextIO,
+    batch_size: int,
+    progress: TransferProgress,
+    validator: EntityValidator,
+) -> None:
+    lines: List[str] = []
+    line_numbers: List[int] = []
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        lines.append(line)
+        line_numbers.append(line_number)
+        if len(lines) >= batch_size:
+            await _import_batch(repo, validator, lines, line_numbers, progress)
+            lines, line_numbers = [], []
+    if lines:
+        await _import_batch(repo, validator, lines, line_numbers, progress)
+
+
+async def _import_batch(
+    repo: IEntityRepo,
+    validator: EntityValidator,
+    lines: List[str],
+    line_numbers: List[int],
+    progress: TransferProgress,
+) -> None:
+    validation = await validator.validate(lines)
+    for error in validation.errors:
+        print(f"line {line_numbers[error.index]}: {error.detail}", file=sys.stderr)
+    progress.skipped += len(validation.errors)
+    if not validation.entities:
+        return
+    created_entities = await repo.create_many(
+        validation.entities, batch_size=len(validation.entities)
+    )
+    progress.skipped += len(validation.entities) - len(created_entities)
+    progress.advance(len(created_entities))
+
+
+async def run(args: argparse.Namespace) -> None:
+    config = load_config(args.config)
+    entity_repo_config = config.get("entityRepo", {})
+    if entity_repo_config.get("type", "postgres") != "postgres":
+        raise SystemExit(f"{args.config}: entityRepo.type is not postgres")
+    pg_config = config["postgres"]
+    pg_client = _create_pg_client(
+        os.getenv("POSTGRES_HOST", default=pg_config.get("host", "localhost")),
+        os.getenv("POSTGRES_PORT", default=pg_config.get("port", 5432)),
+        pg_config.get("pool", {}),
+        MetricsRegistry(),
+        name="primary",
+    )
+    layout = args.layout or entity_repo_config.get("layout", "normalized")
+    entity_repo_class = PGEntityDocumentRepo if layout == "document" else PGEntityRepo
+    await pg_client.connect()
+    try:
+        repo = entity_repo_class(pg_client, bulk_batch_size=args.batch_size)
+        if args.command == "export":
+            progress = TransferProgress("exported", sys.stderr, args.report_every)
+            await export_entities(repo, sys.stdout, progress)
+        else:
+            progress = TransferProgress("imported", sys.stderr, args.report_every)
+            with ProcessPoolExecutor(
+                max_workers=args.validation_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                await import_entities(
+                    repo,
+                    sys.stdin,
+                    args.batch_size,
+                    progress,
+                    # every batch is validated across the worker processes
+                    EntityValidator(
+                        executor,
+                        inline_threshold=0,
+                        chunk_size=max(args.batch_size // args.validation_workers, 1),
+                    ),
+                )
+        progress.report()
+    finally:
+        await pg_client.disconnect()
+
+
+def main():  # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument(
+        "-c",
+        "--config",
+        default=os.getenv(CONFIG_PATH_ENV_VAR, DEFAULT_CONFIG_PATH),
+        help="Config file of the service",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["normalized", "document"],
+        help="How aggregates are stored; overrides entityRepo.layout",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Entities written per transaction on import",
+    )
+    parser.add_argument(
+        "--validation-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes validating entities on import",
+    )
+    parser.add_argument(
+        "--report-every",
+        type=int,
+        default=10000,
+        help="Report progress every this many entities",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+import asyncpg
+import pydantic
+from asyncpg import Record
+from databases import Database
+from databases.core import Connection
+
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+
+class PoolTimeoutError(Exception):
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        super().__init__(f"No database connection became free within {timeout}s")
+
+
+class PoolStats(pydantic.BaseModel):
+    class Config:
+        allow_mutation = False
+
+    min_size: int
+    max_size: int
+    in_use: int
+    idle: int
+    # tasks currently waiting to be handed a connection
+    waiters: int
+
+
+class PGClient:
+    """PGClient wraps a `databases.Database` to instrument every statement run through it
+
+    Statements are run as precompiled PGStatements, whose names label their latency
+    histogram, as do the names given to transactions by their callers. Connection-pool
+    acquisition is timed separately, so that time spent queuing for a connection can be
+    told apart from time spent in Postgres.
+
+    Pool sizing and connection lifetimes are options of the wrapped Database, which passes
+    them on to `asyncpg.create_pool`; waiting for a connection is bounded here,
+    by `acquire_timeout` seconds, after which PoolTimeoutError is raised.
+
+    `name` tells apart the metrics of clients of different databases, such as a primary
+    and its read replicas, sharing one registry.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        metrics: Optional[MetricsRegistry] = None,
+        acquire_timeout: Optional[float] = None,
+        name: str = "primary",
+    ):
+        self.database = database
+        self.name = name
+        self._acquire_timeout = acquire_timeout
+        self._acquire_waiters = 0
+        metrics = metrics or MetricsRegistry()
+        self._statement_duration = metrics.histogram(
+            "db_statement_duration_seconds",
+            "Time spent executing a database statement",
+            ["database", "statement"],
+        )
+        self._transaction_duration = metrics.histogram(
+            "db_transaction_duration_seconds",
+            "Time from beginning to committing or rolling back a database transaction",
+            ["database", "transaction"],
+        )
+        self._pool_acquire_duration = metrics.histogram(
+            "db_pool_acquire_duration_seconds",
+            "Time spent waiting to acquire a connection from the pool",
+            ["database"],
+        ).labels(name)
+        pool_connections = metrics.gauge(
+            "db_pool_connections", "Connections open in the pool", ["database", "state"]
+        )
+        pool_connections.labels(name, "in_use").set_function(
+            lambda: self._pool_stat("in_use")
+        )
+        pool_connections.labels(name, "idle").set_function(
+            lambda: self._pool_stat("idle")
+        )
+        metrics.gauge(
+            "db_pool_acquire_waiters",
+            "Tasks waiting to acquire a connection",
+            ["database"],
+        ).labels(name).set_function(lambda: self._acquire_waiters)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.database.is_connected
+
+    async def connect(self) -> None:
+        await self.database.connect()
+
+    async def disconnect(self) -> None:
+        await self.database.disconnect()
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        """pool_stats describes the connection pool, or is None when not connected"""
+        pool = self.database._backend._pool  # pylint: disable=protected-access
+        if pool is None:
+            return None
+        size, idle = pool.get_size(), pool.get_idle_size()
+        return PoolStats(
+            min_size=pool.get_min_size(),
+            max_size=pool.get_max_size(),
+            in_use=size - idle,
+            idle=idle,
+            waiters=self._acquire_waiters,
+        )
+
+    def _pool_stat(self, name: str) -> int:
+        pool_stats = self.pool_stats()
+        return getattr(pool_stats, name) if pool_stats is not None else 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Connection]:
+        """connection holds the current task's connection for the duration of the block
+
+        Nested blocks within the same task share the connection acquired by the outermost.
+        """
+        connection = self.database.connection()
+        # databases counts nested uses of a task's connection,
+        # and only acquires one from the pool on the first
+        if connection._connection_counter == 0:  # pylint: disable=protected-access
+            await self._acquire(connection)
+        else:
+            await connection.__aenter__()
+        try:
+            yield connection
+        finally:
+            await connection.__aexit__()
+
+    async def _acquire(self, connection: Connection) -> None:
+        self._acquire_waiters += 1
+        try:
+            with self._pool_acquire_duration.time():
+                await asyncio.wait_for(connection.__aenter__(), self._acquire_timeout)
+        except asyncio.TimeoutError as e:
+            raise PoolTimeoutError(self._acquire_timeout) from e
+        finally:
+            self._acquire_waiters -= 1
+
+    @asynccontextmanager
+    async def transaction(self, *, name: str) -> AsyncIterator[Connection]:
+        async with self.connection() as connection:
+            start = time.perf_counter()
+            try:
+                async with connection.transaction():
+                    yield connection
+            finally:
+                self._transaction_duration.labels(self.name, name).observe(
+                    time.perf_counter() - start
+                )
+
+    async def fetch_one(
+        self, statement: PGStatement, **params: Any
+    ) -> Optional[Record]:
+        async with self._query(statement) as connection:
+            return await connection.fetchrow(statement.sql, *statement.bind(params))
+
+    async def fetch_all(self, statement: PGStatement, **params: Any) -> List[Record]:
+        async with self._query(statement) as connection:
+            return await connection.fetch(statement.sql, *statement.bind(params))
+
+    async def execute(self, statement: PGStatement, **params: Any) -> str:
+        async with self._query(statement) as connection:
+            return await connection.execute(statement.sql, *statement.bind(params))
+
+    async def iterate(
+        self, statement: PGStatement, **params: Any
+    ) -> AsyncIterator[Record]:
+        """iterate streams records through a server-side cursor,
+        timing only the wait for the first record, as the rest are paced by the consumer
+        """
+        async with self.connection() as connection:
+            # the cursor keeps the connection busy until it is exhausted or abandoned
+            async with connection._query_lock:  # pylint: disable=protected-access
+                raw_connection: asyncpg.Connection = connection.raw_connection
+                # cursors only live within a transaction
+                async with raw_connection.transaction():
+                    records = raw_connection.cursor(
+                        statement.sql, *statement.bind(params)
+                    ).__aiter__()
+                    with self._statement_duration.labels(
+                        self.name, statement.name
+                    ).time():
+                        try:
+                            record = await records.__anext__()
+                        except StopAsyncIteration:
+                            return
+                    yield record
+                    async for record in records:
+                        yield record
+
+    @asynccontextmanager
+    async def _query(self, statement: PGStatement) -> AsyncIterator[asyncpg.Connection]:
+        """_query times a statement run on the current task's asyncpg connection
+
+        Statements bypass the query building of `databases.Connection`, but still take
+        its query lock, as tasks spawned within the same context share its connection.
+        """
+        async with self.connection() as connection:
+            async with connection._query_lock:  # pylint: disable=protected-access
+                with self._statement_duration.labels(self.name, statement.name).time():
+                    yield connection.raw_connection
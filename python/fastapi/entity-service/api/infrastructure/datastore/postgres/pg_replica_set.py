@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import math
+from contextlib import contextmanager, suppress
+from typing import Iterator, List, Optional, Sequence
+
+import sqlalchemy as sa
+
+from api.infrastructure.datastore import read_routing
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+# seconds the replica's replay is behind the primary; a primary, or a replica which has
+# replayed all the WAL it received, is not behind however long ago its last write was
+SELECT_REPLICATION_LAG = PGStatement(
+    "replica.select_lag",
+    sa.select(
+        sa.case(
+            (
+                sa.or_(
+                    ~sa.func.pg_is_in_recovery(),
+                    sa.func.pg_last_wal_receive_lsn()
+                    == sa.func.pg_last_wal_replay_lsn(),
+                ),
+                sa.literal_column("0"),
+            ),
+            else_=sa.extract(
+                "epoch", sa.func.now() - sa.func.pg_last_xact_replay_timestamp()
+            ),
+        )
+    ),
+)
+
+
+class _Replica:
+    __slots__ = ("client", "lag")
+
+    def __init__(self, client: PGClient):
+        self.client = client
+        self.lag = 0.0
+
+
+class PGReplicaSet:
+    """PGReplicaSet routes reads between a primary database and its read replicas
+
+    `reader` picks the replica with the fewest connections in use and tasks waiting
+    for one, taking turns among equally loaded replicas. Replicas found lagging
+    more than `max_lag` seconds behind the primary, or failing to report their lag
+    within `lag_check_timeout` seconds, are passed over until their next check,
+    `lag_check_interval` seconds later; when no replica is eligible, reads go
+    to the primary. Lag is checked by a background task started on `connect`,
+    so that no read waits on a check, however slow or unreachable a replica is.
+
+    For read-your-writes consistency, a task which wrote to the primary, and every task
+    it spawns from then on, reads from the primary too, as would code within
+    `read_from_primary`; see `read_routing`.
+    """
+
+    def __init__(
+        self,
+        primary: PGClient,
+        replicas: Sequence[PGClient] = (),
+        max_lag: Optional[float] = None,
+        lag_check_interval: float = 1.0,
+        lag_check_timeout: float = 1.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.primary = primary
+        self._replicas = [_Replica(replica) for replica in replicas]
+        self._max_lag = max_lag
+        self._lag_check_interval = lag_check_interval
+        self._lag_check_timeout = lag_check_timeout
+        self._lag_check_task: Optional[asyncio.Task] = None
+        self._turns = itertools.count()
+        metrics = metrics or MetricsRegistry()
+        replica_lag = metrics.gauge(
+            "db_replica_lag_seconds",
+            "Replication lag last reported by a read replica",
+            ["database"],
+        )
+        for replica in self._replicas:
+            replica_lag.labels(replica.client.name).set_function(
+                lambda replica=replica: replica.lag
+            )
+
+    @property
+    def clients(self) -> List[PGClient]:
+        return [self.primary, *(replica.client for replica in self._replicas)]
+
+    async def connect(self) -> None:
+        await asyncio.gather(*(client.connect() for client in self.clients))
+        if self._replicas and self._max_lag is not None:
+            # checked once up front, so that the first reads already pass over
+            # lagging or unreachable replicas
+            await self.check_lag()
+            self._lag_check_task = asyncio.create_task(self._check_lag_periodically())
+
+    async def disconnect(self) -> None:
+        if self._lag_check_task is not None:
+            # a check in flight holds a connection no longer than a query without
+            # a transaction, so cancelling it leaves nothing checked out
+            self._lag_check_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._lag_check_task
+            self._lag_check_task = None
+        await asyncio.gather(*(client.disconnect() for client in self.clients))
+
+    async def reader(self) -> PGClient:
+        """reader picks the client the current task should read from"""
+        if not self._replicas or read_routing.is_pinned_to_primary():
+            return self.primary
+        replicas = [
+            replica
+            for replica in self._replicas
+            if self._max_lag is None or replica.lag <= self._max_lag
+        ]
+        if not replicas:
+            return self.primary
+        # rotating the candidates makes min() settle ties in turns
+        turn = next(self._turns) % len(replicas)
+        return min(
+            replicas[turn:] + replicas[:turn], key=lambda replica: _load(replica.client)
+        ).client
+
+    def written(self) -> None:
+        """written pins the reads of the current task to the primary,
+        once it has written there
+        """
+        read_routing.pin_to_primary()
+
+    @contextmanager
+    def read_from_primary(self) -> Iterator[None]:
+        """read_from_primary routes the reads made within the block to the primary"""
+        with read_routing.read_from_primary():
+            yield
+
+    async def check_lag(self) -> None:
+        """check_lag reads the lag of every replica, taking no longer than
+        `lag_check_timeout` seconds
+        """
+        await asyncio.gather(*(self._read_lag(replica) for replica in self._replicas))
+
+    async def _check_lag_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._lag_check_interval)
+            await self.check_lag()
+
+    async def _read_lag(self, replica: _Replica) -> None:
+        try:
+            record = await asyncio.wait_for(
+                replica.client.fetch_one(SELECT_REPLICATION_LAG),
+                timeout=self._lag_check_timeout,
+            )
+            # NULL when the replica has yet to replay anything it received
+            replica.lag = float(record[0]) if record[0] is not None else math.inf
+        except Exception:  # pylint: disable=broad-except
+            # whatever the failure, the replica cannot be vouched for; an error escaping
+            # would also end the background task, leaving every replica's lag as it was
+            replica.lag = math.inf
+
+
+def _load(client: PGClient) -> int:
+    pool_stats = client.pool_stats()
+    return pool_stats.in_use + pool_stats.waiters if pool_stats is not None else 0
@@ -0,0 +1,41 @@
+from typing import Any, List, Mapping
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import ClauseElement
+
+_DIALECT = postgresql.dialect(paramstyle="pyformat")
+
+
+class PGStatement:
+    """PGStatement is a SQL statement compiled once, ahead of the calls that run it
+
+    Building a SQLAlchemy construct and compiling it to SQL costs more CPU than most of
+    our queries take to run, so statements are built once, usually at import time,
+    and compiled to SQL with Postgres' native `$n` placeholders. Each call only binds
+    its parameter values, by name, into their positions.
+
+    As the SQL text of a statement never changes, asyncpg's statement cache prepares it
+    server-side on first use on each connection and reuses it from then on. To keep it
+    that way, parameters must be declared with `sa.bindparam(name)` and given no value
+    at build time, and values of varying length are bound as arrays, with `= ANY(...)`
+    or `unnest(...)`, instead of expanding into a varying number of placeholders.
+    """
+
+    def __init__(self, name: str, query: ClauseElement):
+        self.name = name
+        compiled = query.compile(dialect=_DIALECT)
+        self.param_names = tuple(sorted(compiled.params))
+        self.sql = compiled.string % {
+            param_name: f"${position}"
+            for position, param_name in enumerate(self.param_names, start=1)
+        }
+
+    def bind(self, params: Mapping[str, Any]) -> List[Any]:
+        """bind orders parameter values to match the statement's placeholders"""
+        try:
+            return [params[param_name] for param_name in self.param_names]
+        except KeyError as e:
+            raise TypeError(f"{self.name} is missing parameter {e}") from None
+
+    def __repr__(self) -> str:
+        return f"PGStatement({self.name!r}, {self.sql!r})"
@@ -75,3 +75,131 @@ IDENTITY_ROLE_TABLE = sa.Table(
 )
 
 
+ENTITY_DB_METADATA = sa.MetaData()
+
+ENTITY_TABLE = sa.Table(
+    "entity",
+    ENTITY_DB_METADATA,
+    sa.Column("entity_id", postgresql.UUID(), primary_key=True),
+    sa.Column("bar_value_object_attribute_0", sa.TEXT(), nullable=False),
+    sa.Column("bar_value_object_attribute_1", sa.Integer(), nullable=False),
+    sa.Column("is_active", sa.Boolean(), nullable=False),
+    sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    # supports keyset pagination, which seeks on (created_at, entity_id)
+    sa.Index("ix_entity_created_at_entity_id", "created_at", "entity_id"),
+    # support listings filtered on is_active or bar_value, or sorted by updated_at,
+    # each seeking on the same keys within the entities filtered on;
+    # an entity is only ever in one of the partial indexes on is_active
+    sa.Index(
+        "ix_entity_active_created_at_entity_id",
+        "created_at",
+        "entity_id",
+        postgresql_where=sa.text("is_active"),
+    ),
+    sa.Index(
+        "ix_entity_inactive_created_at_entity_id",
+        "created_at",
+        "entity_id",
+        postgresql_where=sa.text("NOT is_active"),
+    ),
+    sa.Index(
+        "ix_entity_bar_value_0_created_at_entity_id",
+        "bar_value_object_attribute_0",
+        "created_at",
+        "entity_id",
+    ),
+    sa.Index(
+        "ix_entity_bar_value_1_created_at_entity_id",
+        "bar_value_object_attribute_1",
+        "created_at",
+        "entity_id",
+    ),
+    sa.Index("ix_entity_updated_at_entity_id", "updated_at", "entity_id"),
+)
+
+CHILD_ENTITY_TABLE = sa.Table(
+    "child_entity",
+    ENTITY_DB_METADATA,
+    sa.Column("child_entity_id", postgresql.UUID(), primary_key=True),
+    sa.Column("attribute_a", sa.TEXT(), nullable=False),
+    sa.Column("attribute_b", sa.Integer(), nullable=False),
+    sa.Column("attribute_c", sa.Numeric(), nullable=False),
+)
+
+ENTITY_CHILD_ENTITY_TABLE = sa.Table(
+    "entity_child_entity",
+    ENTITY_DB_METADATA,
+    sa.Column("entity_child_entity_id", postgresql.UUID(), primary_key=True),
+    sa.Column("entity_id", postgresql.UUID(), nullable=False, index=True),
+    sa.Column("child_entity_id", postgresql.UUID(), nullable=False, index=True),
+    sa.ForeignKeyConstraint(
+        ("entity_id",),
+        ["entity.entity_id"],
+    ),
+    sa.ForeignKeyConstraint(
+        ("child_entity_id",),
+        ["child_entity.child_entity_id"],
+    ),
+    sa.UniqueConstraint(
+        "entity_id",
+        "child_entity_id",
+    ),
+)
+
+# the same aggregates, each stored as a single row embedding its child entities
+# as a JSONB array, for PGEntityDocumentRepo; an alternative to the three tables above
+ENTITY_DOCUMENT_TABLE = sa.Table(
+    "entity_document",
+    ENTITY_DB_METADATA,
+    sa.Column("entity_id", postgresql.UUID(), primary_key=True),
+    sa.Column("bar_value_object_attribute_0", sa.TEXT(), nullable=False),
+    sa.Column("bar_value_object_attribute_1", sa.Integer(), nullable=False),
+    sa.Column("is_active", sa.Boolean(), nullable=False),
+    sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("child_entities", postgresql.JSONB(), nullable=False),
+    # supports keyset pagination, which seeks on (created_at, entity_id)
+    sa.Index("ix_entity_document_created_at_entity_id", "created_at", "entity_id"),
+    # support listings filtered on is_active or bar_value, or sorted by updated_at,
+    # each seeking on the same keys within the entities filtered on;
+    # an entity is only ever in one of the partial indexes on is_active
+    sa.Index(
+        "ix_entity_document_active_created_at_entity_id",
+        "created_at",
+        "entity_id",
+        postgresql_where=sa.text("is_active"),
+    ),
+    sa.Index(
+        "ix_entity_document_inactive_created_at_entity_id",
+        "created_at",
+        "entity_id",
+        postgresql_where=sa.text("NOT is_active"),
+    ),
+    sa.Index(
+        "ix_entity_document_bar_value_0_created_at_entity_id",
+        "bar_value_object_attribute_0",
+        "created_at",
+        "entity_id",
+    ),
+    sa.Index(
+        "ix_entity_document_bar_value_1_created_at_entity_id",
+        "bar_value_object_attribute_1",
+        "created_at",
+        "entity_id",
+    ),
+    sa.Index("ix_entity_document_updated_at_entity_id", "updated_at", "entity_id"),
+)
+
+OUTBOX_EVENT_TABLE = sa.Table(
+    "outbox_event",
+    ENTITY_DB_METADATA,
+    # orders events as they were written, for the publisher to drain them in that order
+    sa.Column("outbox_event_id", sa.BigInteger(), sa.Identity(), primary_key=True),
+    # identifies the event to its consumers; random, so left unindexed to keep writes cheap
+    sa.Column("event_id", postgresql.UUID(), nullable=False),
+    sa.Column("event_type", sa.TEXT(), nullable=False),
+    sa.Column("aggregate_id", postgresql.UUID(), nullable=False),
+    sa.Column("payload", postgresql.JSONB(), nullable=False),
+    sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+)
@@ -0,0 +1,34 @@
+"""Routing of a task's reads to the primary database, once it has written there
+
+For read-your-writes consistency, a task which wrote to the primary, and every task
+it spawns from then on, reads from the primary too. Each request is served in its own
+task, so this pins no more than the request which wrote.
+
+Kept apart from PGReplicaSet, which routes reads accordingly, so that repos wrapping
+any other repo can tell pinned reads apart without depending on postgres.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+_read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+def pin_to_primary() -> None:
+    """pin_to_primary routes the reads of the current task to the primary from now on"""
+    _read_from_primary.set(True)
+
+
+def is_pinned_to_primary() -> bool:
+    return _read_from_primary.get()
+
+
+@contextmanager
+def read_from_primary() -> Iterator[None]:
+    """read_from_primary routes the reads made within the block to the primary"""
+    token = _read_from_primary.set(True)
+    try:
+        yield
+    finally:
+        _read_from_primary.reset(token)
@@ -0,0 +1,193 @@
+import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+import pydantic
+
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.infrastructure.datastore.cache.lru_ttl_cache import CacheStats, LRUTTLCache
+
+
+class CachingEntityRepo(IEntityRepo):
+    """CachingEntityRepo is a read-through cache in front of any other IEntityRepo implementation
+
+    `get` and `get_many` are served from a bounded in-process LRU/TTL cache when possible,
+    falling back to the wrapped repo on a miss and caching what it returns.
+    Writes go straight to the wrapped repo, then refresh (or, for deletes, invalidate)
+    the cached entry for the aggregate they touched.
+
+    A read which misses only fills the cache if no write touched the aggregate while
+    it was in flight, as it may otherwise have read what the write replaced, and would
+    overwrite the entry the write refreshed. Writes bump a generation per aggregate,
+    kept only while a read of it is in flight, which each read checks before filling.
+
+    The cache is local to the process: writes made through other processes or replicas
+    are only picked up once the entry expires, so `ttl_seconds` is the bound on staleness.
+    Listing with `where` is passed through uncached, as pages shift with every write.
+    """
+
+    def __init__(self, repo: IEntityRepo, max_size: int, ttl_seconds: float):
+        self._repo = repo
+        self._cache: LRUTTLCache[pydantic.UUID4, Entity] = LRUTTLCache(
+            max_size=max_size, ttl_seconds=ttl_seconds
+        )
+        # by entity_id, the reads in flight, and the writes made since the first began
+        self._reads_in_flight: Dict[pydantic.UUID4, int] = {}
+        self._generations: Dict[pydantic.UUID4, int] = {}
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+        entity = self._cache.get(entity_id)
+        if entity is None:
+            generations = self._begin_reads([entity_id])
+            try:
+                entity = await self._repo.get(entity_id)
+                self._fill([entity], generations)
+            finally:
+                self._end_reads(generations)
+        # Entity allows assignment; hand out copies so callers cannot mutate the cached one.
+        # A shallow copy suffices since child entities and value objects are frozen.
+        return entity.copy()
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        entities_by_id = {}
+        missing_entity_ids = []
+        for entity_id in entity_ids:
+            entity = self._cache.get(entity_id)
+            if entity is None:
+                missing_entity_ids.append(entity_id)
+            else:
+                entities_by_id[entity_id] = entity
+        if missing_entity_ids:
+            generations = self._begin_reads(missing_entity_ids)
+            try:
+                read_entities = await self._repo.get_many(missing_entity_ids)
+                self._fill(read_entities, generations)
+            finally:
+                self._end_reads(generations)
+            for entity in read_entities:
+                entities_by_id[entity.entity_id] = entity
+        return [
+            entities_by_id[entity_id].copy()
+            for entity_id in entity_ids
+            if entity_id in entities_by_id
+        ]
+
+    async def get_updated_at(self, entity_id: pydantic.UUID4) -> datetime.datetime:
+        # a cached Entity is exactly what `get` would return, so it answers just as well
+        entity = self._cache.get(entity_id)
+        if entity is None:
+            return await self._repo.get_updated_at(entity_id)
+        return entity.updated_at
+
+    async def where(
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
+    ) -> EntityList:
+        return await self._repo.where(
+            page=page, size=size, cursor=cursor, count=count, spec=spec, sort=sort
+        )
+
+    def iterate(self) -> AsyncIterator[Entity]:
+        return self._repo.iterate()
+
+    async def create(self, entity: Entity) -> Entity:
+        return self._refresh(await self._repo.create(entity))
+
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        created_entities = await self._repo.create_many(entities, batch_size=batch_size)
+        return [self._refresh(entity) for entity in created_entities]
+
+    async def create_or_update(self, entity: Entity) -> Entity:
+        self._invalidate([entity.entity_id])
+        return self._refresh(await self._repo.create_or_update(entity))
+
+    async def update(self, entity: Entity) -> Entity:
+        self._invalidate([entity.entity_id])
+        return self._refresh(await self._repo.update(entity))
+
+    async def delete(self, entity_id: pydantic.UUID4) -> Entity:
+        self._invalidate([entity_id])
+        try:
+            return await self._repo.delete(entity_id)
+        finally:
+            # reads which began meanwhile may have filled the entry back in
+            self._invalidate([entity_id])
+
+    async def write_changes(
+        self,
+        *,
+        new: Sequence[Entity] = (),
+        dirty: Sequence[Entity] = (),
+        deleted: Sequence[pydantic.UUID4] = (),
+    ) -> None:
+        entity_ids = [*(entity.entity_id for entity in (*new, *dirty)), *deleted]
+        self._invalidate(entity_ids)
+        try:
+            await self._repo.write_changes(new=new, dirty=dirty, deleted=deleted)
+        finally:
+            # entries read back in while the changes were being written may be stale
+            self._invalidate(entity_ids)
+
+    def _refresh(self, entity: Entity) -> Entity:
+        self._written(entity.entity_id)
+        self._cache.set(entity.entity_id, entity)
+        return entity.copy()
+
+    def _invalidate(self, entity_ids: Iterable[pydantic.UUID4]) -> None:
+        for entity_id in entity_ids:
+            self._written(entity_id)
+            self._cache.invalidate(entity_id)
+
+    def _written(self, entity_id: pydantic.UUID4) -> None:
+        # only reads in flight check the generation, so none is kept otherwise
+        if entity_id in self._reads_in_flight:
+            self._generations[entity_id] = self._generations.get(entity_id, 0) + 1
+
+    def _begin_reads(
+        self, entity_ids: Sequence[pydantic.UUID4]
+    ) -> Dict[pydantic.UUID4, int]:
+        """_begin_reads records reads of `entity_ids` as in flight,
+        and gives the generation of each as the reads begin
+        """
+        generations = {}
+        for entity_id in dict.fromkeys(entity_ids):
+            self._reads_in_flight[entity_id] = (
+                self._reads_in_flight.get(entity_id, 0) + 1
+            )
+            generations[entity_id] = self._generations.get(entity_id, 0)
+        return generations
+
+    def _fill(
+        self, entities: Iterable[Entity], generations: Dict[pydantic.UUID4, int]
+    ) -> None:
+        for entity in entities:
+            if (
+                self._generations.get(entity.entity_id, 0)
+                == generations[entity.entity_id]
+            ):
+                self._cache.set(entity.entity_id, entity)
+
+    def _end_reads(self, generations: Dict[pydantic.UUID4, int]) -> None:
+        for entity_id in generations:
+            reads_in_flight = self._reads_in_flight[entity_id] - 1
+            if reads_in_flight:
+                self._reads_in_flight[entity_id] = reads_in_flight
+            else:
+                del self._reads_in_flight[entity_id]
+                self._generations.pop(entity_id, None)
@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import weakref
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set
+
+import pydantic
+
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_errors import EntityNotFoundError
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.infrastructure.datastore import read_routing
+
+_EntityFuture = "asyncio.Future[Optional[Entity]]"
+
+
+class _EntityLoader:
+    """_EntityLoader batches the loads requested on one event loop"""
+
+    def __init__(
+        self,
+        repo: IEntityRepo,
+        loop: asyncio.AbstractEventLoop,
+        max_batch_size: int,
+        max_wait: float,
+    ):
+        self._repo = repo
+        self._loop = loop
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        # every load requested and not yet completed, whether dispatched or not,
+        # which later loads of the same entity_id may join
+        self._in_flight: Dict[pydantic.UUID4, _EntityFuture] = {}
+        # loads not yet dispatched; one forgotten while pending is kept alongside
+        # the load requested after it, and read in the same batch
+        self._pending: Dict[pydantic.UUID4, List[_EntityFuture]] = {}
+        self._dispatch_handle: Optional[asyncio.Handle] = None
+        # running batches, referenced until done so they are not garbage collected
+        self._batches: Set[asyncio.Task] = set()
+
+    def load(self, entity_id: pydantic.UUID4) -> _EntityFuture:
+        future = self._in_flight.get(entity_id)
+        if future is not None:
+            return future
+        future = self._in_flight[entity_id] = self._loop.create_future()
+        self._pending.setdefault(entity_id, []).append(future)
+        if len(self._pending) >= self._max_batch_size:
+            self._dispatch()
+        elif self._dispatch_handle is None:
+            # call_soon runs once every callback ready in this tick has run,
+            # gathering the loads all of them requested
+            self._dispatch_handle = (
+                self._loop.call_later(self._max_wait, self._dispatch)
+                if self._max_wait > 0
+                else self._loop.call_soon(self._dispatch)
+            )
+        return future
+
+    def forget(self, entity_id: pydantic.UUID4) -> None:
+        """forget keeps later loads of `entity_id` from joining one already requested,
+        which may have read the Entity before it was last written, or, not yet
+        dispatched, be routed to a replica yet to replay the write
+        """
+        self._in_flight.pop(entity_id, None)
+
+    def _dispatch(self) -> None:
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = self._loop.create_task(self._load(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _load(self, batch: Dict[pydantic.UUID4, List[_EntityFuture]]) -> None:
+        try:
+            entities = await self._repo.get_many(list(batch))
+            entities_by_id = {entity.entity_id: entity for entity in entities}
+            for entity_id, futures in batch.items():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(entities_by_id.get(entity_id))
+        except Exception as e:  # pylint: disable=broad-except
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                        # retrieved, so that it is not logged if every waiter gave up
+                        future.exception()
+        finally:
+            for entity_id, futures in batch.items():
+                for future in futures:
+                    if not future.done():
+                        future.cancel()
+                    if self._in_flight.get(entity_id) is future:
+                        del self._in_flight[entity_id]
+
+
+class CoalescingEntityRepo(IEntityRepo):
+    """CoalescingEntityRepo merges concurrent `get` calls into fewer reads of the wrapped repo
+
+    Concurrent gets of the same entity_id share a single read of it, and gets of
+    different entity_ids made within the same event loop tick, or `max_wait` seconds
+    when given, are read together with one `get_many` of up to `max_batch_size` ids.
+    So a burst of requests for a hot aggregate costs one query rather than one each.
+
+    A get made after a write through this repo never joins a read requested before it.
+    A joined read is made in the context of the get which began it, so on a replica set,
+    it is routed as that get would have been. Gets of a task whose reads are pinned
+    to the primary, having written, are therefore never coalesced, but read on their own;
+    see `read_routing`.
+
+    Loads are batched per event loop, so one instance may serve several loops.
+    Every other operation is passed straight through.
+    """
+
+    def __init__(
+        self, repo: IEntityRepo, max_batch_size: int = 100, max_wait: float = 0
+    ):
+        self._repo = repo
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._loaders: (
+            "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _EntityLoader]"
+        ) = weakref.WeakKeyDictionary()
+
+    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+        if read_routing.is_pinned_to_primary():
+            return await self._repo.get(entity_id)
+        # shielded, so that a caller giving up does not cancel the read for the others
+        entity = await asyncio.shield(self._loader().load(entity_id))
+        if entity is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        # the same Entity is handed to every caller sharing the read, so each gets a copy
+        return entity.copy()
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        return await self._repo.get_many(entity_ids)
+
+    async def get_updated_at(self, entity_id: pydantic.UUID4) -> datetime.datetime:
+        return await self._repo.get_updated_at(entity_id)
+
+    async def where(
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
+    ) -> EntityList:
+        return await self._repo.where(
+            page=page, size=size, cursor=cursor, count=count, spec=spec, sort=sort
+        )
+
+    def iterate(self) -> AsyncIterator[Entity]:
+        return self._repo.iterate()
+
+    async def create(self, entity: Entity) -> Entity:
+        try:
+            return await self._repo.create(entity)
+        finally:
+            self._forget([entity.entity_id])
+
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        try:
+            return await self._repo.create_many(entities, batch_size=batch_size)
+        finally:
+            self._forget([entity.entity_id for entity in entities])
+
+    async def create_or_update(self, entity: Entity) -> Entity:
+        try:
+            return await self._repo.create_or_update(entity)
+        finally:
+            self._forget([entity.entity_id])
+
+    async def update(self, entity: Entity) -> Entity:
+        try:
+            return await self._repo.update(entity)
+        finally:
+            self._forget([entity.entity_id])
+
+    async def delete(self, entity_id: pydantic.UUID4) -> Entity:
+        try:
+            return await self._repo.delete(entity_id)
+        finally:
+            self._forget([entity_id])
+
+    async def write_changes(
+        self,
+        *,
+        new: Sequence[Entity] = (),
+        dirty: Sequence[Entity] = (),
+        deleted: Sequence[pydantic.UUID4] = (),
+    ) -> None:
+        try:
+            await self._repo.write_changes(new=new, dirty=dirty, deleted=deleted)
+        finally:
+            self._forget([*(entity.entity_id for entity in (*new, *dirty)), *deleted])
+
+    def _loader(self) -> _EntityLoader:
+        loop = asyncio.get_running_loop()
+        loader = self._loaders.get(loop)
+        if loader is None:
+            loader = self._loaders[loop] = _EntityLoader(
+                self._repo, loop, self._max_batch_size, self._max_wait
+            )
+        return loader
+
+    def _forget(self, entity_ids: Sequence[pydantic.UUID4]) -> None:
+        loader = self._loaders.get(asyncio.get_running_loop())
+        if loader is not None:
+            for entity_id in entity_ids:
+                loader.forget(entity_id)
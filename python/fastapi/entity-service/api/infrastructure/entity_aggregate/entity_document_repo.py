@@ -0,0 +1,52 @@
+from typing import Dict, List, Sequence
+
+from asyncpg import Record
+
+from api.domain.entity_aggregate.entity import Entity
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.entity_aggregate import entity_repo_statements as statements
+from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+
+
+class PGEntityDocumentRepo(PGEntityRepo):
+    """PGEntityDocumentRepo stores each Entity aggregate as a single row of the
+    entity_document table, embedding its child entities as a JSONB array
+
+    Child entities only exist within their entity, which holds at most
+    MAX_CHILD_ENTITY_COUNT of them, so they need no table of their own. Reading or
+    writing an aggregate touches its one row: reads need no join and no second query
+    for child entities, and writes have no child entity rows to upsert, link or delete.
+
+    It takes the same options, and otherwise behaves the same, as PGEntityRepo.
+    The two store aggregates in separate tables, so switching between them
+    means migrating the aggregates stored.
+    """
+
+    READS = statements.READ_ENTITY_DOCUMENTS
+    WRITES = statements.WRITE_ENTITY_DOCUMENTS
+    WRITES_EMITTING_EVENTS = statements.WRITE_ENTITY_DOCUMENTS_EMITTING_EVENTS
+
+    async def _to_entities(
+        self, db_client: PGClient, db_entities: Sequence[Record]
+    ) -> List[Entity]:
+        return [
+            self._to_entity_with_json_child_entities(db_entity)
+            for db_entity in db_entities
+        ]
+
+    def _aggregates_params(self, entities: Sequence[Entity]) -> Dict:
+        """_aggregates_params binds whole aggregates to the statements writing
+        any number of them; see `entity_repo_statements._entity_document_rows`
+        """
+        child_entities = [
+            (entity.entity_id, child_entity)
+            for entity in entities
+            for child_entity in entity.child_entities
+        ]
+        return {
+            **self._entity_adapter.columns_from_entities(entities),
+            **self._entity_adapter.columns_from_child_entities(
+                [child_entity for _, child_entity in child_entities]
+            ),
+            "parent_entity_id": [entity_id for entity_id, _ in child_entities],
+        }
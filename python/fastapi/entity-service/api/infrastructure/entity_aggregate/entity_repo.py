@@ -1,83 +1,395 @@
+import datetime
+import functools
 import uuid
-from typing import Dict, List, Mapping, Optional
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Type
 
 import pydantic
-from databases import Database
-from databases.backends.postgres import Record
-from sqlalchemy.sql import Insert
+from asyncpg import Record
 
-from api.domain.entity_aggregate.entity import ChildEntity, Entity, EntityList
-from api.domain.entity_aggregate.entity_repo import IEntityRepo
-from api.infrastructure.datastore.postgres.tables import (
-    CHILD_ENTITY_TABLE,
-    ENTITY_CHILD_ENTITY_TABLE,
-    ENTITY_TABLE,
+from api.domain.entity_aggregate.entity import (
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_cursor import EntityCursor
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
 )
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+from api.infrastructure.datastore.cache.lru_ttl_cache import LRUTTLCache
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.pg_replica_set import PGReplicaSet
+from api.infrastructure.entity_aggregate import entity_repo_statements as statements
 from api.infrastructure.entity_aggregate.entity_repo_adapter import EntityRepoAdapter
 
 
 class PGEntityRepo(IEntityRepo):
-    _entity_table = ENTITY_TABLE
-    _child_entity_table = CHILD_ENTITY_TABLE
-    _entity_child_entity_table = ENTITY_CHILD_ENTITY_TABLE
-    _entity_adapter = EntityRepoAdapter()
+    """PGEntityRepo stores Entity aggregates across the entity, child_entity
+    and entity_child_entity tables
+
+    Every statement it runs is precompiled, in `entity_repo_statements`.
+
+    Writes go to `db_client`. Reads go to whichever database `replica_set` routes them
+    to, which is `db_client` unless a replica set of its read replicas is given.
+
+    With `emit_events`, every write also records an EntityEvent per aggregate changed
+    in the outbox_event table, within the same statement, for an OutboxPublisher
+    to deliver once committed.
+
+    Listings counted with EntityCountStrategy.CACHED reuse an exact count
+    for `count_cache_ttl` seconds.
+    """
 
-    def __init__(self, db_client: Database):
+    # bounds the rows written, and the arrays bound, per create_many transaction
+    MAX_BULK_BATCH_SIZE = 2000
+
+    # the number of filters whose CACHED counts are kept at once
+    COUNT_CACHE_MAX_SIZE = 256
+
+    # the statements reading and writing the storage layout of the aggregates
+    READS = statements.READ_ENTITIES
+    WRITES = statements.WRITE_ENTITIES
+    WRITES_EMITTING_EVENTS = statements.WRITE_ENTITIES_EMITTING_EVENTS
+
+    def __init__(
+        self,
+        db_client: PGClient,
+        bulk_batch_size: int = 500,
+        trusted_rehydration: bool = False,
+        replica_set: Optional[PGReplicaSet] = None,
+        emit_events: bool = False,
+        count_cache_ttl: float = 10.0,
+    ):
         self._db_client = db_client
+        self._writes = self.WRITES_EMITTING_EVENTS if emit_events else self.WRITES
+        self._replica_set = replica_set or PGReplicaSet(db_client)
+        self._bulk_batch_size = min(bulk_batch_size, self.MAX_BULK_BATCH_SIZE)
+        self._entity_adapter = EntityRepoAdapter(trusted=trusted_rehydration)
+        self._count_cache: LRUTTLCache[str, int] = LRUTTLCache(
+            max_size=self.COUNT_CACHE_MAX_SIZE, ttl_seconds=count_cache_ttl
+        )
 
     async def get(self, entity_id: pydantic.UUID4) -> Entity:
-        pass
+        entities = await self.get_many([entity_id])
+        if not entities:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        return entities[0]
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        # dict preserves the requested order while dropping duplicate ids
+        entity_ids = list(dict.fromkeys(entity_ids))
+        if not entity_ids:
+            return []
+        db_client = await self._replica_set.reader()
+        db_entities: List[Record] = await db_client.fetch_all(
+            self.READS.select_many, entity_ids=entity_ids
+        )
+        entities_by_id = {
+            entity.entity_id: entity
+            for entity in await self._to_entities(db_client, db_entities)
+        }
+        return [
+            entities_by_id[entity_id]
+            for entity_id in entity_ids
+            if entity_id in entities_by_id
+        ]
+
+    async def get_updated_at(self, entity_id: pydantic.UUID4) -> datetime.datetime:
+        db_client = await self._replica_set.reader()
+        db_entity: Optional[Record] = await db_client.fetch_one(
+            self.READS.select_updated_at, entity_id=entity_id
+        )
+        if db_entity is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        return db_entity["updated_at"]
 
     async def where(
-        self, page: Optional[int] = None, size: Optional[int] = None
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
     ) -> EntityList:
-        pass
+        page, size = self._page_bounds(page, size)
+        spec = spec or EntityFilter()
+        filter_params = statements.entity_filter_params(spec)
+        db_client = await self._replica_set.reader()
+        select_page = functools.partial(
+            statements.select_page,
+            self.READS.table,
+            filter_params.is_active,
+            filter_params.conditions,
+            sort,
+        )
+        # fetch one extra row to learn whether there is a next page
+        if cursor is not None:
+            after_timestamp, after_entity_id = EntityCursor.decode(cursor).position(
+                sort
+            )
+            db_entities: List[Record] = await db_client.fetch_all(
+                select_page(after=True),
+                after_timestamp=after_timestamp,
+                after_entity_id=after_entity_id,
+                limit=size + 1,
+                **filter_params.params,
+            )
+            page = None
+        else:
+            db_entities = await db_client.fetch_all(
+                select_page(after=False),
+                limit=size + 1,
+                offset=page * size,
+                **filter_params.params,
+            )
+        db_entities, has_next = db_entities[:size], len(db_entities) > size
+        entities = await self._to_entities(db_client, db_entities)
+        next_cursor = (
+            EntityCursor.from_entity(entities[-1]).encode() if has_next else None
+        )
+        return EntityList(
+            entities=entities,
+            page=page,
+            size=size,
+            next_cursor=next_cursor,
+            total=(
+                await self._count(db_client, count, spec, filter_params)
+                if count is not None
+                else None
+            ),
+        )
+
+    async def _count(
+        self,
+        db_client: PGClient,
+        count: EntityCountStrategy,
+        spec: EntityFilter,
+        filter_params: statements.EntityFilterParams,
+    ) -> int:
+        # the planner's estimate is of the whole table, so a filtered count is exact
+        if count is EntityCountStrategy.ESTIMATE and spec == EntityFilter():
+            db_estimate: Record = await db_client.fetch_one(self.READS.estimate_count)
+            # the table has yet to be analyzed, which autovacuum does once it has grown
+            if db_estimate[0] is not None:
+                return db_estimate[0]
+        elif count is EntityCountStrategy.CACHED:
+            cache_key = spec.json(exclude_none=True)
+            total = self._count_cache.get(cache_key)
+            if total is None:
+                total = await self._count(
+                    db_client, EntityCountStrategy.EXACT, spec, filter_params
+                )
+                self._count_cache.set(cache_key, total)
+            return total
+        db_count: Record = await db_client.fetch_one(
+            statements.count(
+                self.READS.table, filter_params.is_active, filter_params.conditions
+            ),
+            **filter_params.params,
+        )
+        return db_count[0]
+
+    async def iterate(self) -> AsyncIterator[Entity]:
+        # the cursor holds its connection for as long as the iteration runs,
+        # so child entities cannot be fetched with a second query in the meantime.
+        # Instead each row carries its own child entities, aggregated as JSON.
+        # Rows are pulled through the cursor as they are consumed.
+        db_client = await self._replica_set.reader()
+        async for db_entity in db_client.iterate(self.READS.select_all):
+            yield self._to_entity_with_json_child_entities(db_entity)
 
     async def create(self, entity: Entity) -> Entity:
-        serialized_entity: Mapping = self._entity_adapter.from_entity(entity)
-        serialized_child_entities: List[Mapping] = [
-            child_entity.dict() for child_entity in entity.child_entities
-        ]
-        serialized_entity_child_entities = [
-            {
-                "entity_child_entity_id": uuid.uuid4(),
-                "entity_id": entity.entity_id,
-                "child_entity_id": child_entity.child_entity_id,
-            }
-            for child_entity in entity.child_entities
-        ]
-        child_entity_insert: Insert = (
-            self._child_entity_table.insert()
-            .values(serialized_child_entities)
-            .returning(*[column for column in self._child_entity_table.columns])
-        )
-        entity_insert: Insert = (
-            self._entity_table.insert()
-            .values(serialized_entity)
-            .returning(*[column for column in self._entity_table.columns])
-        )
-        entity_child_entity_insert: Insert = (
-            self._entity_child_entity_table.insert()
-            .values(serialized_entity_child_entities)
-            .returning(*[column for column in self._entity_child_entity_table.columns])
-        )
-        async with self._db_client.transaction():
-            db_entity: Record = await self._db_client.fetch_one(entity_insert)
-            # we assume the child entities don't exist yet in a standard create entity flow;
-            # child entities only exist in the context of the parent entity
-            db_child_entities: List[Record] = await self._db_client.fetch_all(
-                child_entity_insert
+        # we assume the child entities don't exist yet in a standard create entity flow;
+        # child entities only exist in the context of the parent entity
+        db_entity: Optional[Record] = await self._db_client.fetch_one(
+            self._writes.insert, **self._aggregates_params([entity])
+        )
+        if db_entity is None:
+            raise EntityAlreadyExistsError(
+                field="entity_id", value=str(entity.entity_id)
             )
-            _db_entity_child_entities: List[Record] = await self._db_client.fetch_all(
-                entity_child_entity_insert
+        self._replica_set.written()
+        return self._to_entity_with_json_child_entities(db_entity)
+
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        batch_size = min(batch_size or self._bulk_batch_size, self.MAX_BULK_BATCH_SIZE)
+        # an entity_id submitted twice would be written once, but with the child
+        # entities of both; only the first is kept, as if the others already existed
+        unique_entities: Dict[pydantic.UUID4, Entity] = {}
+        for entity in entities:
+            unique_entities.setdefault(entity.entity_id, entity)
+        entities = list(unique_entities.values())
+        created_entities: List[Entity] = []
+        for i in range(0, len(entities), batch_size):
+            created_entities.extend(
+                await self._create_batch(entities[i : i + batch_size])
             )
-        return self._entity_adapter.to_entity(db_entity, db_child_entities)
+        return created_entities
+
+    async def _create_batch(self, entities: Sequence[Entity]) -> List[Entity]:
+        """_create_batch writes a batch of aggregates in one statement
+
+        Entities whose entity_id already exists are skipped by ON CONFLICT DO NOTHING,
+        and only the child entities of the entities actually inserted are written.
+        """
+        db_entities: List[Record] = await self._db_client.fetch_all(
+            self._writes.insert, **self._aggregates_params(entities)
+        )
+        self._replica_set.written()
+        db_entities_by_id = {
+            db_entity["entity_id"]: db_entity for db_entity in db_entities
+        }
+        return [
+            self._to_entity_with_json_child_entities(
+                db_entities_by_id[entity.entity_id]
+            )
+            for entity in entities
+            if entity.entity_id in db_entities_by_id
+        ]
 
     async def create_or_update(self, entity: Entity) -> Entity:
-        pass
+        db_entity: Record = await self._db_client.fetch_one(
+            self._writes.upsert, **self._aggregates_params([entity])
+        )
+        self._replica_set.written()
+        return self._to_entity_with_json_child_entities(db_entity)
 
     async def update(self, entity: Entity) -> Entity:
-        pass
+        db_entity: Optional[Record] = await self._db_client.fetch_one(
+            self._writes.update, **self._aggregates_params([entity])
+        )
+        if db_entity is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity.entity_id))
+        self._replica_set.written()
+        return self._to_entity_with_json_child_entities(db_entity)
 
     async def delete(self, entity_id: pydantic.UUID4) -> Entity:
-        pass
+        db_entity: Optional[Record] = await self._db_client.fetch_one(
+            self._writes.delete, entity_ids=[entity_id]
+        )
+        if db_entity is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        self._replica_set.written()
+        return self._to_entity_with_json_child_entities(db_entity)
+
+    async def write_changes(
+        self,
+        *,
+        new: Sequence[Entity] = (),
+        dirty: Sequence[Entity] = (),
+        deleted: Sequence[pydantic.UUID4] = (),
+    ) -> None:
+        # one statement per kind of change, whatever the number of aggregates changed
+        async with self._db_client.transaction(name="write_changes"):
+            if deleted:
+                db_entities: List[Record] = await self._db_client.fetch_all(
+                    self._writes.delete, entity_ids=list(deleted)
+                )
+                _raise_for_missing(deleted, db_entities, EntityNotFoundError)
+            if new:
+                db_entities = await self._db_client.fetch_all(
+                    self._writes.insert, **self._aggregates_params(new)
+                )
+                _raise_for_missing(
+                    [entity.entity_id for entity in new],
+                    db_entities,
+                    EntityAlreadyExistsError,
+                )
+            if dirty:
+                db_entities = await self._db_client.fetch_all(
+                    self._writes.update, **self._aggregates_params(dirty)
+                )
+                _raise_for_missing(
+                    [entity.entity_id for entity in dirty],
+                    db_entities,
+                    EntityNotFoundError,
+                )
+        self._replica_set.written()
+
+    def _aggregates_params(self, entities: Sequence[Entity]) -> Dict:
+        """_aggregates_params binds whole aggregates to the statements which write
+        any number of them in a single round trip;
+        see `entity_repo_statements._write_aggregates`
+        """
+        child_entities = [
+            (entity.entity_id, child_entity)
+            for entity in entities
+            for child_entity in entity.child_entities
+        ]
+        return {
+            **self._entity_adapter.columns_from_entities(entities),
+            **self._entity_adapter.columns_from_child_entities(
+                [child_entity for _, child_entity in child_entities]
+            ),
+            # only used for child entities not yet linked to their entity
+            "entity_child_entity_id": [uuid.uuid4() for _ in child_entities],
+            "parent_entity_id": [entity_id for entity_id, _ in child_entities],
+        }
+
+    async def _to_entities(
+        self, db_client: PGClient, db_entities: Sequence[Record]
+    ) -> List[Entity]:
+        """_to_entities rehydrates the aggregates of entity rows read from `db_client`
+
+        Two round trips regardless of how many entities were read:
+        one for the entity rows and one for all of their child entities.
+        """
+        db_child_entities = await self._fetch_child_entities(
+            db_client, [db_entity["entity_id"] for db_entity in db_entities]
+        )
+        return [
+            self._entity_adapter.to_entity(
+                db_entity, db_child_entities[db_entity["entity_id"]]
+            )
+            for db_entity in db_entities
+        ]
+
+    def _to_entity_with_json_child_entities(self, db_entity: Record) -> Entity:
+        return self._entity_adapter.to_entity(
+            db_entity,
+            self._entity_adapter.child_entities_from_json(db_entity["child_entities"]),
+        )
+
+    @staticmethod
+    async def _fetch_child_entities(
+        db_client: PGClient, entity_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, List[Record]]:
+        """_fetch_child_entities loads the child entities of many entities in one query,
+        from the same database their entities were read from
+        """
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return {}
+        db_child_entities: List[Record] = await db_client.fetch_all(
+            statements.SELECT_CHILD_ENTITIES_BY_ENTITY_ID, entity_ids=entity_ids
+        )
+        db_child_entities_by_entity_id: Dict[uuid.UUID, List[Record]] = defaultdict(
+            list
+        )
+        for db_child_entity in db_child_entities:
+            db_child_entities_by_entity_id[db_child_entity["entity_id"]].append(
+                db_child_entity
+            )
+        return db_child_entities_by_entity_id
+
+
+def _raise_for_missing(
+    entity_ids: Sequence[uuid.UUID],
+    db_entities: Sequence[Record],
+    error: Type[Exception],
+) -> None:
+    """_raise_for_missing raises `error` for the first of `entity_ids` which a statement
+    writing them returned no row for, rolling back the enclosing transaction
+    """
+    if len(db_entities) == len(entity_ids):
+        return
+    written_entity_ids = {db_entity["entity_id"] for db_entity in db_entities}
+    for entity_id in entity_ids:
+        if entity_id not in written_entity_ids:
+            raise error(field="entity_id", value=str(entity_id))
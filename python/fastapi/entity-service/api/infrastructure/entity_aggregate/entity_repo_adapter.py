@@ -1,11 +1,27 @@
-from typing import Iterable, Mapping
+import json
+import uuid
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Sequence
 
-from databases.backends.postgres import Record
+from asyncpg import Record
 
-from api.domain.entity_aggregate.entity import ChildEntity, Entity
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
 
 
 class EntityRepoAdapter:
+    """EntityRepoAdapter translates between Entity aggregates and their database rows
+
+    By default, rows are rehydrated through `Entity.parse_obj`, re-running all validation.
+    A `trusted` adapter instead builds the aggregate directly from the row values with
+    pydantic's `construct`, skipping validators, type coercion, and the timestamp defaults
+    of `CreatedAtUpdatedAtBaseModel.__init__`. This is only safe for rows written through
+    the domain model in the first place, where every invariant was already enforced on
+    the way in; rows written by anything else should be read with validation on.
+    """
+
+    def __init__(self, trusted: bool = False):
+        self._trusted = trusted
+
     def from_entity(self, entity: Entity) -> Mapping:
         entity_data = entity.dict(exclude={"bar_value", "child_entities"})
         entity_data.update(
@@ -16,15 +32,58 @@ class EntityRepoAdapter:
         )
         return entity_data
 
+    def columns_from_entities(self, entities: Sequence[Entity]) -> Dict[str, List]:
+        """columns_from_entities lays out the entity rows of many Entities column by column,
+        as bound to statements which insert rows from arrays
+        """
+        return {
+            "entity_id": [entity.entity_id for entity in entities],
+            "bar_value_object_attribute_0": [
+                entity.bar_value.attribute_0 for entity in entities
+            ],
+            "bar_value_object_attribute_1": [
+                entity.bar_value.attribute_1 for entity in entities
+            ],
+            "is_active": [entity.is_active for entity in entities],
+            "created_at": [entity.created_at for entity in entities],
+            "updated_at": [entity.updated_at for entity in entities],
+        }
+
+    def columns_from_child_entities(
+        self, child_entities: Sequence[ChildEntity]
+    ) -> Dict[str, List]:
+        return {
+            "child_entity_id": [
+                child_entity.child_entity_id for child_entity in child_entities
+            ],
+            "attribute_a": [
+                child_entity.attribute_a for child_entity in child_entities
+            ],
+            "attribute_b": [
+                child_entity.attribute_b for child_entity in child_entities
+            ],
+            "attribute_c": [
+                child_entity.attribute_c for child_entity in child_entities
+            ],
+        }
+
+    def child_entities_from_json(self, child_entities_json: str) -> List[Mapping]:
+        """child_entities_from_json reads child entities aggregated into a JSON array
+        by the database, keeping numeric attributes exact by parsing them as Decimal
+        """
+        return json.loads(child_entities_json, parse_float=Decimal)
+
     def to_entity(
         self, entity_data: Record, child_entities_data: Iterable[Record]
     ) -> Entity:
+        if self._trusted:
+            return self._construct_entity(entity_data, child_entities_data)
         entity_data_raw = dict(entity_data)
         entity_data_raw.update(
             {
                 "bar_value": {
-                    "attribute_0": getattr(entity_data, "bar_value_object_attribute_0"),
-                    "attribute_1": getattr(entity_data, "bar_value_object_attribute_1"),
+                    "attribute_0": entity_data["bar_value_object_attribute_0"],
+                    "attribute_1": entity_data["bar_value_object_attribute_1"],
                 },
                 "child_entities": [
                     dict(child_entity_data) for child_entity_data in child_entities_data
@@ -33,3 +92,37 @@ class EntityRepoAdapter:
         )
         entity = Entity.parse_obj(entity_data_raw)
         return entity
+
+    @staticmethod
+    def _construct_entity(
+        entity_data: Record, child_entities_data: Iterable[Mapping]
+    ) -> Entity:
+        return Entity.construct(
+            entity_id=entity_data["entity_id"],
+            child_entities=tuple(
+                ChildEntity.construct(
+                    # child entities aggregated as JSON carry their ids as strings
+                    # and whole-numbered Decimals as ints
+                    child_entity_id=(
+                        child_entity_data["child_entity_id"]
+                        if isinstance(child_entity_data["child_entity_id"], uuid.UUID)
+                        else uuid.UUID(child_entity_data["child_entity_id"])
+                    ),
+                    attribute_a=child_entity_data["attribute_a"],
+                    attribute_b=child_entity_data["attribute_b"],
+                    attribute_c=(
+                        child_entity_data["attribute_c"]
+                        if isinstance(child_entity_data["attribute_c"], Decimal)
+                        else Decimal(child_entity_data["attribute_c"])
+                    ),
+                )
+                for child_entity_data in child_entities_data
+            ),
+            bar_value=BarValueObject.construct(
+                attribute_0=entity_data["bar_value_object_attribute_0"],
+                attribute_1=entity_data["bar_value_object_attribute_1"],
+            ),
+            is_active=entity_data["is_active"],
+            created_at=entity_data["created_at"],
+            updated_at=entity_data["updated_at"],
+        )
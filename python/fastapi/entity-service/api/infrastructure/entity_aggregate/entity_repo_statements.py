@@ -0,0 +1,835 @@
+"""Statements run by PGEntityRepo and PGEntityDocumentRepo, each built and compiled once
+at import time
+
+Statements which read or write many rows bind one array per column,
+so that a single statement serves any number of rows.
+"""
+
+import functools
+import operator
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.selectable import CTE, TableValuedAlias
+from sqlalchemy.types import TypeEngine
+
+from api.domain.entity_aggregate.entity_event import EntityEventType
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+from api.infrastructure.datastore.postgres.tables import (
+    CHILD_ENTITY_TABLE,
+    ENTITY_CHILD_ENTITY_TABLE,
+    ENTITY_DOCUMENT_TABLE,
+    ENTITY_TABLE,
+    OUTBOX_EVENT_TABLE,
+)
+
+_CHILD_ENTITIES_JOIN = ENTITY_CHILD_ENTITY_TABLE.join(
+    CHILD_ENTITY_TABLE,
+    ENTITY_CHILD_ENTITY_TABLE.c.child_entity_id == CHILD_ENTITY_TABLE.c.child_entity_id,
+)
+
+
+def _unnest_insert(table: sa.Table) -> postgresql.Insert:
+    """_unnest_insert inserts rows from one array parameter per column, named after it,
+    zipped into rows by `unnest`
+    """
+    return postgresql.insert(table).from_select(
+        [column.name for column in table.columns],
+        sa.select(sa.literal_column("*")).select_from(
+            sa.func.unnest(
+                *[
+                    sa.cast(sa.bindparam(column.name), postgresql.ARRAY(column.type))
+                    for column in table.columns
+                ]
+            )
+        ),
+    )
+
+
+def _json_array_of_child_entities(child_entities: sa.sql.FromClause) -> sa.sql.Select:
+    """_json_array_of_child_entities aggregates child entity rows into one JSON array"""
+    return sa.select(
+        sa.func.coalesce(
+            sa.func.json_agg(
+                sa.func.json_build_object(
+                    *[
+                        element
+                        for column in CHILD_ENTITY_TABLE.columns
+                        for element in (
+                            sa.literal_column(f"'{column.name}'"),
+                            child_entities.c[column.name],
+                        )
+                    ]
+                )
+            ),
+            sa.text("'[]'::json"),
+        )
+    )
+
+
+def _child_entities_json_column() -> sa.sql.ColumnElement:
+    """_child_entities_json_column is a correlated subquery aggregating
+    the child entities of each selected entity row into a JSON array
+    """
+    return (
+        _json_array_of_child_entities(CHILD_ENTITY_TABLE)
+        .select_from(_CHILD_ENTITIES_JOIN)
+        .where(ENTITY_CHILD_ENTITY_TABLE.c.entity_id == ENTITY_TABLE.c.entity_id)
+        .scalar_subquery()
+        .label("child_entities")
+    )
+
+
+def _unnest(
+    name: str,
+    columns: Sequence[Tuple[str, TypeEngine]],
+    with_ordinality: Optional[str] = None,
+) -> TableValuedAlias:
+    """_unnest zips one array parameter per column, named after it, into rows;
+    `with_ordinality` names an extra column numbering the rows in the order bound
+    """
+    return (
+        sa.func.unnest(
+            *[
+                sa.cast(sa.bindparam(column_name), postgresql.ARRAY(column_type))
+                for column_name, column_type in columns
+            ]
+        )
+        .table_valued(
+            *[column_name for column_name, _ in columns],
+            with_ordinality=with_ordinality,
+        )
+        .render_derived(name=name)
+    )
+
+
+_ENTITY_ROW_COLUMNS = [(column.name, column.type) for column in ENTITY_TABLE.columns]
+
+# child entity rows also carry the id of the entity holding them, as `parent_entity_id`,
+# and the id of the link to that entity, used if the child entity is not yet linked
+_CHILD_ENTITY_ROW_COLUMNS = [
+    *[(column.name, column.type) for column in CHILD_ENTITY_TABLE.columns],
+    ("entity_child_entity_id", postgresql.UUID()),
+    ("parent_entity_id", postgresql.UUID()),
+]
+
+
+def _json_object(**values: sa.sql.ColumnElement) -> sa.sql.ColumnElement:
+    return sa.func.json_build_object(
+        *[
+            element
+            for key, value in values.items()
+            for element in (sa.literal_column(f"'{key}'"), value)
+        ]
+    )
+
+
+def _insert_outbox_events(aggregates: CTE, event_type: sa.sql.ColumnElement) -> CTE:
+    """_insert_outbox_events records an event of `event_type` in the outbox for each row
+    of `aggregates`, with the aggregate as its payload, serialized like `Entity.json()`
+    """
+    payload = _json_object(
+        entity_id=aggregates.c.entity_id,
+        child_entities=aggregates.c.child_entities,
+        bar_value=_json_object(
+            attribute_0=aggregates.c.bar_value_object_attribute_0,
+            attribute_1=aggregates.c.bar_value_object_attribute_1,
+        ),
+        is_active=aggregates.c.is_active,
+        created_at=aggregates.c.created_at,
+        updated_at=aggregates.c.updated_at,
+    )
+    return (
+        postgresql.insert(OUTBOX_EVENT_TABLE)
+        .from_select(
+            ["event_id", "event_type", "aggregate_id", "payload", "occurred_at"],
+            sa.select(
+                sa.func.gen_random_uuid(),
+                event_type,
+                aggregates.c.entity_id,
+                sa.cast(payload, postgresql.JSONB()),
+                sa.func.now(),
+            ),
+        )
+        .cte("inserted_outbox_events")
+    )
+
+
+def _event_type(event_type: EntityEventType) -> sa.sql.ColumnElement:
+    return sa.literal_column(f"'{event_type.value}'")
+
+
+def _write_aggregates(
+    entity_write: CTE, *, replace_child_entities: bool = True, emit_events: bool = False
+) -> sa.sql.Select:
+    """_write_aggregates completes a write of entity rows, `entity_write`, into a write
+    of their whole aggregates, as one statement of data-modifying CTEs
+
+    Alongside the entity rows, each child entity in the `child_entity_id`, `attribute_*`
+    arrays is upserted and linked to the entity given by `parent_entity_id`, while,
+    with `replace_child_entities`, child entities the entities no longer hold are
+    unlinked and deleted. Without it, child entities are only inserted, as they would
+    be for new entities, and those which already exist are skipped. Either way, a child
+    entity another entity holds is left to it, and not written. Child entities are
+    only written for entities `entity_write` returns a row for. The statement returns
+    the written entity rows, each with its child entities aggregated as JSON,
+    as `child_entities`.
+
+    `entity_write` returns an `inserted` column telling created entities from updated
+    ones; with `emit_events`, each written aggregate is also recorded in the outbox
+    as an event saying which.
+    """
+    written_entity_ids = sa.select(entity_write.c.entity_id)
+    child_entity_rows = sa.select(
+        _unnest("rows", _CHILD_ENTITY_ROW_COLUMNS, with_ordinality="ordinality")
+    ).cte("child_entity_rows")
+    # a child entity bound more than once is only written for the first entity holding it
+    owned_child_entity_rows = sa.select(child_entity_rows).where(
+        child_entity_rows.c.parent_entity_id.in_(written_entity_ids)
+    )
+    if replace_child_entities:
+        # as inserts leave it, a child entity another entity holds is left to it,
+        # rather than overwritten and linked to both entities
+        owned_child_entity_rows = owned_child_entity_rows.where(
+            ~sa.exists()
+            .where(
+                ENTITY_CHILD_ENTITY_TABLE.c.child_entity_id
+                == child_entity_rows.c.child_entity_id
+            )
+            .where(
+                ENTITY_CHILD_ENTITY_TABLE.c.entity_id
+                != child_entity_rows.c.parent_entity_id
+            )
+        )
+    first_child_entity_rows = (
+        owned_child_entity_rows.distinct(child_entity_rows.c.child_entity_id)
+        .order_by(child_entity_rows.c.child_entity_id, child_entity_rows.c.ordinality)
+        .subquery("first_child_entity_rows")
+    )
+    # child entities are written, and so read back, in the order bound
+    written_child_entity_rows = (
+        sa.select(first_child_entity_rows)
+        .order_by(first_child_entity_rows.c.ordinality)
+        .cte("written_child_entity_rows")
+    )
+
+    child_entity_insert = postgresql.insert(CHILD_ENTITY_TABLE).from_select(
+        [column.name for column in CHILD_ENTITY_TABLE.columns],
+        sa.select(
+            *[
+                written_child_entity_rows.c[column.name]
+                for column in CHILD_ENTITY_TABLE.columns
+            ]
+        ),
+    )
+    if replace_child_entities:
+        child_entity_insert = child_entity_insert.on_conflict_do_update(
+            index_elements=[CHILD_ENTITY_TABLE.c.child_entity_id],
+            set_={
+                column.name: child_entity_insert.excluded[column.name]
+                for column in CHILD_ENTITY_TABLE.columns
+                if not column.primary_key
+            },
+        )
+    else:
+        # a child entity which already exists, held by another entity, is left to it
+        child_entity_insert = child_entity_insert.on_conflict_do_nothing(
+            index_elements=[CHILD_ENTITY_TABLE.c.child_entity_id]
+        )
+    written_child_entities = child_entity_insert.returning(
+        *CHILD_ENTITY_TABLE.columns
+    ).cte("written_child_entities")
+    # only the child entities actually written are linked to, and returned with,
+    # their entity
+    written_child_entities_join = written_child_entities.join(
+        written_child_entity_rows,
+        written_child_entities.c.child_entity_id
+        == written_child_entity_rows.c.child_entity_id,
+    )
+    inserted_links = (
+        postgresql.insert(ENTITY_CHILD_ENTITY_TABLE)
+        .from_select(
+            ["entity_child_entity_id", "entity_id", "child_entity_id"],
+            sa.select(
+                written_child_entity_rows.c.entity_child_entity_id,
+                written_child_entity_rows.c.parent_entity_id,
+                written_child_entity_rows.c.child_entity_id,
+            ).select_from(written_child_entities_join),
+        )
+        .on_conflict_do_nothing(index_elements=["entity_id", "child_entity_id"])
+        .cte("inserted_entity_child_entities")
+    )
+    aggregates = sa.select(
+        entity_write,
+        _json_array_of_child_entities(written_child_entities)
+        .select_from(written_child_entities_join)
+        .where(written_child_entity_rows.c.parent_entity_id == entity_write.c.entity_id)
+        .scalar_subquery()
+        .label("child_entities"),
+    ).cte("written_aggregates")
+
+    # CTEs which the final query does not select from still have to be rendered
+    query = sa.select(aggregates).add_cte(inserted_links)
+    if replace_child_entities:
+        deleted_links = (
+            ENTITY_CHILD_ENTITY_TABLE.delete()
+            .where(ENTITY_CHILD_ENTITY_TABLE.c.entity_id.in_(written_entity_ids))
+            .where(
+                ~sa.exists()
+                .where(
+                    child_entity_rows.c.parent_entity_id
+                    == ENTITY_CHILD_ENTITY_TABLE.c.entity_id
+                )
+                .where(
+                    child_entity_rows.c.child_entity_id
+                    == ENTITY_CHILD_ENTITY_TABLE.c.child_entity_id
+                )
+            )
+            .returning(ENTITY_CHILD_ENTITY_TABLE.c.child_entity_id)
+            .cte("deleted_entity_child_entities")
+        )
+        deleted_child_entities = (
+            CHILD_ENTITY_TABLE.delete()
+            .where(
+                CHILD_ENTITY_TABLE.c.child_entity_id.in_(
+                    sa.select(deleted_links.c.child_entity_id)
+                )
+            )
+            .cte("deleted_child_entities")
+        )
+        query = query.add_cte(deleted_child_entities)
+    if emit_events:
+        query = query.add_cte(
+            _insert_outbox_events(
+                aggregates,
+                sa.case(
+                    (aggregates.c.inserted, _event_type(EntityEventType.CREATED)),
+                    else_=_event_type(EntityEventType.UPDATED),
+                ),
+            )
+        )
+    return query
+
+
+def _insert_entities() -> CTE:
+    return (
+        _unnest_insert(ENTITY_TABLE)
+        .on_conflict_do_nothing(index_elements=["entity_id"])
+        .returning(*ENTITY_TABLE.columns, sa.true().label("inserted"))
+        .cte("inserted_entities")
+    )
+
+
+def _upsert_entities() -> CTE:
+    entity_insert = _unnest_insert(ENTITY_TABLE)
+    return (
+        entity_insert.on_conflict_do_update(
+            index_elements=[ENTITY_TABLE.c.entity_id],
+            set_={
+                column.name: entity_insert.excluded[column.name]
+                for column in ENTITY_TABLE.columns
+                if column.name not in ("entity_id", "created_at")
+            },
+        )
+        # a row inserted rather than updated has no deleting transaction yet
+        .returning(
+            *ENTITY_TABLE.columns, sa.literal_column("xmax = 0").label("inserted")
+        ).cte("upserted_entities")
+    )
+
+
+def _update_entities() -> CTE:
+    entity_rows = _unnest("entity_rows", _ENTITY_ROW_COLUMNS)
+    return (
+        ENTITY_TABLE.update()
+        .values(
+            {
+                column.name: entity_rows.c[column.name]
+                for column in ENTITY_TABLE.columns
+                if column.name not in ("entity_id", "created_at")
+            }
+        )
+        .where(ENTITY_TABLE.c.entity_id == entity_rows.c.entity_id)
+        .returning(*ENTITY_TABLE.columns, sa.false().label("inserted"))
+        .cte("updated_entities")
+    )
+
+
+def _delete_aggregates(*, emit_events: bool = False) -> sa.sql.Select:
+    """_delete_aggregates deletes the aggregates of the entities in the `entity_ids` array,
+    returning the deleted entity rows, each with its deleted child entities
+    aggregated as JSON, as `child_entities`
+
+    With `emit_events`, each deleted aggregate is also recorded in the outbox.
+    """
+    entity_ids = sa.bindparam("entity_ids")
+    deleted_links = (
+        ENTITY_CHILD_ENTITY_TABLE.delete()
+        .where(ENTITY_CHILD_ENTITY_TABLE.c.entity_id == sa.any_(entity_ids))
+        .returning(
+            ENTITY_CHILD_ENTITY_TABLE.c.entity_id,
+            ENTITY_CHILD_ENTITY_TABLE.c.child_entity_id,
+        )
+        .cte("deleted_entity_child_entities")
+    )
+    deleted_child_entities = (
+        CHILD_ENTITY_TABLE.delete()
+        .where(
+            CHILD_ENTITY_TABLE.c.child_entity_id.in_(
+                sa.select(deleted_links.c.child_entity_id)
+            )
+        )
+        .returning(*CHILD_ENTITY_TABLE.columns)
+        .cte("deleted_child_entities")
+    )
+    # links are deleted in the same statement, and foreign keys are only checked at its end
+    deleted_entities = (
+        ENTITY_TABLE.delete()
+        .where(ENTITY_TABLE.c.entity_id == sa.any_(entity_ids))
+        .returning(*ENTITY_TABLE.columns)
+        .cte("deleted_entities")
+    )
+    aggregates = sa.select(
+        deleted_entities,
+        _json_array_of_child_entities(deleted_child_entities)
+        .select_from(
+            deleted_child_entities.join(
+                deleted_links,
+                deleted_child_entities.c.child_entity_id
+                == deleted_links.c.child_entity_id,
+            )
+        )
+        .where(deleted_links.c.entity_id == deleted_entities.c.entity_id)
+        .scalar_subquery()
+        .label("child_entities"),
+    ).cte("deleted_aggregates")
+    query = sa.select(aggregates)
+    if emit_events:
+        query = query.add_cte(
+            _insert_outbox_events(aggregates, _event_type(EntityEventType.DELETED))
+        )
+    return query
+
+
+class EntityWriteStatements(NamedTuple):
+    """EntityWriteStatements each write any number of whole aggregates in one round trip"""
+
+    insert: PGStatement
+    upsert: PGStatement
+    update: PGStatement
+    delete: PGStatement
+
+
+def _entity_write_statements(emit_events: bool) -> EntityWriteStatements:
+    return EntityWriteStatements(
+        insert=PGStatement(
+            "entity.insert_many",
+            _write_aggregates(
+                _insert_entities(),
+                replace_child_entities=False,
+                emit_events=emit_events,
+            ),
+        ),
+        upsert=PGStatement(
+            "entity.upsert_many",
+            _write_aggregates(_upsert_entities(), emit_events=emit_events),
+        ),
+        update=PGStatement(
+            "entity.update_many",
+            _write_aggregates(_update_entities(), emit_events=emit_events),
+        ),
+        delete=PGStatement(
+            "entity.delete_many", _delete_aggregates(emit_events=emit_events)
+        ),
+    )
+
+
+# child entity rows embedded in entity documents carry the id of the entity
+# holding them, as `parent_entity_id`, and are embedded in the order bound,
+# by their `ordinality`
+_CHILD_ENTITY_DOCUMENT_ROW_COLUMNS = [
+    *[(column.name, column.type) for column in CHILD_ENTITY_TABLE.columns],
+    ("parent_entity_id", postgresql.UUID()),
+]
+
+
+def _entity_document_rows() -> sa.sql.Select:
+    """_entity_document_rows zips the entity row and child entity row arrays
+    of whole aggregates, as bound to the statements writing them, into entity document
+    rows, each embedding its child entities as a JSONB array
+    """
+    entity_rows = _unnest("entity_rows", _ENTITY_ROW_COLUMNS)
+    child_entity_rows = _unnest(
+        "child_entity_rows",
+        _CHILD_ENTITY_DOCUMENT_ROW_COLUMNS,
+        with_ordinality="ordinality",
+    )
+    # grouped once, rather than once per entity row by a correlated subquery
+    child_entity_documents = (
+        sa.select(
+            child_entity_rows.c.parent_entity_id,
+            sa.func.jsonb_agg(
+                postgresql.aggregate_order_by(
+                    sa.func.jsonb_build_object(
+                        *[
+                            element
+                            for column in CHILD_ENTITY_TABLE.columns
+                            for element in (
+                                sa.literal_column(f"'{column.name}'"),
+                                child_entity_rows.c[column.name],
+                            )
+                        ]
+                    ),
+                    child_entity_rows.c.ordinality,
+                )
+            ).label("child_entities"),
+        )
+        .group_by(child_entity_rows.c.parent_entity_id)
+        .subquery("child_entity_documents")
+    )
+    return sa.select(
+        *[entity_rows.c[column.name] for column in ENTITY_TABLE.columns],
+        sa.func.coalesce(
+            child_entity_documents.c.child_entities, sa.text("'[]'::jsonb")
+        ).label("child_entities"),
+    ).select_from(
+        entity_rows.outerjoin(
+            child_entity_documents,
+            child_entity_documents.c.parent_entity_id == entity_rows.c.entity_id,
+        )
+    )
+
+
+def _insert_entity_documents() -> CTE:
+    return (
+        postgresql.insert(ENTITY_DOCUMENT_TABLE)
+        .from_select(
+            [column.name for column in ENTITY_DOCUMENT_TABLE.columns],
+            _entity_document_rows(),
+        )
+        .on_conflict_do_nothing(index_elements=["entity_id"])
+        .returning(*ENTITY_DOCUMENT_TABLE.columns, sa.true().label("inserted"))
+        .cte("inserted_entities")
+    )
+
+
+def _upsert_entity_documents() -> CTE:
+    entity_document_insert = postgresql.insert(ENTITY_DOCUMENT_TABLE).from_select(
+        [column.name for column in ENTITY_DOCUMENT_TABLE.columns],
+        _entity_document_rows(),
+    )
+    return (
+        entity_document_insert.on_conflict_do_update(
+            index_elements=[ENTITY_DOCUMENT_TABLE.c.entity_id],
+            set_={
+                column.name: entity_document_insert.excluded[column.name]
+                for column in ENTITY_DOCUMENT_TABLE.columns
+                if column.name not in ("entity_id", "created_at")
+            },
+        )
+        # a row inserted rather than updated has no deleting transaction yet
+        .returning(
+            *ENTITY_DOCUMENT_TABLE.columns,
+            sa.literal_column("xmax = 0").label("inserted"),
+        ).cte("upserted_entities")
+    )
+
+
+def _update_entity_documents() -> CTE:
+    entity_document_rows = _entity_document_rows().subquery("entity_document_rows")
+    return (
+        ENTITY_DOCUMENT_TABLE.update()
+        .values(
+            {
+                column.name: entity_document_rows.c[column.name]
+                for column in ENTITY_DOCUMENT_TABLE.columns
+                if column.name not in ("entity_id", "created_at")
+            }
+        )
+        .where(ENTITY_DOCUMENT_TABLE.c.entity_id == entity_document_rows.c.entity_id)
+        .returning(*ENTITY_DOCUMENT_TABLE.columns, sa.false().label("inserted"))
+        .cte("updated_entities")
+    )
+
+
+def _write_entity_documents(
+    entity_document_write: CTE, *, emit_events: bool = False
+) -> sa.sql.Select:
+    """_write_entity_documents returns the entity document rows `entity_document_write`
+    wrote, recording each in the outbox with `emit_events`, as `_write_aggregates` does
+    """
+    query = sa.select(entity_document_write)
+    if emit_events:
+        query = query.add_cte(
+            _insert_outbox_events(
+                entity_document_write,
+                sa.case(
+                    (
+                        entity_document_write.c.inserted,
+                        _event_type(EntityEventType.CREATED),
+                    ),
+                    else_=_event_type(EntityEventType.UPDATED),
+                ),
+            )
+        )
+    return query
+
+
+def _delete_entity_documents(*, emit_events: bool = False) -> sa.sql.Select:
+    deleted_entity_documents = (
+        ENTITY_DOCUMENT_TABLE.delete()
+        .where(ENTITY_DOCUMENT_TABLE.c.entity_id == sa.any_(sa.bindparam("entity_ids")))
+        .returning(*ENTITY_DOCUMENT_TABLE.columns)
+        .cte("deleted_entities")
+    )
+    query = sa.select(deleted_entity_documents)
+    if emit_events:
+        query = query.add_cte(
+            _insert_outbox_events(
+                deleted_entity_documents, _event_type(EntityEventType.DELETED)
+            )
+        )
+    return query
+
+
+def _entity_document_write_statements(emit_events: bool) -> EntityWriteStatements:
+    """_entity_document_write_statements write whole aggregates as the entity document
+    rows embedding them, binding the same arrays as the statements writing them
+    to the normalized tables, bar `entity_child_entity_id`
+    """
+    return EntityWriteStatements(
+        insert=PGStatement(
+            "entity_document.insert_many",
+            _write_entity_documents(
+                _insert_entity_documents(), emit_events=emit_events
+            ),
+        ),
+        upsert=PGStatement(
+            "entity_document.upsert_many",
+            _write_entity_documents(
+                _upsert_entity_documents(), emit_events=emit_events
+            ),
+        ),
+        update=PGStatement(
+            "entity_document.update_many",
+            _write_entity_documents(
+                _update_entity_documents(), emit_events=emit_events
+            ),
+        ),
+        delete=PGStatement(
+            "entity_document.delete_many",
+            _delete_entity_documents(emit_events=emit_events),
+        ),
+    )
+
+
+class EntityReadStatements(NamedTuple):
+    """EntityReadStatements read aggregates from the table of one storage layout
+
+    `select_all` returns each entity row with its child entities as a JSON array,
+    in `child_entities`; whether the other statements do depends on the layout.
+    Listings of `table` are read by `select_page` and counted by `count`.
+    """
+
+    table: sa.Table
+    select_many: PGStatement
+    select_updated_at: PGStatement
+    select_all: PGStatement
+    estimate_count: PGStatement
+
+
+def _estimate_count(table: sa.Table) -> sa.sql.Select:
+    """_estimate_count is the planner's row count of `table` as of its last VACUUM
+    or ANALYZE, scaled by how much the table has grown or shrunk since, as the planner
+    itself does; NULL if never analyzed
+    """
+    pg_class = sa.table(
+        "pg_class", sa.column("oid"), sa.column("reltuples"), sa.column("relpages")
+    )
+    return sa.select(
+        sa.cast(
+            sa.case(
+                (pg_class.c.reltuples < sa.literal_column("0"), sa.null()),
+                (pg_class.c.relpages == sa.literal_column("0"), sa.literal_column("0")),
+                else_=pg_class.c.reltuples / pg_class.c.relpages,
+            )
+            * (
+                sa.func.pg_relation_size(pg_class.c.oid)
+                / sa.cast(
+                    sa.func.current_setting(sa.literal_column("'block_size'")),
+                    sa.Integer,
+                )
+            ),
+            sa.BigInteger,
+        )
+    ).where(
+        pg_class.c.oid
+        == sa.cast(sa.literal_column(f"'{table.name}'"), postgresql.REGCLASS)
+    )
+
+
+def _entity_read_statements(
+    table: sa.Table, select_all: sa.sql.Select
+) -> EntityReadStatements:
+    return EntityReadStatements(
+        table=table,
+        select_many=PGStatement(
+            f"{table.name}.select_many",
+            sa.select(table).where(
+                table.c.entity_id == sa.any_(sa.bindparam("entity_ids"))
+            ),
+        ),
+        select_updated_at=PGStatement(
+            f"{table.name}.select_updated_at",
+            sa.select(table.c.updated_at).where(
+                table.c.entity_id == sa.bindparam("entity_id")
+            ),
+        ),
+        select_all=PGStatement(
+            f"{table.name}.select_all",
+            select_all.order_by(table.c.created_at, table.c.entity_id),
+        ),
+        estimate_count=PGStatement(
+            f"{table.name}.estimate_count", _estimate_count(table)
+        ),
+    )
+
+
+# the conditions of an EntityFilter, bar is_active: the column each is on, and how it
+# compares to the parameter named after the condition
+_FILTER_CONDITIONS: Dict[
+    str, Tuple[str, Callable[[Any, Any], sa.sql.ColumnElement]]
+] = {
+    "bar_value_attribute_0": ("bar_value_object_attribute_0", operator.eq),
+    "bar_value_attribute_1": ("bar_value_object_attribute_1", operator.eq),
+    "created_since": ("created_at", operator.ge),
+    "created_before": ("created_at", operator.lt),
+    "updated_since": ("updated_at", operator.ge),
+    "updated_before": ("updated_at", operator.lt),
+}
+
+
+class EntityFilterParams(NamedTuple):
+    """EntityFilterParams splits an EntityFilter into what decides the statement
+    applying it, and the parameters bound to that statement
+    """
+
+    is_active: Optional[bool]
+    conditions: FrozenSet[str]
+    params: Dict[str, Any]
+
+
+def entity_filter_params(spec: EntityFilter) -> EntityFilterParams:
+    params = {
+        condition: getattr(spec, condition)
+        for condition in _FILTER_CONDITIONS
+        if getattr(spec, condition) is not None
+    }
+    return EntityFilterParams(spec.is_active, frozenset(params), params)
+
+
+def _filter(
+    table: sa.Table, is_active: Optional[bool], conditions: FrozenSet[str]
+) -> List[sa.sql.ColumnElement]:
+    # is_active is written into the statement rather than bound, so that the planner
+    # can prove the partial index of the active, or inactive, entities applies
+    filter_clauses = (
+        []
+        if is_active is None
+        else [table.c.is_active if is_active else sa.not_(table.c.is_active)]
+    )
+    for condition in sorted(conditions):
+        column_name, compare = _FILTER_CONDITIONS[condition]
+        filter_clauses.append(compare(table.c[column_name], sa.bindparam(condition)))
+    return filter_clauses
+
+
+# statements are built for each combination of filter conditions and sort
+# on first use, as there are too many to build them all up front
+@functools.lru_cache(maxsize=None)
+def select_page(
+    table: sa.Table,
+    is_active: Optional[bool],
+    conditions: FrozenSet[str],
+    sort: EntitySort,
+    after: bool,
+) -> PGStatement:
+    """select_page lists the rows of `table` meeting the filter, in `sort` order,
+    from `offset`, or, if `after`, past (`after_timestamp`, `after_entity_id`)
+    """
+    order = (table.c[sort.field], table.c.entity_id)
+    query = sa.select(table).where(*_filter(table, is_active, conditions))
+    if after:
+        # row comparison seeks on the (timestamp, entity_id) index
+        # rather than scanning and discarding all preceding rows like OFFSET does
+        position = sa.tuple_(
+            sa.bindparam("after_timestamp"), sa.bindparam("after_entity_id")
+        )
+        query = query.where(
+            sa.tuple_(*order) < position
+            if sort.descending
+            else sa.tuple_(*order) > position
+        )
+    else:
+        query = query.offset(sa.bindparam("offset"))
+    return PGStatement(
+        f"{table.name}.select_page_after" if after else f"{table.name}.select_page",
+        query.order_by(
+            *(column.desc() if sort.descending else column for column in order)
+        ).limit(sa.bindparam("limit")),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def count(
+    table: sa.Table, is_active: Optional[bool], conditions: FrozenSet[str]
+) -> PGStatement:
+    return PGStatement(
+        f"{table.name}.count",
+        sa.select(sa.func.count())
+        .select_from(table)
+        .where(*_filter(table, is_active, conditions)),
+    )
+
+
+SELECT_CHILD_ENTITIES_BY_ENTITY_ID = PGStatement(
+    "child_entity.select_many",
+    sa.select(ENTITY_CHILD_ENTITY_TABLE.c.entity_id, *CHILD_ENTITY_TABLE.columns)
+    .select_from(_CHILD_ENTITIES_JOIN)
+    .where(
+        ENTITY_CHILD_ENTITY_TABLE.c.entity_id == sa.any_(sa.bindparam("entity_ids"))
+    ),
+)
+
+# entity rows alone; their child entities are read by SELECT_CHILD_ENTITIES_BY_ENTITY_ID
+READ_ENTITIES = _entity_read_statements(
+    ENTITY_TABLE, sa.select(ENTITY_TABLE, _child_entities_json_column())
+)
+
+READ_ENTITY_DOCUMENTS = _entity_read_statements(
+    ENTITY_DOCUMENT_TABLE, sa.select(ENTITY_DOCUMENT_TABLE)
+)
+
+WRITE_ENTITIES = _entity_write_statements(emit_events=False)
+
+# the same writes, each also recording its changes as events in the outbox,
+# so the events are committed, or rolled back, with the changes themselves
+WRITE_ENTITIES_EMITTING_EVENTS = _entity_write_statements(emit_events=True)
+
+WRITE_ENTITY_DOCUMENTS = _entity_document_write_statements(emit_events=False)
+
+WRITE_ENTITY_DOCUMENTS_EMITTING_EVENTS = _entity_document_write_statements(
+    emit_events=True
+)
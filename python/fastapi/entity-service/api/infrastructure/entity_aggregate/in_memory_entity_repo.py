@@ -0,0 +1,374 @@
+import asyncio
+import bisect
+import datetime
+import itertools
+import uuid
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import pydantic
+
+from api.domain.entity_aggregate.entity import (
+    BarValueObject,
+    ChildEntity,
+    Entity,
+    EntityCountStrategy,
+    EntityList,
+)
+from api.domain.entity_aggregate.entity_cursor import EntityCursor
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.domain.entity_aggregate.entity_repo import IEntityRepo
+
+# (created_at or updated_at, entity_id) sorts the same way as the keyset ordering
+# of `IEntityRepo.where` on that timestamp
+_SortKey = Tuple[datetime.datetime, uuid.UUID]
+# (child_entity_id, attribute_a, attribute_b, attribute_c)
+_ChildEntityRecord = Tuple[uuid.UUID, str, int, Decimal]
+
+
+class _EntityRecord:
+    """_EntityRecord holds an Entity's attributes with none of the per-instance overhead
+    of a pydantic model: no instance __dict__, `__fields_set__`, or nested model objects
+    """
+
+    __slots__ = (
+        "entity_id",
+        "bar_value_attribute_0",
+        "bar_value_attribute_1",
+        "is_active",
+        "created_at",
+        "updated_at",
+        "child_entities",
+    )
+
+    def __init__(self, entity: Entity):
+        self.entity_id: uuid.UUID = entity.entity_id
+        self.bar_value_attribute_0: str = entity.bar_value.attribute_0
+        self.bar_value_attribute_1: int = entity.bar_value.attribute_1
+        self.is_active: bool = entity.is_active
+        self.created_at: datetime.datetime = entity.created_at
+        self.updated_at: datetime.datetime = entity.updated_at
+        self.child_entities: Tuple[_ChildEntityRecord, ...] = tuple(
+            (
+                child_entity.child_entity_id,
+                child_entity.attribute_a,
+                child_entity.attribute_b,
+                child_entity.attribute_c,
+            )
+            for child_entity in entity.child_entities
+        )
+
+    @property
+    def sort_key(self) -> _SortKey:
+        return self.created_at, self.entity_id
+
+    @property
+    def updated_at_key(self) -> _SortKey:
+        return self.updated_at, self.entity_id
+
+    def matches(self, spec: EntityFilter) -> bool:
+        return (
+            (spec.is_active is None or self.is_active == spec.is_active)
+            and (
+                spec.bar_value_attribute_0 is None
+                or self.bar_value_attribute_0 == spec.bar_value_attribute_0
+            )
+            and (
+                spec.bar_value_attribute_1 is None
+                or self.bar_value_attribute_1 == spec.bar_value_attribute_1
+            )
+            and (spec.created_since is None or self.created_at >= spec.created_since)
+            and (spec.created_before is None or self.created_at < spec.created_before)
+            and (spec.updated_since is None or self.updated_at >= spec.updated_since)
+            and (spec.updated_before is None or self.updated_at < spec.updated_before)
+        )
+
+    def to_entity(self) -> Entity:
+        # records are only ever built from valid Entities, so validation can be skipped
+        return Entity.construct(
+            entity_id=self.entity_id,
+            child_entities=tuple(
+                ChildEntity.construct(
+                    child_entity_id=child_entity_id,
+                    attribute_a=attribute_a,
+                    attribute_b=attribute_b,
+                    attribute_c=attribute_c,
+                )
+                for child_entity_id, attribute_a, attribute_b, attribute_c in (
+                    self.child_entities
+                )
+            ),
+            bar_value=BarValueObject.construct(
+                attribute_0=self.bar_value_attribute_0,
+                attribute_1=self.bar_value_attribute_1,
+            ),
+            is_active=self.is_active,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+class InMemoryEntityRepo(IEntityRepo):
+    """InMemoryEntityRepo keeps all Entity aggregates in process memory
+
+    Aggregates are stored as compact `__slots__` records rather than pydantic models,
+    and are only rehydrated into Entities as they are read. Lookups are served by indexes:
+    * a hash index on entity_id, for O(1) `get`
+    * a sorted index on (created_at, entity_id), so `where` seeks to a page in O(log n)
+    * a sorted index on (created_at, entity_id) per is_active value, for listings
+        restricted to active or inactive Entities
+    * a sorted index on (updated_at, entity_id), for listings sorted by updated_at
+
+    Listings are seeked to the range of the index for their sort and their filter on
+    is_active and the timestamp sorted on, and test the rest of their filter on each
+    Entity in the range. Counts are taken from the length of the range alone when it
+    holds exactly the Entities meeting the filter.
+
+    The sorted indexes are plain lists, so adding or removing a key shifts every key
+    after it, O(n): some 50us per write with a million Entities. Entities are mostly
+    created, and updated, in timestamp order, whose keys are appended without shifting
+    anything. Updates keep created_at, so their created_at keys only move, between the
+    is_active indexes, when is_active changes; their updated_at key is removed from where
+    it was, paying the shift. Deleting, or creating out of order, pays the full cost.
+
+    Suitable for local development, benchmarks, and read-mostly single-node deployments;
+    contents are lost when the process exits and are not shared between processes.
+    All operations but `create_many` and `iterate` complete without awaiting,
+    so each is atomic within its event loop.
+    """
+
+    # the number of index entries `iterate` reads between yielding control
+    _ITERATE_CHUNK_SIZE = 1000
+
+    def __init__(self, bulk_batch_size: int = 500):
+        self._bulk_batch_size = bulk_batch_size
+        self._records: Dict[uuid.UUID, _EntityRecord] = {}
+        self._created_at_index: List[_SortKey] = []
+        self._is_active_index: Dict[bool, List[_SortKey]] = {True: [], False: []}
+        self._updated_at_index: List[_SortKey] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+        record = self._records.get(entity_id)
+        if record is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        return record.to_entity()
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        return [
+            self._records[entity_id].to_entity()
+            for entity_id in dict.fromkeys(entity_ids)
+            if entity_id in self._records
+        ]
+
+    async def get_updated_at(self, entity_id: pydantic.UUID4) -> datetime.datetime:
+        record = self._records.get(entity_id)
+        if record is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        return record.updated_at
+
+    async def where(
+        self,
+        page: Optional[int] = None,
+        size: Optional[int] = None,
+        cursor: Optional[str] = None,
+        count: Optional[EntityCountStrategy] = None,
+        spec: Optional[EntityFilter] = None,
+        sort: EntitySort = EntitySort.CREATED_AT,
+    ) -> EntityList:
+        page, size = self._page_bounds(page, size)
+        spec = spec or EntityFilter()
+        index, start, stop = self._index_range(spec, sort)
+        if cursor is not None:
+            position = EntityCursor.decode(cursor).position(sort)
+            if sort.descending:
+                stop = bisect.bisect_left(index, position, start, stop)
+            else:
+                start = bisect.bisect_right(index, position, start, stop)
+            skip = 0
+            page = None
+        else:
+            skip = page * size
+        positions = (
+            range(stop - 1, start - 1, -1) if sort.descending else range(start, stop)
+        )
+        matching_records = (
+            record
+            for record in (self._records[index[i][1]] for i in positions)
+            if record.matches(spec)
+        )
+        records = list(itertools.islice(matching_records, skip, skip + size + 1))
+        entities = [record.to_entity() for record in records[:size]]
+        next_cursor = (
+            EntityCursor.from_entity(entities[-1]).encode()
+            if len(records) > size
+            else None
+        )
+        # exact whatever the strategy, as the count is at hand or cheap to take
+        total = None if count is None else self._count(spec)
+        return EntityList(
+            entities=entities,
+            page=page,
+            size=size,
+            next_cursor=next_cursor,
+            total=total,
+        )
+
+    def _index_range(
+        self, spec: EntityFilter, sort: EntitySort
+    ) -> Tuple[List[_SortKey], int, int]:
+        """_index_range gives the sort keys of the Entities which may meet `spec`,
+        in ascending `sort` order, and the range of them within the bounds of `spec`
+        on the timestamp sorted on
+        """
+        if sort.field == "created_at":
+            index = (
+                self._created_at_index
+                if spec.is_active is None
+                else self._is_active_index[spec.is_active]
+            )
+            since, before = spec.created_since, spec.created_before
+        else:
+            index = self._updated_at_index
+            since, before = spec.updated_since, spec.updated_before
+        # a timestamp alone sorts before every key holding it
+        start = 0 if since is None else bisect.bisect_left(index, (since,))
+        stop = len(index) if before is None else bisect.bisect_left(index, (before,))
+        return index, start, stop
+
+    def _count(self, spec: EntityFilter) -> int:
+        """_count counts the Entities meeting `spec` within the range of the index
+        seeked to for it, testing each only when the range does not cover every
+        condition of `spec`
+        """
+        sort = (
+            EntitySort.UPDATED_AT
+            if spec.created_since is None
+            and spec.created_before is None
+            and (spec.updated_since is not None or spec.updated_before is not None)
+            else EntitySort.CREATED_AT
+        )
+        index, start, stop = self._index_range(spec, sort)
+        covered_conditions = (
+            ("is_active", "created_since", "created_before")
+            if sort.field == "created_at"
+            else ("updated_since", "updated_before")
+        )
+        if spec.copy(update=dict.fromkeys(covered_conditions)) == EntityFilter():
+            return stop - start
+        return sum(
+            self._records[entity_id].matches(spec) for _, entity_id in index[start:stop]
+        )
+
+    async def iterate(self) -> AsyncIterator[Entity]:
+        # seek from the last key yielded rather than holding a position in the index,
+        # so that writes made while the caller consumes entities are tolerated
+        start = 0
+        while True:
+            sort_keys = self._created_at_index[start : start + self._ITERATE_CHUNK_SIZE]
+            if not sort_keys:
+                return
+            records = [self._records[entity_id] for _, entity_id in sort_keys]
+            for record in records:
+                yield record.to_entity()
+            start = bisect.bisect_right(self._created_at_index, sort_keys[-1])
+
+    async def create(self, entity: Entity) -> Entity:
+        if entity.entity_id in self._records:
+            raise EntityAlreadyExistsError(
+                field="entity_id", value=str(entity.entity_id)
+            )
+        return self._put(entity)
+
+    async def create_many(
+        self, entities: Sequence[Entity], batch_size: Optional[int] = None
+    ) -> List[Entity]:
+        batch_size = batch_size or self._bulk_batch_size
+        created_entities = []
+        for i in range(0, len(entities), batch_size):
+            # each batch is written atomically; other tasks get a turn between batches
+            if i > 0:
+                await asyncio.sleep(0)
+            for entity in entities[i : i + batch_size]:
+                if entity.entity_id not in self._records:
+                    created_entities.append(self._put(entity))
+        return created_entities
+
+    async def create_or_update(self, entity: Entity) -> Entity:
+        return self._put(entity)
+
+    async def update(self, entity: Entity) -> Entity:
+        if entity.entity_id not in self._records:
+            raise EntityNotFoundError(field="entity_id", value=str(entity.entity_id))
+        return self._put(entity)
+
+    async def delete(self, entity_id: pydantic.UUID4) -> Entity:
+        record = self._records.pop(entity_id, None)
+        if record is None:
+            raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        self._unindex(record)
+        return record.to_entity()
+
+    async def write_changes(
+        self,
+        *,
+        new: Sequence[Entity] = (),
+        dirty: Sequence[Entity] = (),
+        deleted: Sequence[pydantic.UUID4] = (),
+    ) -> None:
+        # every change is checked before any is made, so that a failure writes nothing
+        for entity in new:
+            if entity.entity_id in self._records:
+                raise EntityAlreadyExistsError(
+                    field="entity_id", value=str(entity.entity_id)
+                )
+        for entity_id in (*(entity.entity_id for entity in dirty), *deleted):
+            if entity_id not in self._records:
+                raise EntityNotFoundError(field="entity_id", value=str(entity_id))
+        for entity_id in deleted:
+            self._unindex(self._records.pop(entity_id))
+        for entity in (*new, *dirty):
+            self._put(entity)
+
+    def _put(self, entity: Entity) -> Entity:
+        previous_record = self._records.get(entity.entity_id)
+        if (
+            previous_record is not None
+            and entity.created_at != previous_record.created_at
+        ):
+            entity = entity.copy(update={"created_at": previous_record.created_at})
+        record = _EntityRecord(entity)
+        self._records[record.entity_id] = record
+        if previous_record is None:
+            self._index(record)
+            return record.to_entity()
+        if record.is_active != previous_record.is_active:
+            # created_at is kept, so the key only moves between the is_active indexes
+            _remove(self._is_active_index[previous_record.is_active], record.sort_key)
+            bisect.insort(self._is_active_index[record.is_active], record.sort_key)
+        if record.updated_at != previous_record.updated_at:
+            _remove(self._updated_at_index, previous_record.updated_at_key)
+            bisect.insort(self._updated_at_index, record.updated_at_key)
+        return record.to_entity()
+
+    def _index(self, record: _EntityRecord) -> None:
+        # entities are mostly created in created_at order,
+        # in which case insort appends to the end of the index without moving anything
+        bisect.insort(self._created_at_index, record.sort_key)
+        bisect.insort(self._is_active_index[record.is_active], record.sort_key)
+        bisect.insort(self._updated_at_index, record.updated_at_key)
+
+    def _unindex(self, record: _EntityRecord) -> None:
+        _remove(self._created_at_index, record.sort_key)
+        _remove(self._is_active_index[record.is_active], record.sort_key)
+        _remove(self._updated_at_index, record.updated_at_key)
+
+
+def _remove(index: List[_SortKey], sort_key: _SortKey) -> None:
+    del index[bisect.bisect_left(index, sort_key)]
@@ -0,0 +1,18 @@
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from api.domain.entity_aggregate.entity_event import EntityEvent
+
+
+class IEventSink(ABC):
+    """IEventSink defines where OutboxPublisher delivers the events drained from the outbox
+
+    Implement this interface for a message broker, a webhook, a log shipper, etc.
+    `publish` returning means the sink took responsibility for the whole batch; raising,
+    or not returning in time, leaves the batch in the outbox to be published again,
+    so a sink may be given the same event more than once.
+    """
+
+    @abstractmethod
+    async def publish(self, events: Sequence[EntityEvent]) -> None:
+        pass
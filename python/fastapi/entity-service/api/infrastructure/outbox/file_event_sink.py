@@ -0,0 +1,27 @@
+import asyncio
+import os
+from typing import Sequence
+
+from api.domain.entity_aggregate.entity_event import EntityEvent
+from api.infrastructure.outbox.event_sink import IEventSink
+
+
+class FileEventSink(IEventSink):
+    """FileEventSink appends published events to a file, one JSON object per line
+
+    A batch is synced to disk before `publish` returns, as its events are then deleted
+    from the outbox. File IO runs in the default executor, off the event loop.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    async def publish(self, events: Sequence[EntityEvent]) -> None:
+        lines = "".join(event.json() + "\n" for event in events)
+        await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        with open(self._path, "a", encoding="utf-8") as events_file:
+            events_file.write(lines)
+            events_file.flush()
+            os.fsync(events_file.fileno())
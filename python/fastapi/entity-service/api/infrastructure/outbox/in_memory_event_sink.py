@@ -0,0 +1,32 @@
+import asyncio
+from typing import List, Sequence
+
+from api.domain.entity_aggregate.entity_event import EntityEvent
+from api.infrastructure.outbox.event_sink import IEventSink
+
+
+class InMemoryEventSink(IEventSink):
+    """InMemoryEventSink queues published events in process, for tests and local development
+
+    The queue holds at most `max_size` events. Once it is full, `publish` waits for
+    consumers to take events off it, so that without a consumer, events back up
+    in the outbox rather than in memory.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self._queue: "asyncio.Queue[EntityEvent]" = asyncio.Queue(maxsize=max_size)
+
+    async def publish(self, events: Sequence[EntityEvent]) -> None:
+        for event in events:
+            await self._queue.put(event)
+
+    async def get(self) -> EntityEvent:
+        """get waits for the next published event"""
+        return await self._queue.get()
+
+    def drain(self) -> List[EntityEvent]:
+        """drain takes every event published so far, without waiting"""
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
@@ -0,0 +1,203 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from contextlib import suppress
+from typing import List, Optional
+
+import sqlalchemy as sa
+from asyncpg import Record
+
+from api.domain.entity_aggregate.entity_event import EntityEvent
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+from api.infrastructure.datastore.postgres.tables import OUTBOX_EVENT_TABLE
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+from api.infrastructure.outbox.event_sink import IEventSink
+
+logger = logging.getLogger(__name__)
+
+# arbitrary, but shared by every publisher of the same database
+_OUTBOX_LOCK_ID = 0x6F7574626F78
+
+# only one publisher drains the outbox at a time, so no two publish batches concurrently
+LOCK_OUTBOX = PGStatement(
+    "outbox_event.lock",
+    sa.select(
+        sa.func.pg_try_advisory_xact_lock(sa.literal_column(str(_OUTBOX_LOCK_ID)))
+    ),
+)
+
+# identities are assigned as events are recorded, not as their transactions commit,
+# so they only order the events of one entity, whose writes are serialized by its row lock.
+# Rows deleted by RETURNING come back in no particular order.
+DRAIN_OUTBOX = PGStatement(
+    "outbox_event.drain",
+    OUTBOX_EVENT_TABLE.delete()
+    .where(
+        OUTBOX_EVENT_TABLE.c.outbox_event_id.in_(
+            sa.select(OUTBOX_EVENT_TABLE.c.outbox_event_id)
+            .order_by(OUTBOX_EVENT_TABLE.c.outbox_event_id)
+            .limit(sa.bindparam("limit"))
+        )
+    )
+    .returning(*OUTBOX_EVENT_TABLE.columns),
+)
+
+# seconds; from publishing as soon as recorded up to a sink down for minutes
+EVENT_DELAY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class OutboxPublisher:
+    """OutboxPublisher delivers the events recorded in the outbox_event table to a sink,
+    from a background task, in batches of up to `batch_size` events
+
+    A batch is deleted from the outbox in the transaction which publishes it, so it is
+    only gone once `sink` accepted it within `publish_timeout` seconds. Otherwise
+    the transaction rolls back, and the batch is retried after a delay doubling from
+    `poll_interval` up to `max_retry_delay` seconds for as long as publishing fails.
+    Events are thus delivered at least once.
+
+    The next batch is only drained once the sink accepted the previous one, so events
+    a slow sink cannot keep up with wait in the outbox, not in memory, while writes
+    carry on unaffected. A full batch is followed straight away by the next;
+    otherwise the outbox is polled every `poll_interval` seconds.
+
+    Each worker process runs its own publisher; a transaction-scoped advisory lock
+    lets one of them drain the outbox at a time. The events of each entity are published
+    in the order they were recorded, while events of different entities, recorded
+    by concurrent transactions, may be published in a different order than they
+    committed in.
+    """
+
+    def __init__(
+        self,
+        db_client: PGClient,
+        sink: IEventSink,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        publish_timeout: float = 10.0,
+        max_retry_delay: float = 30.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self._db_client = db_client
+        self._sink = sink
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._publish_timeout = publish_timeout
+        self._max_retry_delay = max_retry_delay
+        self._retry_delay = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # created once the loop runs, as before Python 3.10 an Event binds to a loop
+        self._stopping: Optional[asyncio.Event] = None
+        metrics = metrics or MetricsRegistry()
+        self._published = metrics.counter(
+            "outbox_events_published_total", "Events published from the outbox"
+        )
+        self._failures = metrics.counter(
+            "outbox_publish_failures_total",
+            "Batches of outbox events which failed to publish, to be retried",
+        )
+        self._batch_duration = metrics.histogram(
+            "outbox_publish_batch_duration_seconds",
+            "Time to drain a batch of events from the outbox and publish them",
+        )
+        self._event_delay = metrics.histogram(
+            "outbox_event_delay_seconds",
+            "Time from an event being recorded in the outbox to its being published",
+            buckets=EVENT_DELAY_BUCKETS,
+        )
+        metrics.gauge(
+            "outbox_publish_retry_delay_seconds",
+            "Seconds the publisher waits before retrying a failed batch, 0 when healthy",
+        ).set_function(lambda: self._retry_delay)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run(self._stopping))
+
+    async def stop(self) -> None:
+        """stop waits for any batch being published to commit, or to roll back
+        once `publish_timeout` expires, then ends the background task
+
+        Cancelling the task mid-batch instead would leave its connection checked out
+        of the pool, which disconnecting would then wait on forever.
+        """
+        if self._task is None or self._stopping is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def publish_batch(self) -> Optional[int]:
+        """publish_batch drains the oldest batch of events from the outbox and publishes it,
+        returning the number of events published, or None if another publisher holds
+        the outbox
+        """
+        start = time.perf_counter()
+        async with self._db_client.transaction(name="outbox_publish"):
+            locked: Record = await self._db_client.fetch_one(LOCK_OUTBOX)
+            if not locked[0]:
+                return None
+            db_events: List[Record] = await self._db_client.fetch_all(
+                DRAIN_OUTBOX, limit=self._batch_size
+            )
+            if not db_events:
+                return 0
+            events = [
+                _to_event(db_event)
+                for db_event in sorted(
+                    db_events, key=lambda db_event: db_event["outbox_event_id"]
+                )
+            ]
+            await asyncio.wait_for(
+                self._sink.publish(events), timeout=self._publish_timeout
+            )
+        published_at = datetime.datetime.now(datetime.timezone.utc)
+        self._batch_duration.observe(time.perf_counter() - start)
+        self._published.inc(len(events))
+        for event in events:
+            self._event_delay.observe(
+                (published_at - event.occurred_at).total_seconds()
+            )
+        return len(events)
+
+    async def _run(self, stopping: asyncio.Event) -> None:
+        while not stopping.is_set():
+            try:
+                published = await self.publish_batch()
+            except Exception:  # pylint: disable=broad-except
+                # the sink or the database failed; the batch stays in the outbox
+                self._failures.inc()
+                self._retry_delay = min(
+                    max(self._retry_delay * 2, self._poll_interval),
+                    self._max_retry_delay,
+                )
+                logger.exception(
+                    "Publishing outbox events failed, retrying in %ss",
+                    self._retry_delay,
+                )
+                await _wait(stopping, self._retry_delay)
+                continue
+            self._retry_delay = 0.0
+            if published != self._batch_size:
+                await _wait(stopping, self._poll_interval)
+
+
+async def _wait(stopping: asyncio.Event, delay: float) -> None:
+    """_wait sleeps for `delay` seconds, or until stopping"""
+    with suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(stopping.wait(), timeout=delay)
+
+
+def _to_event(db_event: Record) -> EntityEvent:
+    return EntityEvent(
+        event_id=db_event["event_id"],
+        event_type=db_event["event_type"],
+        entity_id=db_event["aggregate_id"],
+        # JSONB is returned as text
+        payload=json.loads(db_event["payload"]),
+        occurred_at=db_event["occurred_at"],
+    )
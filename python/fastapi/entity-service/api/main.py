@@ -1,94 +1,393 @@
 import argparse
-import asyncio
+import multiprocessing
 import os
 import sys
-from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Union
 
-import databases
-import uvicorn  # type: ignore
 import yaml
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute, APIRouter
 from starlette.middleware.cors import CORSMiddleware
 
+from api.application.admission.admission_middleware import (
+    AdmissionLimit,
+    AdmissionMiddleware,
+)
 from api.application.entity_aggregate.entity_handler import EntityHandler
 from api.application.entity_aggregate.entity_router import entity_router
-from api.application.health import health_handler
-from api.domain.entity_aggregate.entity import (
-    BarValueObject,
-    ChildEntity,
-    Entity,
-    EntityList,
-)
+from api.application.entity_aggregate.entity_validator import EntityValidator
+from api.application.health.health_handler import HealthHandler
+from api.application.metrics.metrics_handler import MetricsHandler
+from api.application.metrics.metrics_middleware import MetricsMiddleware
+from api.application.profiling.profiling_middleware import ProfilingMiddleware
 from api.domain.entity_aggregate.entity_repo import IEntityRepo
 from api.domain.entity_aggregate.entity_service import EntityService
-from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
-
-app = FastAPI()
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument("-c", "--config", default="config.local.yaml", help="Config file")
-args = parser.parse_args()
-
-# Load config.
-with open(args.config, "r") as conf_file:
-    config = yaml.safe_load(conf_file)
-
-# inject database connection info from config here
-# and use it to connect to some database client like:
-# pg_client = databases.Database(DATABASE_URL)
-# then inject it into your repo implementation like
-# entity_repo: EntityRepo = PGEntityRepo(pg_client=pgclient)
-pg_host = os.getenv("POSTGRES_HOST", default="localhost")
-pg_port = os.getenv("POSTGRES_PORT", default=5432)
-pg_user = os.getenv("POSTGRES_USER", default="postgres")
-pg_password = os.getenv("POSTGRES_PASSWORD", default="")
-pg_database = os.getenv("POSTGRES_DB", "entity_service")
-pg_url = f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_database}"
-pg_client = databases.Database(pg_url)
-
-entity_repo: IEntityRepo = PGEntityRepo(pg_client)
-entity_service = EntityService(repo=entity_repo)
-entity_handler = EntityHandler(service=entity_service)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from api.infrastructure.entity_aggregate.caching_entity_repo import CachingEntityRepo
+from api.infrastructure.entity_aggregate.coalescing_entity_repo import (
+    CoalescingEntityRepo,
 )
-
-get_service_health_route = APIRoute(
-    path="/health",
-    endpoint=health_handler.get_service_health,
-    methods=["GET"],
-    name="Get Service Health",
+from api.infrastructure.entity_aggregate.in_memory_entity_repo import (
+    InMemoryEntityRepo,
 )
-health_router = APIRouter(routes=[get_service_health_route])
-app.include_router(health_router)
+from api.infrastructure.metrics.metrics_registry import MetricsRegistry
+
+if TYPE_CHECKING:
+    from api.infrastructure.datastore.postgres.pg_client import (
+        PGClient,
+        PoolTimeoutError,
+    )
+
+# worker processes import this module afresh, and find the config file to load here
+CONFIG_PATH_ENV_VAR = "ENTITY_SERVICE_CONFIG"
+DEFAULT_CONFIG_PATH = "config.local.yaml"
 
 
-app.include_router(entity_router(entity_handler))
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path, "r") as conf_file:
+        return yaml.safe_load(conf_file)
 
 
-@app.on_event("startup")
-async def startup():
-    await pg_client.connect()
+def create_app(config: Dict[str, Any]) -> FastAPI:
+    """create_app builds the application from its parsed config
+
+    Building the app opens no connections, which only happens on startup, so it is cheap
+    and safe to do in any process. The Postgres driver and SQLAlchemy, the slowest
+    of our dependencies to import, are only imported when the config uses Postgres.
+    """
+    app = FastAPI()
+    metrics = MetricsRegistry()
+    pg_client: Optional["PGClient"] = None
+
+    entity_repo_config = config.get("entityRepo", {})
+    # "postgres", or "inMemory" for local development and read-mostly edge deployments
+    entity_repo_type = entity_repo_config.get("type", "postgres")
+    entity_repo: IEntityRepo
+    if entity_repo_type == "inMemory":
+        entity_repo = InMemoryEntityRepo(
+            bulk_batch_size=entity_repo_config.get("bulkBatchSize", 500)
+        )
+    else:
+        # pylint: disable=import-outside-toplevel
+        from api.infrastructure.datastore.postgres.pg_client import PoolTimeoutError
+        from api.infrastructure.datastore.postgres.pg_replica_set import PGReplicaSet
+        from api.infrastructure.entity_aggregate.entity_document_repo import (
+            PGEntityDocumentRepo,
+        )
+        from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+
+        pg_config = config["postgres"]
+        pg_pool_config = pg_config.get("pool", {})
+        # addressed as the replicas are, with the env vars overriding the config
+        pg_client = _create_pg_client(
+            os.getenv("POSTGRES_HOST", default=pg_config.get("host", "localhost")),
+            os.getenv("POSTGRES_PORT", default=pg_config.get("port", 5432)),
+            pg_pool_config,
+            metrics,
+            name="primary",
+        )
+        pg_replicas_config = pg_config.get("replicas", {})
+        pg_replica_set = PGReplicaSet(
+            pg_client,
+            [
+                _create_pg_client(
+                    replica["host"],
+                    replica.get("port", 5432),
+                    pg_pool_config,
+                    metrics,
+                    name=f"replica-{i}",
+                )
+                for i, replica in enumerate(pg_replicas_config.get("hosts", []))
+            ],
+            max_lag=pg_replicas_config.get("maxLagSeconds"),
+            lag_check_interval=pg_replicas_config.get("lagCheckIntervalSeconds", 1),
+            lag_check_timeout=pg_replicas_config.get("lagCheckTimeoutSeconds", 1),
+            metrics=metrics,
+        )
+        outbox_config = config.get("outbox", {})
+        # "normalized", across the entity and child entity tables, or "document",
+        # each aggregate a row of the entity_document table
+        entity_repo_class = (
+            PGEntityDocumentRepo
+            if entity_repo_config.get("layout", "normalized") == "document"
+            else PGEntityRepo
+        )
+        entity_repo = entity_repo_class(
+            pg_client,
+            bulk_batch_size=entity_repo_config.get("bulkBatchSize", 500),
+            trusted_rehydration=entity_repo_config.get("trustedRehydration", False),
+            replica_set=pg_replica_set,
+            emit_events=outbox_config.get("enabled", False),
+            count_cache_ttl=entity_repo_config.get("countCacheTtlSeconds", 10),
+        )
+        app.add_exception_handler(PoolTimeoutError, pool_timeout_exception_handler)
+        app.add_event_handler("startup", pg_replica_set.connect)
+        if outbox_config.get("enabled", False):
+            outbox_publisher = _create_outbox_publisher(
+                pg_client, outbox_config, metrics
+            )
+            # started once connected, and stopped before disconnecting
+            app.add_event_handler("startup", outbox_publisher.start)
+            app.add_event_handler("shutdown", outbox_publisher.stop)
+        app.add_event_handler("shutdown", pg_replica_set.disconnect)
+    entity_repo_coalescing_config = entity_repo_config.get("coalescing", {})
+    if entity_repo_coalescing_config.get("enabled", False):
+        # below the cache, so that only its misses are coalesced
+        entity_repo = CoalescingEntityRepo(
+            entity_repo,
+            max_batch_size=entity_repo_coalescing_config.get("maxBatchSize", 100),
+            max_wait=entity_repo_coalescing_config.get("maxWaitSeconds", 0),
+        )
+    entity_repo_cache_config = entity_repo_config.get("cache", {})
+    if entity_repo_cache_config.get("enabled", False):
+        entity_repo = _create_caching_entity_repo(
+            entity_repo, entity_repo_cache_config, metrics
+        )
+    entity_service = EntityService(repo=entity_repo)
+    entity_handler = EntityHandler(
+        service=entity_service,
+        validator=_create_entity_validator(app, config.get("validation", {})),
+    )
+
+    profiling_config = config.get("profiling", {})
+    if profiling_config.get("enabled", False):
+        # innermost, so that profiles cover the app's own handling of the request
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=os.getenv("PROFILING_TOKEN"),
+            sample_rate=profiling_config.get("sampleRate", 0),
+            output_dir=profiling_config.get("outputDir"),
+            trace_allocations=profiling_config.get("traceAllocations", False),
+            top=profiling_config.get("top", 50),
+            metrics=metrics,
+        )
+    admission_config = config.get("admission", {})
+    if admission_config.get("enabled", False):
+        # inside CORS and metrics, so that rejections get CORS headers and are measured
+        app.add_middleware(
+            AdmissionMiddleware,
+            **_admission_limits(config.get("postgres", {}), admission_config),
+            retry_after=admission_config.get("retryAfterSeconds", 1),
+            metrics=metrics,
+        )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
 
+    get_service_health_route = APIRoute(
+        path="/health",
+        endpoint=HealthHandler(pg_client).get_service_health,
+        methods=["GET"],
+        name="Get Service Health",
+    )
+    get_metrics_route = APIRoute(
+        path="/metrics",
+        endpoint=MetricsHandler(metrics).get_metrics,
+        methods=["GET"],
+        name="Get Metrics",
+        include_in_schema=False,
+    )
+    health_router = APIRouter(routes=[get_service_health_route, get_metrics_route])
+    app.include_router(health_router)
+
+    app.include_router(entity_router(entity_handler))
+    return app
+
+
+def app_factory() -> FastAPI:
+    """app_factory builds the app from the config file named by ENTITY_SERVICE_CONFIG,
+    as each worker process started by `main` does:
+
+        ENTITY_SERVICE_CONFIG=config.yaml uvicorn --factory api.main:app_factory
+    """
+    return create_app(load_config(os.getenv(CONFIG_PATH_ENV_VAR, DEFAULT_CONFIG_PATH)))
+
+
+def _create_pg_client(
+    pg_host: str,
+    pg_port: Union[int, str],
+    pg_pool_config: Dict[str, Any],
+    metrics: MetricsRegistry,
+    name: str,
+):
+    # pylint: disable=import-outside-toplevel
+    import databases
+
+    from api.infrastructure.datastore.postgres.pg_client import PGClient
+
+    pg_user = os.getenv("POSTGRES_USER", default="postgres")
+    pg_password = os.getenv("POSTGRES_PASSWORD", default="")
+    pg_database = os.getenv("POSTGRES_DB", "entity_service")
+    pg_url = f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_database}"
+    return PGClient(
+        databases.Database(
+            pg_url,
+            min_size=pg_pool_config.get("minSize", 10),
+            max_size=pg_pool_config.get("maxSize", 10),
+            statement_cache_size=pg_pool_config.get("statementCacheSize", 100),
+            max_inactive_connection_lifetime=pg_pool_config.get(
+                "maxInactiveConnectionLifetime", 300
+            ),
+            max_queries=pg_pool_config.get("maxQueries", 50000),
+        ),
+        metrics=metrics,
+        acquire_timeout=pg_pool_config.get("acquireTimeout"),
+        name=name,
+    )
 
-@app.on_event("shutdown")
-async def shutdown():
-    await pg_client.disconnect()
 
+def _admission_limits(
+    pg_config: Dict[str, Any], admission_config: Dict[str, Any]
+) -> Dict[str, AdmissionLimit]:
+    """_admission_limits sizes the requests admitted at once after the connections
+    available to serve them: reads are spread over the primary and its replicas,
+    while writes all go to the primary
+    """
+    pool_size = pg_config.get("pool", {}).get("maxSize", 10)
+    replica_count = len(pg_config.get("replicas", {}).get("hosts", []))
+    max_concurrency = {
+        "read_limit": pool_size
+        * (1 + replica_count)
+        * admission_config.get("readsPerConnection", 4),
+        "write_limit": pool_size * admission_config.get("writesPerConnection", 2),
+    }
+    return {
+        name: AdmissionLimit(
+            max_concurrency=concurrency,
+            max_queue=concurrency * admission_config.get("queueFactor", 1),
+            max_wait=admission_config.get("maxWaitSeconds", 1),
+        )
+        for name, concurrency in max_concurrency.items()
+    }
+
+
+def _create_outbox_publisher(
+    pg_client: "PGClient", outbox_config: Dict[str, Any], metrics: MetricsRegistry
+):
+    # pylint: disable=import-outside-toplevel
+    from api.infrastructure.outbox.event_sink import IEventSink
+    from api.infrastructure.outbox.file_event_sink import FileEventSink
+    from api.infrastructure.outbox.in_memory_event_sink import InMemoryEventSink
+    from api.infrastructure.outbox.outbox_publisher import OutboxPublisher
+
+    # "file", or "inMemory" for local development
+    sink_type = outbox_config.get("sink", "inMemory")
+    sink: IEventSink
+    if sink_type == "file":
+        sink = FileEventSink(outbox_config["filePath"])
+    else:
+        sink = InMemoryEventSink()
+    return OutboxPublisher(
+        pg_client,
+        sink,
+        batch_size=outbox_config.get("batchSize", 100),
+        poll_interval=outbox_config.get("pollIntervalSeconds", 1),
+        publish_timeout=outbox_config.get("publishTimeoutSeconds", 10),
+        max_retry_delay=outbox_config.get("maxRetryDelaySeconds", 30),
+        metrics=metrics,
+    )
+
+
+def _create_entity_validator(
+    app: FastAPI, validation_config: Dict[str, Any]
+) -> EntityValidator:
+    process_pool_config = validation_config.get("processPool", {})
+    if not process_pool_config.get("enabled", False):
+        return EntityValidator()
+    # spawned rather than forked, as forking copies the state of the event loop
+    # and of every thread running in this process
+    executor = ProcessPoolExecutor(
+        max_workers=process_pool_config.get("workers", 2),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    app.add_event_handler("shutdown", executor.shutdown)
+    return EntityValidator(
+        executor,
+        inline_threshold=process_pool_config.get("inlineThreshold", 1000),
+        chunk_size=process_pool_config.get("chunkSize", 250),
+    )
+
+
+def _create_caching_entity_repo(
+    entity_repo: IEntityRepo, cache_config: Dict[str, Any], metrics: MetricsRegistry
+) -> CachingEntityRepo:
+    entity_repo_cache = CachingEntityRepo(
+        entity_repo,
+        max_size=cache_config["maxSize"],
+        ttl_seconds=cache_config["ttlSeconds"],
+    )
+    metrics.counter(
+        "entity_repo_cache_hits_total", "Entity cache lookups served from the cache"
+    ).set_function(lambda: entity_repo_cache.stats.hits)
+    metrics.counter(
+        "entity_repo_cache_misses_total", "Entity cache lookups passed to the repo"
+    ).set_function(lambda: entity_repo_cache.stats.misses)
+    metrics.counter(
+        "entity_repo_cache_evictions_total",
+        "Entities evicted from the full cache to make room for others",
+    ).set_function(lambda: entity_repo_cache.stats.evictions)
+    metrics.counter(
+        "entity_repo_cache_expirations_total",
+        "Entities found expired in the cache, and dropped",
+    ).set_function(lambda: entity_repo_cache.stats.expirations)
+    metrics.gauge("entity_repo_cache_size", "Entities held in the cache").set_function(
+        lambda: entity_repo_cache.stats.size
+    )
+    return entity_repo_cache
+
+
+async def pool_timeout_exception_handler(request: Request, e: "PoolTimeoutError"):
+    # the service is saturated rather than broken: ask clients to back off and retry
+    return JSONResponse(
+        status_code=503, content={"detail": str(e)}, headers={"Retry-After": "1"}
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """main serves the app with uvicorn, in as many worker processes as configured
+
+    Each worker builds its own app with `app_factory`, so keeps its own connection pool,
+    caches and metrics; size the pool so that workers * maxSize fits within Postgres'
+    max_connections. Requests are spread across workers by the kernel, as they all
+    accept connections on the same socket.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c", "--config", default=DEFAULT_CONFIG_PATH, help="Config file"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes, 0 for one per CPU core; overrides server.workers",
+    )
+    args = parser.parse_args(argv)
+    server_config = load_config(args.config)["server"]
+    workers = (
+        args.workers if args.workers is not None else server_config.get("workers", 1)
+    )
+
+    # uvicorn is only needed to serve, not to build the app
+    import uvicorn  # type: ignore # pylint: disable=import-outside-toplevel
 
-def main():  # pylint: disable=missing-function-docstring
+    os.environ[CONFIG_PATH_ENV_VAR] = os.path.abspath(args.config)
     uvicorn.run(
-        "api.main:app",
-        host=config["server"]["host"],
-        port=config["server"]["port"],
+        "api.main:app_factory",
+        factory=True,
+        host=server_config["host"],
+        port=server_config["port"],
+        workers=workers or os.cpu_count(),
+        # "auto" picks uvloop and httptools when they are installed, as they are
+        # with fastapi[all], falling back to asyncio and h11
+        loop=server_config.get("loop", "auto"),
+        http=server_config.get("http", "auto"),
     )
+    return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""Benchmarks for the entity service, from the domain model up through the HTTP routes
+
+    python -m api.tests.benchmarks --runs 1000 --output benchmark-results.json
+
+Results for each benchmark include throughput and p50/p99 latency. Saved result files
+can be compared against a later run with `--baseline`, which flags any benchmark whose
+p50 latency regressed by more than `--threshold` percent.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import sys
+from typing import Dict, List
+
+from api.tests.benchmarks import (
+    bench_adapter,
+    bench_domain,
+    bench_http,
+    bench_repo,
+    bench_startup,
+)
+from api.tests.benchmarks.harness import BenchmarkResult
+
+SUITES = {
+    "domain": bench_domain,
+    "adapter": bench_adapter,
+    "repo": bench_repo,
+    "http": bench_http,
+    "startup": bench_startup,
+}
+
+
+def print_results(results: List[BenchmarkResult]) -> None:
+    print(
+        f"{'benchmark':<40} {'items/s':>12} {'p50 ms':>10} {'p99 ms':>10}",
+        file=sys.stderr,
+    )
+    for result in results:
+        print(
+            f"{result.name:<40} {result.items_per_second:>12.0f} "
+            f"{result.p50_ms:>10.3f} {result.p99_ms:>10.3f}",
+            file=sys.stderr,
+        )
+
+
+def compare(
+    results: List[BenchmarkResult], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        baseline_p50_ms = baseline[result.name]["p50_ms"]
+        change = (result.p50_ms - baseline_p50_ms) / baseline_p50_ms * 100
+        if change > threshold:
+            regressions.append(
+                f"{result.name}: p50 {baseline_p50_ms:.3f}ms -> {result.p50_ms:.3f}ms "
+                f"(+{change:.0f}%)"
+            )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> List[BenchmarkResult]:
+    results: List[BenchmarkResult] = []
+    for suite_name in args.suites:
+        results += await SUITES[suite_name].run(args.runs)
+    return results
+
+
+def main():  # pylint: disable=missing-function-docstring
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument(
+        "--suites", nargs="+", choices=list(SUITES), default=list(SUITES)
+    )
+    parser.add_argument("--output", help="Save results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved earlier")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Percent increase in p50 latency over the baseline counted as a regression",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "created_at": datetime.datetime.now(
+                        datetime.timezone.utc
+                    ).isoformat(),
+                    "python": platform.python_version(),
+                    "runs": args.runs,
+                    "results": [result.dict() for result in results],
+                },
+                output_file,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = {
+                result["name"]: result for result in json.load(baseline_file)["results"]
+            }
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
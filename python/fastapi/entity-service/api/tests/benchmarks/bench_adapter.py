@@ -0,0 +1,37 @@
+from typing import List
+
+from api.infrastructure.entity_aggregate.entity_repo_adapter import EntityRepoAdapter
+from api.tests.benchmarks.fixtures import (
+    child_entity_records,
+    entity_record,
+    new_entities,
+)
+from api.tests.benchmarks.harness import BenchmarkResult, measure
+
+
+async def run(runs: int) -> List[BenchmarkResult]:
+    entity = new_entities(1)[0]
+    record = entity_record(entity)
+    child_records = child_entity_records(entity)
+    results = []
+    for trusted in (False, True):
+        adapter = EntityRepoAdapter(trusted=trusted)
+        mode = "trusted" if trusted else "validated"
+
+        def round_trip(adapter=adapter):
+            adapter.from_entity(adapter.to_entity(record, child_records))
+
+        results += [
+            measure(
+                f"adapter.{mode}.to_entity",
+                lambda adapter=adapter: adapter.to_entity(record, child_records),
+                runs,
+            ),
+            measure(f"adapter.{mode}.round_trip", round_trip, runs),
+        ]
+    results.append(
+        measure(
+            "adapter.from_entity", lambda: EntityRepoAdapter().from_entity(entity), runs
+        )
+    )
+    return results
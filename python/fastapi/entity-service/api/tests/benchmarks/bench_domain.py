@@ -0,0 +1,15 @@
+from typing import List
+
+from api.domain.entity_aggregate.entity import Entity
+from api.tests.benchmarks.fixtures import entity_data
+from api.tests.benchmarks.harness import BenchmarkResult, measure
+
+
+async def run(runs: int) -> List[BenchmarkResult]:
+    data = entity_data()
+    entity = Entity.parse_obj(data)
+    return [
+        measure("domain.entity_parse_obj", lambda: Entity.parse_obj(data), runs),
+        measure("domain.entity_copy", entity.copy, runs),
+        measure("domain.entity_json", entity.json, runs),
+    ]
@@ -0,0 +1,67 @@
+import itertools
+from typing import List
+
+from fastapi import FastAPI
+
+from api.application.entity_aggregate.entity_handler import EntityHandler
+from api.application.entity_aggregate.entity_router import (
+    API_V0_ENTITIES_BATCH_PATH,
+    API_V0_ENTITIES_PATH,
+    entity_router,
+)
+from api.domain.entity_aggregate.entity_service import EntityService
+from api.infrastructure.entity_aggregate.in_memory_entity_repo import (
+    InMemoryEntityRepo,
+)
+from api.tests.benchmarks.fixtures import entity_data, new_entities
+from api.tests.benchmarks.harness import ASGIClient, BenchmarkResult, measure_async
+
+PRELOADED_ENTITY_COUNT = 1000
+
+
+async def run(runs: int) -> List[BenchmarkResult]:
+    """run benchmarks the entity routes end to end, backed by an InMemoryEntityRepo
+    so that the timings reflect the HTTP, handler and domain layers rather than the database
+    """
+    repo = InMemoryEntityRepo()
+    entities = await repo.create_many(new_entities(PRELOADED_ENTITY_COUNT))
+    app = FastAPI()
+    app.include_router(entity_router(EntityHandler(EntityService(repo))))
+    client = ASGIClient(app)
+
+    entity_ids = itertools.cycle([str(entity.entity_id) for entity in entities])
+    batch_entity_ids = [str(entity.entity_id) for entity in entities[:20]]
+    data = entity_data()
+
+    async def request(method, path, expected_status=200, **kwargs):
+        status, body = await client.request(method, path, **kwargs)
+        assert status == expected_status, body
+
+    return [
+        await measure_async(
+            "http.get_entity",
+            lambda: request("GET", f"{API_V0_ENTITIES_PATH}/{next(entity_ids)}"),
+            runs,
+        ),
+        await measure_async(
+            "http.get_entities",
+            lambda: request(
+                "GET",
+                API_V0_ENTITIES_BATCH_PATH,
+                query={"entity_id": batch_entity_ids},
+            ),
+            runs,
+            items_per_run=len(batch_entity_ids),
+        ),
+        await measure_async(
+            "http.list_entities",
+            lambda: request("GET", API_V0_ENTITIES_PATH, query={"size": 20}),
+            runs,
+            items_per_run=20,
+        ),
+        await measure_async(
+            "http.create_entity",
+            lambda: request("PUT", API_V0_ENTITIES_PATH, json_body=data),
+            runs,
+        ),
+    ]
@@ -0,0 +1,228 @@
+import asyncio
+import itertools
+import os
+import sys
+from typing import List
+
+import databases
+
+from api.domain.entity_aggregate.entity import EntityCountStrategy
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.tables import (
+    CHILD_ENTITY_TABLE,
+    ENTITY_CHILD_ENTITY_TABLE,
+    ENTITY_DOCUMENT_TABLE,
+    ENTITY_TABLE,
+    OUTBOX_EVENT_TABLE,
+)
+from api.infrastructure.entity_aggregate.coalescing_entity_repo import (
+    CoalescingEntityRepo,
+)
+from api.infrastructure.entity_aggregate.entity_document_repo import (
+    PGEntityDocumentRepo,
+)
+from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+from api.tests.benchmarks.fixtures import new_entities
+from api.tests.benchmarks.harness import BenchmarkResult, measure_async
+
+CREATE_MANY_BATCH_SIZE = 100
+GET_BURST_SIZE = 50
+
+
+def pg_url() -> str:
+    pg_host = os.getenv("TEST_POSTGRES_HOST", default="localhost")
+    pg_port = os.getenv("TEST_POSTGRES_PORT", default=5432)
+    pg_user = os.getenv("TEST_POSTGRES_USER", default="postgres")
+    pg_password = os.getenv("TEST_POSTGRES_PASSWORD", default="")
+    pg_database = os.getenv("TEST_POSTGRES_DB", "entity_service_test")
+    return f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_database}"
+
+
+async def _truncate(pg_client: databases.Database) -> None:
+    tables = [
+        ENTITY_CHILD_ENTITY_TABLE,
+        ENTITY_TABLE,
+        CHILD_ENTITY_TABLE,
+        ENTITY_DOCUMENT_TABLE,
+        OUTBOX_EVENT_TABLE,
+    ]
+    await pg_client.execute(
+        "TRUNCATE TABLE {0} CASCADE".format(", ".join(table.name for table in tables))
+    )
+
+
+async def run(runs: int) -> List[BenchmarkResult]:
+    """run benchmarks PGEntityRepo, and PGEntityDocumentRepo storing the same aggregates
+    as documents, against the test database used by the test suite, which is truncated
+    before and after; it is skipped if the database cannot be reached
+    """
+    pg_client = databases.Database(pg_url())
+    try:
+        await pg_client.connect()
+    except (OSError, ConnectionError) as e:
+        print(
+            f"skipping repo benchmarks, cannot connect to Postgres: {e}",
+            file=sys.stderr,
+        )
+        return []
+
+    results = []
+    try:
+        await _truncate(pg_client)
+        for layout, repo_class in (
+            ("pg", PGEntityRepo),
+            ("pg_document", PGEntityDocumentRepo),
+        ):
+            for trusted in (False, True):
+                repo = repo_class(PGClient(pg_client), trusted_rehydration=trusted)
+                mode = "trusted" if trusted else "validated"
+                # every run needs entities with fresh ids;
+                # build them all outside the timings
+                entities = iter(new_entities(runs + 10))
+                batches = iter(
+                    [
+                        new_entities(CREATE_MANY_BATCH_SIZE)
+                        for _ in range(runs // 10 + 2)
+                    ]
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.create",
+                        lambda repo=repo, entities=entities: repo.create(
+                            next(entities)
+                        ),
+                        runs,
+                    )
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.create_many",
+                        lambda repo=repo, batches=batches: repo.create_many(
+                            next(batches)
+                        ),
+                        runs // 10,
+                        warmup=2,
+                        items_per_run=CREATE_MANY_BATCH_SIZE,
+                    )
+                )
+                stored_entities = [entity async for entity in repo.iterate()]
+                entity_ids = itertools.cycle(
+                    [entity.entity_id for entity in stored_entities]
+                )
+                # rewrites existing aggregates, the costlier branch of the upsert
+                changed_entities = itertools.cycle(
+                    [
+                        entity.copy(update={"is_active": not entity.is_active})
+                        for entity in stored_entities
+                    ]
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.get",
+                        lambda repo=repo, entity_ids=entity_ids: repo.get(
+                            next(entity_ids)
+                        ),
+                        runs,
+                    )
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.create_or_update",
+                        lambda repo=repo, changed_entities=changed_entities: (
+                            repo.create_or_update(next(changed_entities))
+                        ),
+                        runs,
+                    )
+                )
+                # the batched counterpart of create_or_update,
+                # as a unit of work commits it
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.write_changes",
+                        lambda repo=repo, changed_entities=changed_entities: (
+                            repo.write_changes(
+                                dirty=list(
+                                    itertools.islice(
+                                        changed_entities, CREATE_MANY_BATCH_SIZE
+                                    )
+                                )
+                            )
+                        ),
+                        runs // 10,
+                        warmup=2,
+                        items_per_run=CREATE_MANY_BATCH_SIZE,
+                    )
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.where",
+                        lambda repo=repo: repo.where(size=20),
+                        runs,
+                        items_per_run=20,
+                    )
+                )
+                results.append(
+                    await measure_async(
+                        f"repo.{layout}.{mode}.where_filtered",
+                        lambda repo=repo: repo.where(
+                            size=20,
+                            spec=EntityFilter(is_active=True),
+                            sort=EntitySort.UPDATED_AT_DESC,
+                        ),
+                        runs,
+                        items_per_run=20,
+                    )
+                )
+                for count in EntityCountStrategy:
+                    results.append(
+                        await measure_async(
+                            f"repo.{layout}.{mode}.where_counted_{count.value}",
+                            lambda repo=repo, count=count: repo.where(
+                                size=20, count=count
+                            ),
+                            runs,
+                            items_per_run=20,
+                        )
+                    )
+                # a burst of concurrent gets of one hot aggregate,
+                # read once when coalesced
+                hot_entity_id = stored_entities[0].entity_id
+                for name, burst_repo in (
+                    ("get_burst", repo),
+                    ("coalesced.get_burst", CoalescingEntityRepo(repo)),
+                ):
+                    results.append(
+                        await measure_async(
+                            f"repo.{layout}.{mode}.{name}",
+                            lambda burst_repo=burst_repo: asyncio.gather(
+                                *(
+                                    burst_repo.get(hot_entity_id)
+                                    for _ in range(GET_BURST_SIZE)
+                                )
+                            ),
+                            runs // 10,
+                            warmup=2,
+                            items_per_run=GET_BURST_SIZE,
+                        )
+                    )
+                await _truncate(pg_client)
+        # the same upsert, also recording an event in the outbox within its statement
+        repo = PGEntityRepo(PGClient(pg_client), emit_events=True)
+        changed_entities = itertools.cycle(
+            [
+                entity.copy(update={"is_active": not entity.is_active})
+                for entity in await repo.create_many(new_entities(100))
+            ]
+        )
+        results.append(
+            await measure_async(
+                "repo.pg.emitting_events.create_or_update",
+                lambda: repo.create_or_update(next(changed_entities)),
+                runs,
+            )
+        )
+        await _truncate(pg_client)
+    finally:
+        await pg_client.disconnect()
+    return results
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from typing import List
+
+from api.tests.benchmarks.harness import BenchmarkResult, measure
+
+# seconds from starting a worker process to its app being built, before connecting;
+# rollouts restart every worker, so this bounds how quickly capacity comes back
+STARTUP_TARGET_SECONDS = 0.5
+
+# each run starts a fresh interpreter, so a few suffice
+MAX_RUNS = 20
+
+_BUILD_APP = """
+from api.main import create_app
+create_app({{"entityRepo": {{"type": "{entity_repo_type}"}}, "postgres": {{}}}})
+"""
+
+
+def _build_app_in_new_process(entity_repo_type: str) -> None:
+    subprocess.run(
+        [sys.executable, "-c", _BUILD_APP.format(entity_repo_type=entity_repo_type)],
+        check=True,
+    )
+
+
+async def run(runs: int) -> List[BenchmarkResult]:
+    """run times starting a new Python process which imports the service
+    and builds its app, as each worker process does when it starts,
+    and reports any configuration missing STARTUP_TARGET_SECONDS at p50
+    """
+    results = [
+        measure(
+            f"startup.{entity_repo_type}",
+            lambda entity_repo_type=entity_repo_type: _build_app_in_new_process(
+                entity_repo_type
+            ),
+            min(runs, MAX_RUNS),
+            warmup=1,
+        )
+        for entity_repo_type in ("inMemory", "postgres")
+    ]
+    for result in results:
+        if result.p50_ms > STARTUP_TARGET_SECONDS * 1000:
+            print(
+                f"{result.name} missed the startup target of {STARTUP_TARGET_SECONDS}s",
+                file=sys.stderr,
+            )
+    return results
@@ -0,0 +1,44 @@
+from typing import Any, Dict, List
+
+from api.domain.entity_aggregate.entity import Entity
+
+
+def entity_data(i: int = 0) -> Dict[str, Any]:
+    """entity_data is the raw form of a fully-populated Entity, as a client would send it"""
+    return {
+        "bar_value": {"attribute_0": str(i), "attribute_1": i},
+        "child_entities": [
+            {"attribute_a": str(j), "attribute_b": j, "attribute_c": f"{j}.5"}
+            for j in range(Entity.MAX_CHILD_ENTITY_COUNT)
+        ],
+        "is_active": True,
+    }
+
+
+def new_entities(count: int) -> List[Entity]:
+    return [Entity.parse_obj(entity_data(i)) for i in range(count)]
+
+
+class RecordStub(dict):
+    """RecordStub stands in for a database Record, supporting both key and attribute access"""
+
+    def __getattr__(self, name: str) -> Any:
+        return self[name]
+
+
+def entity_record(entity: Entity) -> RecordStub:
+    return RecordStub(
+        entity_id=entity.entity_id,
+        bar_value_object_attribute_0=entity.bar_value.attribute_0,
+        bar_value_object_attribute_1=entity.bar_value.attribute_1,
+        is_active=entity.is_active,
+        created_at=entity.created_at,
+        updated_at=entity.updated_at,
+    )
+
+
+def child_entity_records(entity: Entity) -> List[RecordStub]:
+    return [
+        RecordStub(child_entity.dict(), entity_id=entity.entity_id)
+        for child_entity in entity.child_entities
+    ]
@@ -0,0 +1,170 @@
+import gc
+import json
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+import pydantic
+
+
+class BenchmarkResult(pydantic.BaseModel):
+    """BenchmarkResult summarizes the timings of many runs of one benchmarked operation
+
+    `items_per_run` is the number of entities handled by each run, so that throughput
+    of batch operations can be compared with that of their one-at-a-time counterparts.
+    """
+
+    class Config:
+        allow_mutation = False
+
+    name: str
+    runs: int
+    items_per_run: int
+    total_seconds: float
+    runs_per_second: float
+    items_per_second: float
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+
+
+def _percentile(sorted_timings: List[float], percentile: float) -> float:
+    index = min(len(sorted_timings) - 1, int(len(sorted_timings) * percentile / 100))
+    return sorted_timings[index]
+
+
+def summarize(name: str, timings: List[float], items_per_run: int) -> BenchmarkResult:
+    sorted_timings = sorted(timings)
+    total_seconds = sum(timings)
+    return BenchmarkResult(
+        name=name,
+        runs=len(timings),
+        items_per_run=items_per_run,
+        total_seconds=total_seconds,
+        runs_per_second=len(timings) / total_seconds,
+        items_per_second=len(timings) * items_per_run / total_seconds,
+        mean_ms=statistics.fmean(timings) * 1000,
+        p50_ms=_percentile(sorted_timings, 50) * 1000,
+        p99_ms=_percentile(sorted_timings, 99) * 1000,
+    )
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    runs: int,
+    warmup: int = 10,
+    items_per_run: int = 1,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    # collections triggered by earlier benchmarks would otherwise land in random runs
+    gc.collect()
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(name, timings, items_per_run)
+
+
+async def measure_async(
+    name: str,
+    fn: Callable[[], Awaitable[Any]],
+    runs: int,
+    warmup: int = 10,
+    items_per_run: int = 1,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        await fn()
+    timings = []
+    gc.collect()
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(name, timings, items_per_run)
+
+
+class ASGIResponse(NamedTuple):
+    status: int
+    # header names lowercased
+    headers: Dict[str, str]
+    body: bytes
+
+
+class ASGIClient:
+    """ASGIClient sends HTTP requests straight into an ASGI app within the same process,
+    so that end-to-end timings include routing, validation, handlers and serialization,
+    but no sockets or HTTP parsing
+    """
+
+    def __init__(self, app: Callable):
+        self._app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+    ) -> Tuple[int, bytes]:
+        response = await self.send(method, path, query=query, json_body=json_body)
+        return response.status, response.body
+
+    async def send(
+        self,
+        method: str,
+        path: str,
+        query: Optional[Dict[str, Any]] = None,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        """send is `request`, also taking request headers and giving response headers"""
+        body = b"" if json_body is None else json.dumps(json_body).encode()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": urlencode(query or {}, doseq=True).encode(),
+            "headers": [
+                (b"host", b"benchmark"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *(
+                    (name.lower().encode(), value.encode())
+                    for name, value in (headers or {}).items()
+                ),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+        request_messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status = 0
+        response_headers: Dict[str, str] = {}
+        response_body = []
+
+        async def receive() -> dict:
+            if request_messages:
+                return request_messages.pop()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update(
+                    (name.decode().lower(), value.decode())
+                    for name, value in message.get("headers", [])
+                )
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+
+        await self._app(scope, receive, send)
+        return ASGIResponse(status, response_headers, b"".join(response_body))
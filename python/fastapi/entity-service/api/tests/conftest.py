@@ -3,20 +3,38 @@ import os
 import databases
 import pytest
 import pytest_asyncio
+import sqlalchemy as sa
 
-from api.infrastructure.datastore.postgres.tables import ENTITY_TABLE, CHILD_ENTITY_TABLE
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.tables import (
+    CHILD_ENTITY_TABLE,
+    ENTITY_CHILD_ENTITY_TABLE,
+    ENTITY_DOCUMENT_TABLE,
+    ENTITY_TABLE,
+    OUTBOX_EVENT_TABLE,
+)
+from api.infrastructure.entity_aggregate.entity_document_repo import (
+    PGEntityDocumentRepo,
+)
 from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+from api.infrastructure.entity_aggregate.in_memory_entity_repo import (
+    InMemoryEntityRepo,
+)
 from api.tests.stubs.entity_aggregate.entity import stub_entities
 
 
-@pytest_asyncio.fixture
-async def pg_client() -> databases.Database:
+@pytest.fixture
+def pg_url() -> str:
     pg_host = os.getenv("TEST_POSTGRES_HOST", default="localhost")
     pg_port = os.getenv("TEST_POSTGRES_PORT", default=5432)
     pg_user = os.getenv("TEST_POSTGRES_USER", default="postgres")
     pg_password = os.getenv("TEST_POSTGRES_PASSWORD", default="")
     pg_database = os.getenv("TEST_POSTGRES_DB", "entity_service_test")
-    pg_url = f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_database}"
+    return f"postgresql://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_database}"
+
+
+@pytest_asyncio.fixture
+async def pg_client(pg_url) -> databases.Database:
     pg_client = databases.Database(pg_url)
     await pg_client.connect()
     yield pg_client
@@ -25,22 +43,48 @@ async def pg_client() -> databases.Database:
 
 @pytest_asyncio.fixture
 async def pg_db(pg_client) -> databases.Database:
-    tables = [ENTITY_TABLE, CHILD_ENTITY_TABLE]
+    # children before the tables they reference
+    tables = [
+        ENTITY_CHILD_ENTITY_TABLE,
+        CHILD_ENTITY_TABLE,
+        ENTITY_TABLE,
+        ENTITY_DOCUMENT_TABLE,
+        OUTBOX_EVENT_TABLE,
+    ]
+
+    async def clear():
+        # DELETE rather than TRUNCATE: the tables only ever hold a handful of rows,
+        # whereas TRUNCATE creates new files for every table and index, taking seconds
+        async with pg_client.transaction():
+            for table in tables:
+                await pg_client.execute(sa.delete(table))
 
-    for table in tables:
-        async with pg_client.connection() as conn:
-            await conn.execute("TRUNCATE TABLE {0} CASCADE".format(table.name))
+    await clear()
 
     yield
 
-    for table in tables:
-        async with pg_client.connection() as conn:
-            await conn.execute("TRUNCATE TABLE {0} CASCADE".format(table.name))
+    await clear()
 
 
 @pytest_asyncio.fixture
 async def pg_entity_repo(pg_client, pg_db) -> PGEntityRepo:
-    repo = PGEntityRepo(pg_client)
+    repo = PGEntityRepo(PGClient(pg_client))
+    for stub_entity in stub_entities:
+        await repo.create(stub_entity)
+    return repo
+
+
+@pytest_asyncio.fixture
+async def pg_entity_document_repo(pg_client, pg_db) -> PGEntityDocumentRepo:
+    repo = PGEntityDocumentRepo(PGClient(pg_client))
+    for stub_entity in stub_entities:
+        await repo.create(stub_entity)
+    return repo
+
+
+@pytest_asyncio.fixture
+async def in_memory_entity_repo() -> InMemoryEntityRepo:
+    repo = InMemoryEntityRepo()
     for stub_entity in stub_entities:
         await repo.create(stub_entity)
     return repo
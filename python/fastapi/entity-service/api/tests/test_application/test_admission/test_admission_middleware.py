@@ -0,0 +1,83 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from starlette.types import Message, Receive, Scope, Send
+
+from api.application.admission.admission_middleware import (
+    AdmissionLimit,
+    AdmissionMiddleware,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class SlowApp:
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def request(app, method: str = "GET", path: str = "/api/v0/entities") -> Dict:
+    messages: List[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    start = messages[0]
+    return {
+        "status": start["status"],
+        "headers": {key.decode(): value.decode() for key, value in start["headers"]},
+    }
+
+
+def admission_middleware(app, max_wait: float = 5) -> AdmissionMiddleware:
+    limit = AdmissionLimit(max_concurrency=1, max_queue=1, max_wait=max_wait)
+    return AdmissionMiddleware(app, read_limit=limit, write_limit=limit)
+
+
+async def test_admission__sheds_requests_over_capacity():
+    app = SlowApp()
+    middleware = admission_middleware(app)
+
+    in_flight = asyncio.create_task(request(middleware))
+    queued = asyncio.create_task(request(middleware))
+    await asyncio.sleep(0)
+
+    # Assert the request finding the queue full is rejected at once, as is any write
+    # or health check, which are limited separately or not at all
+    rejected = await request(middleware)
+    assert rejected["status"] == 503
+    assert rejected["headers"]["retry-after"] == "1"
+    writing = asyncio.create_task(request(middleware, method="PUT"))
+    app.release.set()
+    assert (await request(middleware, path="/health"))["status"] == 200
+
+    # Assert the queued request is admitted once the one in flight finishes
+    assert [(await task)["status"] for task in (in_flight, queued, writing)] == [
+        200,
+        200,
+        200,
+    ]
+
+
+async def test_admission__rejects_after_max_wait():
+    app = SlowApp()
+    middleware = admission_middleware(app, max_wait=0.01)
+
+    in_flight = asyncio.create_task(request(middleware))
+    await asyncio.sleep(0)
+
+    assert (await request(middleware))["status"] == 503
+    app.release.set()
+    assert (await in_flight)["status"] == 200
+    # Assert the timed out request gave up its place in the queue
+    assert (await request(middleware))["status"] == 200
@@ -0,0 +1,304 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from api.application.entity_aggregate.entity_handler import EntityHandler
+from api.application.entity_aggregate.entity_router import (
+    API_V0_ENTITIES_BATCH_PATH,
+    API_V0_ENTITIES_ID_PATH,
+    API_V0_ENTITIES_PATH,
+    API_V0_ENTITIES_STREAM_PATH,
+    entity_router,
+)
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+from api.domain.entity_aggregate.entity_service import EntityService
+from api.tests.benchmarks.harness import ASGIClient
+from api.tests.stubs.entity_aggregate.entity import stub_entities
+
+pytestmark = pytest.mark.asyncio
+
+
+def entity_data(entity_id: uuid.UUID) -> dict:
+    return {
+        "entity_id": str(entity_id),
+        "bar_value": {"attribute_0": "0", "attribute_1": 1},
+        "child_entities": [
+            {"attribute_a": "a", "attribute_b": 1, "attribute_c": "1.10"}
+        ],
+        "is_active": True,
+    }
+
+
+@pytest_asyncio.fixture
+async def client(in_memory_entity_repo) -> ASGIClient:
+    app = FastAPI()
+    app.include_router(
+        entity_router(EntityHandler(EntityService(in_memory_entity_repo)))
+    )
+    return ASGIClient(app)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"page": -1},
+        {"size": 0},
+        {"size": -5},
+        {"size": EntityHandler.MAX_PAGE_SIZE + 1},
+    ],
+)
+async def test_list__out_of_range_page(client, query):
+    response = await client.send("GET", API_V0_ENTITIES_PATH, query=query)
+
+    assert response.status == 422
+
+
+async def test_list__largest_page(client):
+    response = await client.send(
+        "GET", API_V0_ENTITIES_PATH, query={"size": EntityHandler.MAX_PAGE_SIZE}
+    )
+
+    assert response.status == 200
+
+
+async def test_stream__lists_as_list_does(client, in_memory_entity_repo):
+    await in_memory_entity_repo.create_many(
+        [
+            Entity(
+                bar_value=BarValueObject(attribute_0=str(i % 2), attribute_1=i),
+                child_entities=(
+                    ChildEntity(
+                        attribute_a="a", attribute_b=i, attribute_c=Decimal("1.10")
+                    ),
+                ),
+                is_active=True,
+            )
+            for i in range(5)
+        ]
+    )
+    query = {"bar_value_attribute_0": "1", "sort": "-created_at"}
+
+    listed = await client.send(
+        "GET", API_V0_ENTITIES_PATH, query={**query, "size": 100}
+    )
+    # read a page at a time, the stream is continued across pages
+    streamed = await client.send(
+        "GET", API_V0_ENTITIES_STREAM_PATH, query={**query, "size": 1}
+    )
+
+    # Assert the stream holds the Entities of the listing, in order, encoded alike
+    assert streamed.status == 200
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    listed_entities = json.loads(listed.body)["entities"]
+    assert len(listed_entities) == 2
+    assert [json.loads(line) for line in streamed.body.splitlines()] == listed_entities
+    assert listed_entities[0]["child_entities"][0]["attribute_c"] == 1.1
+
+
+@pytest.mark.parametrize(
+    "query, status",
+    [
+        ({"cursor": "not a cursor"}, 400),
+        ({"size": 0}, 422),
+        ({"is_active": "maybe"}, 422),
+    ],
+)
+async def test_stream__invalid_parameters(client, query, status):
+    response = await client.send("GET", API_V0_ENTITIES_STREAM_PATH, query=query)
+
+    # Assert the error is answered before streaming begins
+    assert response.status == status
+
+
+@pytest.mark.parametrize(
+    "path", [API_V0_ENTITIES_ID_PATH, API_V0_ENTITIES_PATH], ids=["get", "list"]
+)
+async def test_conditional_get__not_modified(client, path):
+    path = path.format(entity_id=stub_entities[0].entity_id)
+    etag = (await client.send("GET", path)).headers["etag"]
+
+    for if_none_match in (etag, etag[2:], f'W/"other", {etag}', "*"):
+        response = await client.send(
+            "GET", path, headers={"If-None-Match": if_none_match}
+        )
+
+        # Assert a matching tag, weak or strong, or any tag, is answered with 304
+        assert response.status == 304, if_none_match
+        assert response.body == b""
+        assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize(
+    "path", [API_V0_ENTITIES_ID_PATH, API_V0_ENTITIES_PATH], ids=["get", "list"]
+)
+async def test_conditional_get__modified(client, in_memory_entity_repo, path):
+    path = path.format(entity_id=stub_entities[0].entity_id)
+    stale_etag = (await client.send("GET", path)).headers["etag"]
+    await in_memory_entity_repo.update(
+        stub_entities[0].copy(
+            update={
+                "updated_at": stub_entities[0].updated_at
+                + datetime.timedelta(seconds=1)
+            }
+        )
+    )
+
+    response = await client.send("GET", path, headers={"If-None-Match": stale_etag})
+
+    # Assert the updated Entity is sent in full, under a new tag
+    assert response.status == 200
+    assert response.headers["etag"] != stale_etag
+    assert stub_entities[0].entity_id.hex in response.body.decode().replace("-", "")
+
+
+async def test_create__already_exists(client):
+    response = await client.send(
+        "PUT", API_V0_ENTITIES_PATH, json_body=entity_data(stub_entities[0].entity_id)
+    )
+
+    assert response.status == 409
+
+
+async def test_create_many__reports_failed_items(client):
+    entity_ids = [uuid.uuid4() for _ in range(3)]
+    entities_data = [
+        entity_data(entity_ids[0]),
+        entity_data(stub_entities[0].entity_id),
+        {**entity_data(entity_ids[1]), "bar_value": {}},
+        entity_data(entity_ids[2]),
+        entity_data(entity_ids[0]),
+    ]
+
+    response = await client.send(
+        "PUT", API_V0_ENTITIES_BATCH_PATH, json_body=entities_data
+    )
+
+    # Assert the valid, new and first submitted items are created, and every other item
+    # is reported by its index, in order, whatever the reason it failed for
+    assert response.status == 200
+    result = json.loads(response.body)
+    assert [entity["entity_id"] for entity in result["created"]] == [
+        str(entity_ids[0]),
+        str(entity_ids[2]),
+    ]
+    errors = result["errors"]
+    assert [error["index"] for error in errors] == [1, 2, 4]
+    assert str(stub_entities[0].entity_id) in errors[0]["detail"]
+    assert "bar_value" in errors[1]["detail"]
+    assert errors[2]["detail"].startswith("Duplicate of item 0")
+
+
+async def test_create_many__too_many(client):
+    response = await client.send(
+        "PUT",
+        API_V0_ENTITIES_BATCH_PATH,
+        json_body=[{}] * (EntityHandler.MAX_CREATE_MANY_SIZE + 1),
+    )
+
+    assert response.status == 400
+
+
+async def test_get_many__success(client):
+    response = await client.send(
+        "GET",
+        API_V0_ENTITIES_BATCH_PATH,
+        query={"entity_id": [str(stub_entities[0].entity_id), str(uuid.uuid4())]},
+    )
+
+    # Assert entities which do not exist are left out
+    assert response.status == 200
+    assert [entity["entity_id"] for entity in json.loads(response.body)] == [
+        str(stub_entities[0].entity_id)
+    ]
+
+
+@pytest.mark.parametrize(
+    "count, status",
+    [
+        (EntityHandler.MAX_GET_MANY_SIZE, 200),
+        (EntityHandler.MAX_GET_MANY_SIZE + 1, 400),
+    ],
+)
+async def test_get_many__size_limit(client, count, status):
+    response = await client.send(
+        "GET",
+        API_V0_ENTITIES_BATCH_PATH,
+        query={"entity_id": [str(uuid.uuid4()) for _ in range(count)]},
+    )
+
+    assert response.status == status
+
+
+@pytest.mark.parametrize("count", ["exact", "estimate", "cached"])
+async def test_list__count(client, count):
+    response = await client.send(
+        "GET", API_V0_ENTITIES_PATH, query={"count": count, "size": 1}
+    )
+
+    # Assert the total counts every Entity, not just those of the page
+    assert response.status == 200
+    entity_list = json.loads(response.body)
+    assert len(entity_list["entities"]) == 1
+    assert entity_list["total"] == len(stub_entities)
+
+
+async def test_list__no_count(client):
+    response = await client.send("GET", API_V0_ENTITIES_PATH)
+
+    assert response.status == 200
+    assert json.loads(response.body)["total"] is None
+
+
+async def test_list__filter(client, in_memory_entity_repo):
+    created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    entities = [
+        Entity(
+            **{**entity_data(uuid.uuid4()), "is_active": i % 2 == 0},
+            created_at=created_at + datetime.timedelta(days=i),
+        )
+        for i in range(5)
+    ]
+    await in_memory_entity_repo.create_many(entities)
+
+    response = await client.send(
+        "GET",
+        API_V0_ENTITIES_PATH,
+        query={
+            "is_active": "true",
+            "bar_value_attribute_0": "0",
+            "bar_value_attribute_1": "1",
+            "created_since": "2020-01-02T00:00:00Z",
+            "created_before": "2021-01-01T00:00:00+00:00",
+            "count": "exact",
+        },
+    )
+
+    # Assert the active Entities created from the second day on are listed and counted
+    assert response.status == 200
+    entity_list = json.loads(response.body)
+    assert [entity["entity_id"] for entity in entity_list["entities"]] == [
+        str(entities[i].entity_id) for i in (2, 4)
+    ]
+    assert entity_list["total"] == 2
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"count": "approximate"},
+        {"sort": "bar_value"},
+        {"is_active": "maybe"},
+        {"bar_value_attribute_1": "one"},
+        {"created_since": "yesterday"},
+        {"updated_before": "2020-13-01T00:00:00Z"},
+    ],
+)
+async def test_list__invalid_parameters(client, query):
+    response = await client.send("GET", API_V0_ENTITIES_PATH, query=query)
+
+    assert response.status == 422
@@ -0,0 +1,60 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from api.application.entity_aggregate.entity_validator import EntityValidator
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+
+pytestmark = pytest.mark.asyncio
+
+
+def new_entity(i: int) -> Entity:
+    return Entity(
+        bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+        child_entities=(
+            ChildEntity(attribute_a="a", attribute_b=i, attribute_c=Decimal("1.50")),
+        ),
+        is_active=i % 2 == 0,
+    )
+
+
+async def test_validate__in_process_pool_matches_inline():
+    entities = [new_entity(i) for i in range(7)]
+    items = [
+        *(entity.dict() for entity in entities[:4]),
+        {"bar_value": {"attribute_0": "0", "attribute_1": 0}},
+        *(entity.json() for entity in entities[4:]),
+        "not json",
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        pooled = await EntityValidator(
+            executor, inline_threshold=0, chunk_size=3
+        ).validate(items)
+    inline = await EntityValidator().validate(items)
+
+    # Assert entities validated in worker processes are rebuilt whole, in order
+    assert pooled.entities == inline.entities == entities
+    assert pooled.indexes == inline.indexes == [0, 1, 2, 3, 5, 6, 7]
+    # Assert invalid items are reported by their index in the payload
+    assert [error.index for error in pooled.errors] == [4, 8]
+    assert pooled.errors == inline.errors
+
+
+async def test_validate__reports_duplicates():
+    entity = new_entity(0)
+    duplicate = entity.copy(update={"bar_value": new_entity(1).bar_value})
+    items = [entity.dict(), new_entity(1).dict(), duplicate.dict(), entity.json()]
+
+    validation = await EntityValidator().validate(items)
+
+    # Assert only the first item of an entity_id is kept,
+    # and later ones are reported by their index in the payload
+    assert validation.entities[0] == entity
+    assert validation.indexes == [0, 1]
+    assert [error.index for error in validation.errors] == [2, 3]
+    assert "Duplicate of item 0" in validation.errors[0].detail
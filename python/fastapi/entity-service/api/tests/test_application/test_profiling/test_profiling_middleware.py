@@ -0,0 +1,93 @@
+import pstats
+from typing import Dict, List, Optional
+
+import pytest
+from starlette.types import Message, Receive, Scope, Send
+
+from api.application.profiling.profiling_middleware import ProfilingMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+def handle_request() -> bytes:
+    return b"".join(str(i).encode() for i in range(1000))
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": handle_request()})
+
+
+async def request(middleware, headers: Optional[Dict[str, str]] = None) -> Dict:
+    messages: List[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v0/entities",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+    }
+    await middleware(scope, receive, send)
+    start = messages[0]
+    return {
+        "status": start["status"],
+        "headers": {key.decode(): value.decode() for key, value in start["headers"]},
+        "body": b"".join(message.get("body", b"") for message in messages[1:]),
+    }
+
+
+async def test_profiling__only_authorized_requests(tmp_path):
+    middleware = ProfilingMiddleware(app, token="secret", output_dir=str(tmp_path))
+
+    unprofiled = await request(middleware, {"X-Profile": "guess"})
+    profiled = await request(middleware, {"X-Profile": "secret"})
+
+    # Assert the response is passed through either way, tagged with the profile's id
+    assert "x-profile-id" not in unprofiled["headers"]
+    assert profiled["status"] == 201
+    assert profiled["body"] == handle_request()
+    profile_id = profiled["headers"]["x-profile-id"]
+    # Assert the profile is written, loadable by pstats, along with its report
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{profile_id}.prof",
+        f"{profile_id}.txt",
+    ]
+    assert pstats.Stats(str(tmp_path / f"{profile_id}.prof")).total_calls > 0
+    assert "handle_request" in (tmp_path / f"{profile_id}.txt").read_text()
+
+
+async def test_profiling__download(tmp_path):
+    middleware = ProfilingMiddleware(app, token="secret", trace_allocations=True)
+
+    response = await request(
+        middleware, {"X-Profile": "secret", "X-Profile-Output": "download"}
+    )
+
+    # Assert the report replaces the response, which was still handled
+    assert response["status"] == 200
+    assert response["headers"]["x-profiled-status"] == "201"
+    assert response["headers"]["content-disposition"].startswith("attachment")
+    report = response["body"].decode()
+    assert "POST /api/v0/entities 201" in report
+    assert "handle_request" in report
+    assert "lines by memory allocated" in report
+
+
+async def test_profiling__sampled(tmp_path):
+    middleware = ProfilingMiddleware(app, sample_rate=1, output_dir=str(tmp_path))
+
+    response = await request(middleware)
+
+    assert response["body"] == handle_request()
+    assert (tmp_path / f"{response['headers']['x-profile-id']}.prof").exists()
+    with pytest.raises(ValueError):
+        ProfilingMiddleware(app, sample_rate=0.1)
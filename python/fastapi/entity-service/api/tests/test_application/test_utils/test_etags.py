@@ -0,0 +1,37 @@
+import datetime
+import uuid
+
+from api.application.utils.etags import etag_matches, version_etag
+
+ENTITY_ID = uuid.uuid4()
+UPDATED_AT = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def test_version_etag__changes_with_updated_at():
+    etag = version_etag([(ENTITY_ID, UPDATED_AT)])
+
+    assert etag.startswith('W/"')
+    assert etag == version_etag(
+        # the same instant in another timezone is the same version
+        [
+            (
+                ENTITY_ID,
+                UPDATED_AT.astimezone(datetime.timezone(datetime.timedelta(hours=2))),
+            )
+        ]
+    )
+    assert etag != version_etag(
+        [(ENTITY_ID, UPDATED_AT + datetime.timedelta(microseconds=1))]
+    )
+    assert etag != version_etag([(ENTITY_ID, UPDATED_AT)], context="page=1")
+
+
+def test_etag_matches__uses_weak_comparison():
+    etag = version_etag([(ENTITY_ID, UPDATED_AT)])
+    strong_etag = etag[2:]
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {strong_etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"other"', etag)
+    assert not etag_matches(None, etag)
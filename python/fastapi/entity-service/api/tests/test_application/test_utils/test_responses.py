@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+from api.application.utils.responses import exact_decimal_encoder
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+
+
+def test_exact_decimal_encoder__round_trips():
+    entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(
+            ChildEntity(
+                attribute_a="a",
+                attribute_b=0,
+                attribute_c=Decimal("0.1000000000000000000001"),
+            ),
+        ),
+        is_active=True,
+    )
+
+    encoded = entity.json(encoder=exact_decimal_encoder)
+
+    # Assert Decimals are encoded as strings, read back exactly, unlike floats
+    assert '"attribute_c": "0.1000000000000000000001"' in encoded
+    assert Entity.parse_raw(encoded) == entity
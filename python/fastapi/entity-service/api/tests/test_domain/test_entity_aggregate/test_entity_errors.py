@@ -0,0 +1,33 @@
+import pytest
+
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+    InvalidCursorError,
+    InvalidPageError,
+)
+
+
+@pytest.mark.parametrize(
+    "error, message",
+    [
+        (
+            EntityNotFoundError(field="entity_id", value="42"),
+            "Entity not found for: entity_id=42",
+        ),
+        (
+            EntityAlreadyExistsError(field="entity_id", value="42"),
+            "Entity already exists for: entity_id=42",
+        ),
+        (InvalidCursorError("abc"), "Invalid pagination cursor: abc"),
+        (
+            InvalidPageError("size", 0, "between 1 and 100"),
+            "Invalid page size: 0, must be between 1 and 100",
+        ),
+    ],
+)
+def test_error__message(error, message):
+    assert str(error) == message
+    # Assert the error holds its message, not itself, so that repr does not recurse
+    assert repr(error) == f"{type(error).__name__}({message!r})"
+    assert error.args == (message,)
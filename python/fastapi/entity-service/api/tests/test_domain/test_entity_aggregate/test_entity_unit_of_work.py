@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+import pytest
+
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+)
+from api.domain.entity_aggregate.entity_service import EntityService
+from api.tests.stubs.entity_aggregate.entity import stub_entities
+
+pytestmark = pytest.mark.asyncio
+
+
+def new_entity() -> Entity:
+    return Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=1),
+        child_entities=(
+            ChildEntity(attribute_a="42", attribute_b=42, attribute_c=Decimal("42.0")),
+        ),
+        is_active=True,
+    )
+
+
+async def test_commit__writes_all_changes(in_memory_entity_repo):
+    entity_service = EntityService(in_memory_entity_repo)
+    created_entity, forgotten_entity = new_entity(), new_entity()
+    dirty_entity = stub_entities[0].copy(update={"is_active": False})
+
+    async with entity_service.unit_of_work() as unit_of_work:
+        unit_of_work.register_new(created_entity)
+        unit_of_work.register_new(forgotten_entity)
+        unit_of_work.register_dirty(dirty_entity)
+        # deleting an Entity which was never written just stops tracking it
+        unit_of_work.register_deleted(forgotten_entity.entity_id)
+        # nothing is written before the unit commits
+        assert await entity_service.get_many([created_entity.entity_id]) == []
+
+    assert not unit_of_work.has_changes
+    assert await entity_service.get(created_entity.entity_id) == created_entity
+    stored_entity = await entity_service.get(dirty_entity.entity_id)
+    assert stored_entity.is_active is False
+    assert stored_entity.updated_at > stub_entities[0].updated_at
+    assert await entity_service.get_many([forgotten_entity.entity_id]) == []
+
+
+async def test_commit__atomic(in_memory_entity_repo):
+    entity_service = EntityService(in_memory_entity_repo)
+    unit_of_work = entity_service.unit_of_work()
+    created_entity = new_entity()
+    unit_of_work.register_deleted(stub_entities[0].entity_id)
+    unit_of_work.register_new(created_entity)
+    # this Entity was never written, so cannot be updated
+    unit_of_work.register_dirty(new_entity())
+
+    with pytest.raises(EntityNotFoundError):
+        await unit_of_work.commit()
+
+    # neither the delete nor the create were applied
+    assert await entity_service.get(stub_entities[0].entity_id) == stub_entities[0]
+    assert await entity_service.get_many([created_entity.entity_id]) == []
+    # the changes stay tracked, to be retried or rolled back
+    assert unit_of_work.has_changes
+
+
+async def test_register__conflicting_changes(in_memory_entity_repo):
+    unit_of_work = EntityService(in_memory_entity_repo).unit_of_work()
+    entity = new_entity()
+    unit_of_work.register_new(entity)
+
+    with pytest.raises(EntityAlreadyExistsError):
+        unit_of_work.register_new(entity)
+    unit_of_work.register_deleted(stub_entities[0].entity_id)
+    with pytest.raises(EntityNotFoundError):
+        unit_of_work.register_dirty(stub_entities[0])
@@ -0,0 +1,100 @@
+import asyncio
+from typing import List, Sequence
+
+import pydantic
+import pytest
+import pytest_asyncio
+
+from api.domain.entity_aggregate.entity import BarValueObject, Entity
+from api.domain.entity_aggregate.entity_errors import EntityNotFoundError
+from api.infrastructure.entity_aggregate.caching_entity_repo import CachingEntityRepo
+from api.infrastructure.entity_aggregate.in_memory_entity_repo import (
+    InMemoryEntityRepo,
+)
+
+pytestmark = pytest.mark.asyncio
+
+entities = [
+    Entity(
+        bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+        child_entities=(),
+        is_active=True,
+    )
+    for i in range(3)
+]
+
+
+class SlowEntityRepo(InMemoryEntityRepo):
+    """SlowEntityRepo holds reads in flight, having read, until `release` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+        entity = await super().get(entity_id)
+        await self.release.wait()
+        return entity
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        got_entities = await super().get_many(entity_ids)
+        await self.release.wait()
+        return got_entities
+
+
+@pytest_asyncio.fixture
+async def slow_entity_repo() -> SlowEntityRepo:
+    repo = SlowEntityRepo()
+    await repo.create_many(entities)
+    return repo
+
+
+def changed(entity: Entity) -> Entity:
+    return entity.copy(
+        update={"bar_value": BarValueObject(attribute_0="changed", attribute_1=0)}
+    )
+
+
+async def test_writes__invalidate_cached_entities(slow_entity_repo):
+    caching_repo = CachingEntityRepo(slow_entity_repo, max_size=10, ttl_seconds=60)
+    entity, other_entity, deleted_entity = await caching_repo.get_many(
+        [entity.entity_id for entity in entities]
+    )
+
+    # Assert every write path leaves the cache serving what was written
+    updated_entity = await caching_repo.update(changed(entity))
+    assert await caching_repo.get(entity.entity_id) == updated_entity
+    upserted_entity = await caching_repo.create_or_update(
+        entity.copy(update={"is_active": False})
+    )
+    assert await caching_repo.get(entity.entity_id) == upserted_entity
+    await caching_repo.delete(deleted_entity.entity_id)
+    with pytest.raises(EntityNotFoundError):
+        await caching_repo.get(deleted_entity.entity_id)
+    await caching_repo.write_changes(dirty=[changed(other_entity)])
+    assert await caching_repo.get(other_entity.entity_id) == changed(other_entity)
+    (created_entity,) = await caching_repo.create_many([deleted_entity])
+    assert await caching_repo.get(deleted_entity.entity_id) == created_entity
+
+
+@pytest.mark.parametrize("read", ["get", "get_many"])
+async def test_read__does_not_overwrite_concurrent_write(slow_entity_repo, read):
+    caching_repo = CachingEntityRepo(slow_entity_repo, max_size=10, ttl_seconds=60)
+    entity = entities[0]
+
+    # Start a read which misses, and have it hold on to what it read
+    slow_entity_repo.release.clear()
+    if read == "get":
+        stale_read = asyncio.create_task(caching_repo.get(entity.entity_id))
+    else:
+        stale_read = asyncio.create_task(caching_repo.get_many([entity.entity_id]))
+    await asyncio.sleep(0)
+    # Update the entity while the read is in flight, refreshing the cache
+    updated_entity = await caching_repo.update(changed(entity))
+    slow_entity_repo.release.set()
+    await stale_read
+
+    # Assert the read, finishing last, did not put back what the update replaced
+    assert caching_repo.stats.size == 1
+    assert await caching_repo.get(entity.entity_id) == updated_entity
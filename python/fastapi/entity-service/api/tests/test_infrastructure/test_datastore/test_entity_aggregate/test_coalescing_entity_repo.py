@@ -0,0 +1,139 @@
+import asyncio
+from typing import List, Sequence
+from uuid import uuid4
+
+import pydantic
+import pytest
+import pytest_asyncio
+
+from api.domain.entity_aggregate.entity import BarValueObject, Entity
+from api.domain.entity_aggregate.entity_errors import EntityNotFoundError
+from api.infrastructure.datastore import read_routing
+from api.infrastructure.entity_aggregate.coalescing_entity_repo import (
+    CoalescingEntityRepo,
+)
+from api.infrastructure.entity_aggregate.in_memory_entity_repo import (
+    InMemoryEntityRepo,
+)
+
+pytestmark = pytest.mark.asyncio
+
+entities = [
+    Entity(
+        bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+        child_entities=(),
+        is_active=True,
+    )
+    for i in range(3)
+]
+
+
+class CountingEntityRepo(InMemoryEntityRepo):
+    def __init__(self):
+        super().__init__()
+        self.get_many_calls: List[List[pydantic.UUID4]] = []
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        self.get_many_calls.append(list(entity_ids))
+        # yield, as a query would, so that later gets may find the read in flight
+        await asyncio.sleep(0)
+        return await super().get_many(entity_ids)
+
+
+@pytest_asyncio.fixture
+async def counting_entity_repo() -> CountingEntityRepo:
+    repo = CountingEntityRepo()
+    await repo.create_many(entities)
+    return repo
+
+
+async def test_get__coalesces_concurrent_gets(counting_entity_repo):
+    coalescing_repo = CoalescingEntityRepo(counting_entity_repo, max_batch_size=2)
+    entity_ids = [entity.entity_id for entity in entities]
+
+    got_entities = await asyncio.gather(
+        *(coalescing_repo.get(entity_id) for entity_id in [*entity_ids, *entity_ids])
+    )
+
+    # Assert gets of the same entity share a read, and distinct ones are batched
+    assert got_entities == [*entities, *entities]
+    assert counting_entity_repo.get_many_calls == [entity_ids[:2], entity_ids[2:]]
+    # Assert every caller gets an Entity of its own
+    assert got_entities[0] is not got_entities[3]
+
+
+async def test_get__not_found(counting_entity_repo):
+    coalescing_repo = CoalescingEntityRepo(counting_entity_repo)
+
+    entity, missing = await asyncio.gather(
+        coalescing_repo.get(entities[0].entity_id),
+        coalescing_repo.get(uuid4()),
+        return_exceptions=True,
+    )
+
+    assert entity == entities[0]
+    assert isinstance(missing, EntityNotFoundError)
+    assert len(counting_entity_repo.get_many_calls) == 1
+
+
+async def test_get__after_write_does_not_join_earlier_read(counting_entity_repo):
+    coalescing_repo = CoalescingEntityRepo(counting_entity_repo)
+    entity = entities[0]
+
+    earlier_read = asyncio.ensure_future(coalescing_repo.get(entity.entity_id))
+    while not counting_entity_repo.get_many_calls:
+        await asyncio.sleep(0)
+    await coalescing_repo.update(entity.copy(update={"is_active": False}))
+
+    assert (await coalescing_repo.get(entity.entity_id)).is_active is False
+    await earlier_read
+    assert len(counting_entity_repo.get_many_calls) == 2
+
+
+class ReplicatedEntityRepo(InMemoryEntityRepo):
+    """ReplicatedEntityRepo serves unpinned reads from a replica which never replays
+    writes made once it was taken, and pins the reads of a task which wrote,
+    as a PGEntityRepo on a replica set would
+    """
+
+    def __init__(self, replica: List[Entity]):
+        super().__init__()
+        self._replica = {entity.entity_id: entity for entity in replica}
+
+    async def get_many(self, entity_ids: Sequence[pydantic.UUID4]) -> List[Entity]:
+        if read_routing.is_pinned_to_primary():
+            return await super().get_many(entity_ids)
+        return [
+            self._replica[entity_id]
+            for entity_id in entity_ids
+            if entity_id in self._replica
+        ]
+
+    async def get(self, entity_id: pydantic.UUID4) -> Entity:
+        (entity,) = await self.get_many([entity_id])
+        return entity
+
+    async def update(self, entity: Entity) -> Entity:
+        read_routing.pin_to_primary()
+        return await super().update(entity)
+
+
+async def test_get__after_write_reads_the_write():
+    entity = entities[0]
+    replicated_repo = ReplicatedEntityRepo(replica=[entity])
+    await replicated_repo.create(entity)
+    coalescing_repo = CoalescingEntityRepo(replicated_repo)
+
+    async def write_then_get() -> Entity:
+        await coalescing_repo.update(entity.copy(update={"is_active": False}))
+        return await coalescing_repo.get(entity.entity_id)
+
+    # another request schedules a batch reading the entity, then this one writes it
+    # and gets it while that batch is still pending
+    other_read = asyncio.create_task(coalescing_repo.get(entity.entity_id))
+    got_entity = await asyncio.create_task(write_then_get())
+
+    # Assert the writing request reads its own write, from the primary,
+    # while the other request reads from the replica as scheduled
+    assert got_entity.is_active is False
+    assert (await other_read).is_active is True
@@ -0,0 +1,152 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from api.domain.entity_aggregate.entity import (
+    BarValueObject,
+    ChildEntity,
+    Entity,
+    EntityCountStrategy,
+)
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.entity_aggregate.entity_document_repo import (
+    PGEntityDocumentRepo,
+)
+from api.tests.stubs.entity_aggregate.entity import stub_entities
+
+pytestmark = pytest.mark.asyncio
+
+
+def new_entity(i: int = 0) -> Entity:
+    return Entity(
+        bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+        child_entities=tuple(
+            ChildEntity(attribute_a=name, attribute_b=i, attribute_c=attribute_c)
+            for name, attribute_c in [
+                ("a", Decimal("1.50")),
+                ("b", Decimal("0.1")),
+                ("c", Decimal("42.0")),
+            ]
+        ),
+        is_active=True,
+    )
+
+
+async def test_create__success(pg_entity_document_repo):
+    entity = new_entity()
+
+    # Assert the aggregate is stored whole, numeric attributes exactly and child
+    # entities in order
+    assert await pg_entity_document_repo.create(entity) == entity
+    assert await pg_entity_document_repo.get(entity.entity_id) == entity
+    with pytest.raises(EntityAlreadyExistsError):
+        await pg_entity_document_repo.create(entity)
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_document_repo.get(uuid4())
+
+
+async def test_create_or_update__replaces_child_entities(pg_entity_document_repo):
+    entity = await pg_entity_document_repo.create_or_update(new_entity())
+    kept, changed, _ = entity.child_entities
+    updated_entity = entity.copy(
+        update={
+            "child_entities": (
+                ChildEntity(attribute_a="added", attribute_b=3, attribute_c="3"),
+                changed.copy(update={"attribute_b": 42}),
+                kept,
+            ),
+        }
+    )
+
+    assert await pg_entity_document_repo.create_or_update(updated_entity) == (
+        updated_entity
+    )
+    assert await pg_entity_document_repo.get(entity.entity_id) == updated_entity
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_document_repo.update(new_entity())
+
+
+async def test_delete__success(pg_entity_document_repo):
+    entity = await pg_entity_document_repo.create(new_entity())
+
+    assert await pg_entity_document_repo.delete(entity.entity_id) == entity
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_document_repo.delete(entity.entity_id)
+
+
+async def test_create_many__skips_existing(pg_entity_document_repo):
+    entities = [new_entity(i) for i in range(3)]
+
+    created_entities = await pg_entity_document_repo.create_many(
+        [stub_entities[0], *entities], batch_size=2
+    )
+
+    assert created_entities == entities
+    assert (
+        await pg_entity_document_repo.get_many(
+            [entity.entity_id for entity in entities]
+        )
+        == entities
+    )
+
+
+async def test_create_many__keeps_first_of_duplicates(pg_entity_document_repo):
+    entity = new_entity(0)
+    duplicate = new_entity(1).copy(update={"entity_id": entity.entity_id})
+
+    created_entities = await pg_entity_document_repo.create_many([entity, duplicate])
+
+    # Assert the entity is created once, embedding only its own child entities
+    assert created_entities == [entity]
+    assert await pg_entity_document_repo.get(entity.entity_id) == entity
+
+
+async def test_where__pages(pg_entity_document_repo):
+    entities = await pg_entity_document_repo.create_many(
+        [new_entity(i) for i in range(3)]
+    )
+
+    first_page = await pg_entity_document_repo.where(
+        size=2, count=EntityCountStrategy.EXACT
+    )
+    second_page = await pg_entity_document_repo.where(
+        size=2, cursor=first_page.next_cursor
+    )
+
+    assert first_page.total == len(stub_entities) + len(entities)
+    assert [*first_page.entities, *second_page.entities] == [
+        entity async for entity in pg_entity_document_repo.iterate()
+    ]
+    assert second_page.next_cursor is None
+
+
+async def test_where__filter(pg_entity_document_repo):
+    entities = await pg_entity_document_repo.create_many(
+        [new_entity(i) for i in range(3)]
+    )
+
+    entity_list = await pg_entity_document_repo.where(
+        spec=EntityFilter(bar_value_attribute_1=2),
+        sort=EntitySort.CREATED_AT_DESC,
+        count=EntityCountStrategy.EXACT,
+    )
+
+    assert entity_list.entities == [entities[2]]
+    assert entity_list.total == 1
+
+
+async def test_trusted_rehydration__matches_validated(
+    pg_client, pg_entity_document_repo
+):
+    await pg_entity_document_repo.create(new_entity())
+    trusted_repo = PGEntityDocumentRepo(PGClient(pg_client), trusted_rehydration=True)
+
+    assert [entity async for entity in trusted_repo.iterate()] == [
+        entity async for entity in pg_entity_document_repo.iterate()
+    ]
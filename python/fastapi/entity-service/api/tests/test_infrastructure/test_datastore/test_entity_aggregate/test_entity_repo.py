@@ -1,8 +1,23 @@
+import datetime
 from decimal import Decimal
+from uuid import uuid4
 
 import pytest
 
-from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+from api.domain.entity_aggregate.entity import (
+    BarValueObject,
+    ChildEntity,
+    Entity,
+    EntityCountStrategy,
+)
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+    InvalidPageError,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
 from api.tests.stubs.entity_aggregate.entity import stub_entities
 
 pytestmark = pytest.mark.asyncio
@@ -31,3 +46,456 @@ async def test_create__success(pg_entity_repo):
     # # Assert we have one more user in the repo
     # new_user_count = len(await aiopg_user_repo.where())
     # assert new_user_count == old_user_count + 1
+
+
+async def test_where__total(pg_client, pg_entity_repo):
+    # statistics outlive the rows deleted between tests; truncating resets them,
+    # so that the table is as never analyzed
+    await pg_client.execute("TRUNCATE TABLE entity, child_entity CASCADE")
+    await pg_entity_repo.create_many(stub_entities)
+    new_entities = await pg_entity_repo.create_many(
+        [
+            Entity(
+                bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+                child_entities=(),
+                is_active=True,
+            )
+            for i in range(3)
+        ]
+    )
+    entity_count = len(stub_entities) + len(new_entities)
+
+    # Assert the total is only counted when asked for
+    assert (await pg_entity_repo.where(size=1)).total is None
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.EXACT)
+    ).total == entity_count
+    # Assert a never analyzed table is counted exactly rather than estimated
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.ESTIMATE)
+    ).total == entity_count
+    await pg_client.execute("ANALYZE entity")
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.ESTIMATE)
+    ).total == entity_count
+
+    # Assert the cached count is reused until it expires
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.CACHED)
+    ).total == entity_count
+    await pg_entity_repo.delete(new_entities[0].entity_id)
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.CACHED)
+    ).total == entity_count
+    assert (
+        await pg_entity_repo.where(size=1, count=EntityCountStrategy.EXACT)
+    ).total == entity_count - 1
+
+
+async def test_create__existing_entity(pg_entity_repo):
+    with pytest.raises(EntityAlreadyExistsError):
+        await pg_entity_repo.create(stub_entities[0])
+
+
+async def test_where__cursor_pagination(pg_entity_repo):
+    for i in range(4):
+        await pg_entity_repo.create(
+            Entity(
+                bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+                child_entities=(
+                    ChildEntity(attribute_a=str(i), attribute_b=i, attribute_c=i),
+                ),
+                is_active=True,
+            )
+        )
+    entity_count = len(stub_entities) + 4
+
+    # Walk every page by following next_cursor
+    seen_entity_ids = []
+    entity_list = await pg_entity_repo.where(size=2)
+    while True:
+        seen_entity_ids.extend(entity.entity_id for entity in entity_list.entities)
+        if entity_list.next_cursor is None:
+            break
+        entity_list = await pg_entity_repo.where(size=2, cursor=entity_list.next_cursor)
+        assert entity_list.page is None
+
+    # Assert each entity was listed exactly once, with its child entities
+    assert len(seen_entity_ids) == entity_count
+    assert len(set(seen_entity_ids)) == entity_count
+
+    # Assert page numbers still address the same ordering
+    page_1 = await pg_entity_repo.where(page=1, size=2)
+    assert [entity.entity_id for entity in page_1.entities] == seen_entity_ids[2:4]
+
+
+async def test_where__filter_and_sort(pg_entity_repo):
+    base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    entities = await pg_entity_repo.create_many(
+        [
+            Entity(
+                bar_value=BarValueObject(attribute_0=str(i % 2), attribute_1=i),
+                child_entities=(),
+                is_active=i != 3,
+                created_at=base + datetime.timedelta(days=i),
+                updated_at=base + datetime.timedelta(days=10 - i),
+            )
+            for i in range(6)
+        ]
+    )
+    spec = EntityFilter(
+        is_active=True,
+        bar_value_attribute_0="1",
+        created_before=base.replace(year=2021),
+    )
+
+    # Walk the filtered listing by following next_cursor, newest update first
+    seen_entity_ids = []
+    entity_list = await pg_entity_repo.where(
+        size=1,
+        spec=spec,
+        sort=EntitySort.UPDATED_AT_DESC,
+        count=EntityCountStrategy.CACHED,
+    )
+    assert entity_list.total == 2
+    while True:
+        seen_entity_ids.extend(entity.entity_id for entity in entity_list.entities)
+        if entity_list.next_cursor is None:
+            break
+        entity_list = await pg_entity_repo.where(
+            size=1,
+            cursor=entity_list.next_cursor,
+            spec=spec,
+            sort=EntitySort.UPDATED_AT_DESC,
+        )
+
+    # Assert only active entities with attribute_0 "1" are listed: 1 and 5, not 3
+    assert seen_entity_ids == [entities[1].entity_id, entities[5].entity_id]
+    # Assert filters are counted, and cached, apart from each other
+    assert (
+        await pg_entity_repo.where(
+            spec=EntityFilter(is_active=False), count=EntityCountStrategy.CACHED
+        )
+    ).total == 1
+    assert (
+        await pg_entity_repo.where(
+            spec=EntityFilter(bar_value_attribute_1=4),
+            count=EntityCountStrategy.ESTIMATE,
+        )
+    ).total == 1
+
+
+async def test_get_many__success(pg_entity_repo):
+    new_entity = await pg_entity_repo.create(
+        Entity(
+            bar_value=BarValueObject(attribute_0="0", attribute_1=1),
+            child_entities=(
+                ChildEntity(
+                    attribute_a="42", attribute_b=42, attribute_c=Decimal("42.0")
+                ),
+            ),
+            is_active=True,
+        )
+    )
+    entity_ids = [new_entity.entity_id, uuid4(), stub_entities[0].entity_id]
+
+    entities = await pg_entity_repo.get_many(entity_ids)
+
+    # Assert entities come back in the requested order, skipping unknown ids
+    assert [entity.entity_id for entity in entities] == [
+        new_entity.entity_id,
+        stub_entities[0].entity_id,
+    ]
+    assert entities[0].child_entities == new_entity.child_entities
+    assert len(entities[1].child_entities) == len(stub_entities[0].child_entities)
+
+
+async def test_get__not_found(pg_entity_repo):
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.get(uuid4())
+
+
+async def test_get_updated_at__success(pg_entity_repo):
+    stub_entity = stub_entities[0]
+
+    assert (
+        await pg_entity_repo.get_updated_at(stub_entity.entity_id)
+        == stub_entity.updated_at
+    )
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.get_updated_at(uuid4())
+
+
+async def test_create_or_update__replaces_child_entities(pg_entity_repo):
+    kept, changed, removed = (
+        ChildEntity(attribute_a=name, attribute_b=i, attribute_c=Decimal("1.5"))
+        for i, name in enumerate(["kept", "changed", "removed"])
+    )
+    entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(kept, changed, removed),
+        is_active=True,
+    )
+    assert await pg_entity_repo.create_or_update(entity) == entity
+
+    added = ChildEntity(attribute_a="added", attribute_b=3, attribute_c=Decimal("3"))
+    updated_entity = entity.copy(
+        update={
+            "bar_value": BarValueObject(attribute_0="1", attribute_1=1),
+            "child_entities": (
+                kept,
+                changed.copy(update={"attribute_b": 42}),
+                added,
+            ),
+        }
+    )
+    written_entity = await pg_entity_repo.create_or_update(updated_entity)
+
+    for stored_entity in (written_entity, await pg_entity_repo.get(entity.entity_id)):
+        assert stored_entity.bar_value == updated_entity.bar_value
+        assert set(stored_entity.child_entities) == set(updated_entity.child_entities)
+
+
+async def test_update__not_found(pg_client, pg_entity_repo):
+    entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(
+            ChildEntity(attribute_a="a", attribute_b=1, attribute_c=Decimal("1")),
+        ),
+        is_active=True,
+    )
+
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.update(entity)
+    # nothing of the aggregate was written
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.get(entity.entity_id)
+    assert not await pg_client.fetch_val(
+        "SELECT count(*) FROM child_entity WHERE child_entity_id = :child_entity_id",
+        {"child_entity_id": entity.child_entities[0].child_entity_id},
+    )
+
+
+async def test_delete__success(pg_client, pg_entity_repo):
+    entity = await pg_entity_repo.create(
+        Entity(
+            bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+            child_entities=(
+                ChildEntity(attribute_a="a", attribute_b=1, attribute_c=Decimal("1")),
+            ),
+            is_active=True,
+        )
+    )
+
+    assert await pg_entity_repo.delete(entity.entity_id) == entity
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.get(entity.entity_id)
+    # the child entities went with it
+    assert not await pg_client.fetch_val(
+        "SELECT count(*) FROM child_entity WHERE child_entity_id = :child_entity_id",
+        {"child_entity_id": entity.child_entities[0].child_entity_id},
+    )
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.delete(entity.entity_id)
+
+
+async def test_write_changes__success(pg_entity_repo):
+    new_entities = [
+        Entity(
+            bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+            child_entities=(
+                ChildEntity(attribute_a=str(i), attribute_b=i, attribute_c=i),
+            ),
+            is_active=True,
+        )
+        for i in range(3)
+    ]
+    dirty_entity, deleted_entity = await pg_entity_repo.create_many(new_entities[:2])
+    dirty_entity = dirty_entity.copy(
+        update={"is_active": False, "child_entities": new_entities[2].child_entities}
+    )
+    new_entities = [new_entities[2].copy(update={"child_entities": ()})]
+
+    await pg_entity_repo.write_changes(
+        new=new_entities, dirty=[dirty_entity], deleted=[deleted_entity.entity_id]
+    )
+
+    assert await pg_entity_repo.get_many(
+        [new_entities[0].entity_id, dirty_entity.entity_id, deleted_entity.entity_id]
+    ) == [*new_entities, dirty_entity]
+
+
+async def test_write_changes__atomic(pg_entity_repo):
+    new_entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(),
+        is_active=True,
+    )
+    deleted_entity_id = stub_entities[0].entity_id
+
+    # the missing dirty entity fails the whole write
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.write_changes(
+            new=[new_entity],
+            dirty=[new_entity.copy(update={"entity_id": uuid4()})],
+            deleted=[deleted_entity_id],
+        )
+
+    with pytest.raises(EntityNotFoundError):
+        await pg_entity_repo.get(new_entity.entity_id)
+    assert await pg_entity_repo.get(deleted_entity_id) == stub_entities[0]
+
+
+async def test_create_many__skips_existing(pg_entity_repo):
+    new_entities = [
+        Entity(
+            bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+            child_entities=tuple(
+                ChildEntity(attribute_a=str(j), attribute_b=j, attribute_c=j)
+                for j in range(i)
+            ),
+            is_active=True,
+        )
+        for i in range(4)
+    ]
+
+    # Create in batches smaller than the input, including an existing entity
+    created_entities = await pg_entity_repo.create_many(
+        [*new_entities, stub_entities[0]], batch_size=3
+    )
+
+    # Assert every new entity was created with its child entities,
+    # and the existing one was skipped
+    assert [entity.entity_id for entity in created_entities] == [
+        entity.entity_id for entity in new_entities
+    ]
+    assert [entity.child_entities for entity in created_entities] == [
+        entity.child_entities for entity in new_entities
+    ]
+    assert len((await pg_entity_repo.where(size=10)).entities) == len(stub_entities) + 4
+
+
+async def test_create_many__keeps_first_of_duplicates(pg_entity_repo):
+    entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(ChildEntity(attribute_a="a", attribute_b=0, attribute_c=0),),
+        is_active=True,
+    )
+    duplicate = entity.copy(
+        update={
+            "child_entities": (
+                ChildEntity(attribute_a="b", attribute_b=1, attribute_c=1),
+            )
+        }
+    )
+
+    created_entities = await pg_entity_repo.create_many([entity, duplicate])
+
+    # Assert the entity is created once, holding only its own child entities
+    assert created_entities == [entity]
+    assert await pg_entity_repo.get(entity.entity_id) == entity
+
+
+async def test_create_many__skips_existing_child_entities(pg_entity_repo):
+    existing_child_entity = stub_entities[0].child_entities[0]
+    new_child_entity = ChildEntity(attribute_a="a", attribute_b=0, attribute_c=0)
+    entity = Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(
+            existing_child_entity.copy(update={"attribute_a": "taken"}),
+            new_child_entity,
+        ),
+        is_active=True,
+    )
+
+    (created_entity,) = await pg_entity_repo.create_many([entity])
+
+    # Assert the entity is created without the child entity another entity holds,
+    # which is left untouched
+    assert created_entity.child_entities == (new_child_entity,)
+    assert await pg_entity_repo.get(entity.entity_id) == created_entity
+    assert await pg_entity_repo.get(stub_entities[0].entity_id) == stub_entities[0]
+
+
+@pytest.mark.parametrize("write", ["create_or_update", "update"])
+async def test_write__skips_child_entities_of_other_entities(
+    pg_client, pg_entity_repo, write
+):
+    existing_child_entity = stub_entities[0].child_entities[0]
+    kept_child_entity = ChildEntity(attribute_a="a", attribute_b=0, attribute_c=0)
+    entity = await pg_entity_repo.create(
+        Entity(
+            bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+            child_entities=(kept_child_entity,),
+            is_active=True,
+        )
+    )
+
+    written_entity = await getattr(pg_entity_repo, write)(
+        entity.copy(
+            update={
+                "child_entities": (
+                    existing_child_entity.copy(update={"attribute_a": "taken"}),
+                    kept_child_entity,
+                )
+            }
+        )
+    )
+
+    # Assert the child entity another entity holds is neither changed nor linked to
+    # the entity written
+    assert written_entity.child_entities == (kept_child_entity,)
+    assert await pg_entity_repo.get(entity.entity_id) == written_entity
+    assert await pg_entity_repo.get(stub_entities[0].entity_id) == stub_entities[0]
+    assert (
+        await pg_client.fetch_val(
+            "SELECT count(*) FROM entity_child_entity "
+            "WHERE child_entity_id = :child_entity_id",
+            {"child_entity_id": existing_child_entity.child_entity_id},
+        )
+        == 1
+    )
+
+
+async def test_where__out_of_range_page(pg_entity_repo):
+    for page, size in ((-1, None), (None, 0), (None, pg_entity_repo.MAX_PAGE_SIZE + 1)):
+        with pytest.raises(InvalidPageError):
+            await pg_entity_repo.where(page=page, size=size)
+
+
+async def test_iterate__yields_all_entities(pg_entity_repo):
+    new_entities = await pg_entity_repo.create_many(
+        [
+            Entity(
+                bar_value=BarValueObject(attribute_0=str(i), attribute_1=i),
+                child_entities=(
+                    ChildEntity(attribute_a=str(i), attribute_b=i, attribute_c="1.25"),
+                ),
+                is_active=True,
+            )
+            for i in range(3)
+        ]
+    )
+
+    entities = [entity async for entity in pg_entity_repo.iterate()]
+
+    # Assert every entity is yielded, in creation order, with its child entities
+    assert [entity.entity_id for entity in entities] == [
+        *[entity.entity_id for entity in stub_entities],
+        *[entity.entity_id for entity in new_entities],
+    ]
+    assert set(entities[0].child_entities) == set(stub_entities[0].child_entities)
+    assert [entity.child_entities for entity in entities[1:]] == [
+        entity.child_entities for entity in new_entities
+    ]
+
+
+async def test_trusted_rehydration__matches_validated(pg_client, pg_entity_repo):
+    trusted_repo = PGEntityRepo(PGClient(pg_client), trusted_rehydration=True)
+    entity_id = stub_entities[0].entity_id
+
+    # Assert entities built without validation equal those built with it
+    assert await trusted_repo.get(entity_id) == await pg_entity_repo.get(entity_id)
+    assert [entity async for entity in trusted_repo.iterate()] == [
+        entity async for entity in pg_entity_repo.iterate()
+    ]
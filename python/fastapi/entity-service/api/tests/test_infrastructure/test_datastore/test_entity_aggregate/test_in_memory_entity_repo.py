@@ -0,0 +1,224 @@
+import asyncio
+import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from api.domain.entity_aggregate.entity import (
+    BarValueObject,
+    ChildEntity,
+    Entity,
+    EntityCountStrategy,
+)
+from api.domain.entity_aggregate.entity_errors import (
+    EntityAlreadyExistsError,
+    EntityNotFoundError,
+    InvalidPageError,
+)
+from api.domain.entity_aggregate.entity_filter import EntityFilter, EntitySort
+from api.tests.stubs.entity_aggregate.entity import stub_entities
+
+pytestmark = pytest.mark.asyncio
+
+
+def new_entity(created_at: datetime.datetime, is_active: bool = True) -> Entity:
+    return Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=1),
+        child_entities=(
+            ChildEntity(attribute_a="42", attribute_b=42, attribute_c=Decimal("42.0")),
+        ),
+        is_active=is_active,
+        created_at=created_at,
+    )
+
+
+async def test_create__success(in_memory_entity_repo):
+    entity = new_entity(datetime.datetime.now(datetime.timezone.utc))
+
+    created_entity = await in_memory_entity_repo.create(entity)
+
+    # Assert the stored entity is rehydrated unchanged
+    assert created_entity == entity
+    assert await in_memory_entity_repo.get(entity.entity_id) == entity
+    assert len(in_memory_entity_repo) == len(stub_entities) + 1
+
+
+async def test_get_updated_at__success(in_memory_entity_repo):
+    stub_entity = stub_entities[0]
+
+    assert (
+        await in_memory_entity_repo.get_updated_at(stub_entity.entity_id)
+        == stub_entity.updated_at
+    )
+    with pytest.raises(EntityNotFoundError):
+        await in_memory_entity_repo.get_updated_at(uuid4())
+
+
+async def test_create__already_exists(in_memory_entity_repo):
+    with pytest.raises(EntityAlreadyExistsError):
+        await in_memory_entity_repo.create(stub_entities[0])
+
+
+async def test_where__cursor_pagination(in_memory_entity_repo):
+    # Create entities out of created_at order
+    base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    entities = [new_entity(base + datetime.timedelta(days=i)) for i in range(5)]
+    for entity in reversed(entities):
+        await in_memory_entity_repo.create(entity)
+
+    # Walk every page by following next_cursor
+    seen_entity_ids = []
+    entity_list = await in_memory_entity_repo.where(size=2)
+    while True:
+        seen_entity_ids.extend(entity.entity_id for entity in entity_list.entities)
+        if entity_list.next_cursor is None:
+            break
+        entity_list = await in_memory_entity_repo.where(
+            size=2, cursor=entity_list.next_cursor
+        )
+
+    # Assert entities are listed in created_at order, followed by the stub entities
+    assert seen_entity_ids == [
+        *[entity.entity_id for entity in entities],
+        *[entity.entity_id for entity in stub_entities],
+    ]
+    page_1 = await in_memory_entity_repo.where(page=1, size=2)
+    assert [entity.entity_id for entity in page_1.entities] == seen_entity_ids[2:4]
+
+
+async def test_where__out_of_range_page(in_memory_entity_repo):
+    for page, size in (
+        (-1, None),
+        (None, 0),
+        (None, in_memory_entity_repo.MAX_PAGE_SIZE + 1),
+    ):
+        with pytest.raises(InvalidPageError):
+            await in_memory_entity_repo.where(page=page, size=size)
+
+
+async def test_where__filter_and_sort(in_memory_entity_repo):
+    base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    entities = [
+        new_entity(base + datetime.timedelta(days=i), is_active=i != 3)
+        for i in range(6)
+    ]
+    for i, entity in enumerate(entities):
+        entity.updated_at = base + datetime.timedelta(days=10 - i)
+        await in_memory_entity_repo.create(entity)
+    spec = EntityFilter(
+        is_active=True,
+        created_since=base + datetime.timedelta(days=2),
+        created_before=base.replace(year=2021),
+    )
+
+    # Walk the filtered listing by following next_cursor, newest update first
+    seen_entity_ids = []
+    entity_list = await in_memory_entity_repo.where(
+        size=2,
+        spec=spec,
+        sort=EntitySort.UPDATED_AT_DESC,
+        count=EntityCountStrategy.EXACT,
+    )
+    assert entity_list.total == 3
+    while True:
+        seen_entity_ids.extend(entity.entity_id for entity in entity_list.entities)
+        if entity_list.next_cursor is None:
+            break
+        entity_list = await in_memory_entity_repo.where(
+            size=2,
+            cursor=entity_list.next_cursor,
+            spec=spec,
+            sort=EntitySort.UPDATED_AT_DESC,
+        )
+
+    # Assert the active entities created from day 2 are listed, not the inactive day 3
+    assert seen_entity_ids == [entities[i].entity_id for i in (2, 4, 5)]
+
+
+async def test_where__sort_by_updated_at_after_updates(in_memory_entity_repo):
+    base = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    entities = [new_entity(base + datetime.timedelta(days=i)) for i in range(4)]
+    for i, entity in enumerate(entities):
+        entity.updated_at = base + datetime.timedelta(days=i)
+        await in_memory_entity_repo.create(entity)
+
+    # Update the oldest entity last, moving it to the end of the updated_at index
+    updated_entity = entities[0].copy()
+    updated_entity.updated_at = base + datetime.timedelta(days=10)
+    await in_memory_entity_repo.update(updated_entity)
+
+    listed = await in_memory_entity_repo.where(
+        spec=EntityFilter(updated_before=base.replace(year=2021)),
+        sort=EntitySort.UPDATED_AT,
+        count=EntityCountStrategy.EXACT,
+    )
+    assert [entity.entity_id for entity in listed.entities] == [
+        *(entity.entity_id for entity in entities[1:]),
+        updated_entity.entity_id,
+    ]
+    assert listed.total == 4
+    # Assert counts, the stub entity included, whether or not the index range
+    # covers the filter
+    for spec, expected_total in (
+        (EntityFilter(updated_since=base + datetime.timedelta(days=2)), 4),
+        (EntityFilter(is_active=True, created_since=base), 5),
+        (
+            EntityFilter(
+                created_since=base, updated_before=base + datetime.timedelta(days=3)
+            ),
+            2,
+        ),
+    ):
+        listed = await in_memory_entity_repo.where(
+            spec=spec, count=EntityCountStrategy.EXACT
+        )
+        assert listed.total == expected_total
+
+
+async def test_create_many__in_batches(in_memory_entity_repo):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    entities = [new_entity(now + datetime.timedelta(seconds=i)) for i in range(5)]
+
+    creating = asyncio.create_task(
+        in_memory_entity_repo.create_many([*entities, stub_entities[0]], batch_size=2)
+    )
+    await asyncio.sleep(0)
+
+    # Assert other tasks get a turn once the first batch is written
+    assert len(in_memory_entity_repo) == len(stub_entities) + 2
+    assert await creating == entities
+    assert len(in_memory_entity_repo) == len(stub_entities) + 5
+
+
+async def test_update__reindexes(in_memory_entity_repo):
+    entity = stub_entities[0].copy()
+    entity.is_active = False
+    entity.created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    await in_memory_entity_repo.update(entity)
+
+    assert (await in_memory_entity_repo.get(entity.entity_id)).is_active is False
+    assert [e.entity_id async for e in in_memory_entity_repo.iterate()] == [
+        entity.entity_id
+    ]
+    # Assert the entity moved to the index of inactive entities
+    for is_active, expected_entities in ((True, []), (False, [entity.entity_id])):
+        listed = await in_memory_entity_repo.where(
+            spec=EntityFilter(is_active=is_active)
+        )
+        assert [e.entity_id for e in listed.entities] == expected_entities
+    with pytest.raises(EntityNotFoundError):
+        await in_memory_entity_repo.update(new_entity(entity.created_at))
+
+
+async def test_delete__success(in_memory_entity_repo):
+    entity_id = stub_entities[0].entity_id
+
+    deleted_entity = await in_memory_entity_repo.delete(entity_id)
+
+    assert deleted_entity.entity_id == entity_id
+    assert (await in_memory_entity_repo.where()).entities == []
+    assert await in_memory_entity_repo.get_many([entity_id, uuid4()]) == []
+    with pytest.raises(EntityNotFoundError):
+        await in_memory_entity_repo.get(entity_id)
@@ -0,0 +1,83 @@
+import asyncio
+
+import databases
+import pytest
+import sqlalchemy as sa
+
+from api.infrastructure.datastore.postgres.pg_client import PGClient, PoolTimeoutError
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+
+pytestmark = pytest.mark.asyncio
+
+SELECT_ONE = PGStatement("select_one", sa.select(sa.literal_column("1")))
+
+
+async def test_pool_stats__counts_connections_in_use(pg_url):
+    pg_client = PGClient(databases.Database(pg_url, min_size=1, max_size=2))
+    assert pg_client.pool_stats() is None
+
+    await pg_client.connect()
+    try:
+        async with pg_client.connection():
+            pool_stats = pg_client.pool_stats()
+            assert pool_stats.in_use == 1
+            assert pool_stats.max_size == 2
+            assert pool_stats.waiters == 0
+        assert pg_client.pool_stats().in_use == 0
+    finally:
+        await pg_client.disconnect()
+
+
+async def test_connection__times_out_when_pool_exhausted(pg_url):
+    pg_client = PGClient(
+        databases.Database(pg_url, min_size=1, max_size=1), acquire_timeout=0.1
+    )
+    await pg_client.connect()
+    try:
+        held = asyncio.Event()
+        release = asyncio.Event()
+
+        async def hold_connection():
+            async with pg_client.connection():
+                held.set()
+                await release.wait()
+
+        holder = asyncio.create_task(hold_connection())
+        await held.wait()
+
+        waiter = asyncio.create_task(pg_client.fetch_one(SELECT_ONE))
+        await asyncio.sleep(0.01)
+        assert pg_client.pool_stats().waiters == 1
+        with pytest.raises(PoolTimeoutError) as exc_info:
+            await waiter
+        assert repr(exc_info.value) == (
+            "PoolTimeoutError('No database connection became free within 0.1s')"
+        )
+        assert pg_client.pool_stats().waiters == 0
+
+        release.set()
+        await holder
+        # the connection is usable again once released
+        assert (await pg_client.fetch_one(SELECT_ONE))[0] == 1
+    finally:
+        await pg_client.disconnect()
+
+
+async def test_fetch_all__binds_parameters_by_name(pg_url):
+    statement = PGStatement(
+        "select_series",
+        sa.select(
+            sa.func.generate_series(
+                sa.cast(sa.bindparam("low"), sa.Integer),
+                sa.cast(sa.bindparam("high"), sa.Integer),
+            )
+        ),
+    )
+    pg_client = PGClient(databases.Database(pg_url))
+    await pg_client.connect()
+    try:
+        records = await pg_client.fetch_all(statement, low=1, high=3)
+    finally:
+        await pg_client.disconnect()
+
+    assert [record[0] for record in records] == [1, 2, 3]
@@ -0,0 +1,93 @@
+import asyncio
+
+import databases
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+
+from api.infrastructure.datastore.postgres import pg_replica_set
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.datastore.postgres.pg_replica_set import PGReplicaSet
+from api.infrastructure.datastore.postgres.pg_statement import PGStatement
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def pg_clients(pg_url):
+    # the test database stands in for the primary and both of its replicas
+    pg_clients = [
+        PGClient(databases.Database(pg_url, min_size=1, max_size=2), name=name)
+        for name in ("primary", "replica-0", "replica-1")
+    ]
+    for pg_client in pg_clients:
+        await pg_client.connect()
+    yield pg_clients
+    for pg_client in pg_clients:
+        await pg_client.disconnect()
+
+
+async def test_reader__spreads_reads_across_replicas(pg_clients):
+    primary, *replicas = pg_clients
+    replica_set = PGReplicaSet(primary, replicas, max_lag=5)
+
+    # equally loaded replicas take turns
+    assert {await replica_set.reader() for _ in range(4)} == set(replicas)
+    # a busier replica is passed over
+    async with replicas[0].connection():
+        assert {await replica_set.reader() for _ in range(4)} == {replicas[1]}
+
+
+async def test_reader__primary_after_write(pg_clients):
+    primary, *replicas = pg_clients
+    replica_set = PGReplicaSet(primary, replicas)
+
+    async def write_then_read():
+        replica_set.written()
+        return await replica_set.reader()
+
+    assert await asyncio.create_task(write_then_read()) is primary
+    # other tasks still read from replicas
+    assert await replica_set.reader() in replicas
+    with replica_set.read_from_primary():
+        assert await replica_set.reader() is primary
+
+
+async def test_reader__skips_lagging_replicas(pg_clients, monkeypatch):
+    primary, *replicas = pg_clients
+    replica_set = PGReplicaSet(primary, replicas, max_lag=5)
+    monkeypatch.setattr(
+        pg_replica_set,
+        "SELECT_REPLICATION_LAG",
+        PGStatement("lagging", sa.select(sa.literal_column("60"))),
+    )
+
+    await replica_set.check_lag()
+
+    assert await replica_set.reader() is primary
+
+
+async def test_reader__skips_unresponsive_replicas_without_waiting(
+    pg_clients, monkeypatch
+):
+    primary, *replicas = pg_clients
+    replica_set = PGReplicaSet(
+        primary, replicas, max_lag=5, lag_check_interval=0.05, lag_check_timeout=0.1
+    )
+    await replica_set.connect()
+    try:
+        # replicas which reported no lag on connect take reads
+        assert await replica_set.reader() in replicas
+        monkeypatch.setattr(
+            pg_replica_set,
+            "SELECT_REPLICATION_LAG",
+            PGStatement("unresponsive", sa.select(sa.literal_column("pg_sleep(10)"))),
+        )
+        # reads are not held up by the checks hanging in the background
+        assert await asyncio.wait_for(replica_set.reader(), timeout=0.01) in replicas
+        await asyncio.sleep(0.3)
+
+        # Assert the checks timed out, and the replicas are passed over
+        assert await replica_set.reader() is primary
+    finally:
+        await replica_set.disconnect()
@@ -0,0 +1,56 @@
+import pytest
+
+from api.infrastructure.metrics.metrics_registry import (
+    _Metric,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+)
+
+
+def test_histogram__renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram(
+        "request_seconds", "Request latency", ["route"], buckets=[0.1, 1.0]
+    )
+    histogram.labels("Get Entity").observe(0.05)
+    histogram.labels("Get Entity").observe(0.1)
+    histogram.labels("Get Entity").observe(5)
+
+    rendered = metrics.render().splitlines()
+
+    assert rendered == [
+        "# HELP request_seconds Request latency",
+        "# TYPE request_seconds histogram",
+        'request_seconds_bucket{route="Get Entity",le="0.1"} 2',
+        'request_seconds_bucket{route="Get Entity",le="1"} 2',
+        'request_seconds_bucket{route="Get Entity",le="+Inf"} 3',
+        'request_seconds_sum{route="Get Entity"} 5.15',
+        'request_seconds_count{route="Get Entity"} 3',
+    ]
+
+
+def test_gauge__reads_function_when_rendered():
+    metrics = MetricsRegistry()
+    values = [1, 2]
+    metrics.gauge("size", "Size").set_function(values.pop)
+
+    assert "size 2" in metrics.render()
+    assert "size 1" in metrics.render()
+
+
+def test_registry__returns_existing_metric_by_name():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("requests_total", "Requests")
+
+    assert metrics.counter("requests_total", "Requests") is counter
+    with pytest.raises(ValueError):
+        metrics.gauge("requests_total", "Requests")
+
+
+def test_metric__is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("metric", "Metric")  # pylint: disable=abstract-class-instantiated
+    for metric_class in (Counter, Gauge, Histogram):
+        assert metric_class("metric", "Metric").render()[0] == "# HELP metric Metric"
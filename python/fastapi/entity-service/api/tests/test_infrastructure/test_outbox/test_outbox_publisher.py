@@ -0,0 +1,134 @@
+import asyncio
+from typing import Sequence
+
+import databases
+import pytest
+import pytest_asyncio
+
+from api.domain.entity_aggregate.entity import BarValueObject, ChildEntity, Entity
+from api.domain.entity_aggregate.entity_event import EntityEvent, EntityEventType
+from api.infrastructure.datastore.postgres.pg_client import PGClient
+from api.infrastructure.entity_aggregate.entity_repo import PGEntityRepo
+from api.infrastructure.outbox.event_sink import IEventSink
+from api.infrastructure.outbox.in_memory_event_sink import InMemoryEventSink
+from api.infrastructure.outbox.outbox_publisher import OutboxPublisher
+
+pytestmark = pytest.mark.asyncio
+
+
+class FailingEventSink(IEventSink):
+    def __init__(self, failures: int, sink: IEventSink):
+        self.failures = failures
+        self._sink = sink
+
+    async def publish(self, events: Sequence[EntityEvent]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink unavailable")
+        await self._sink.publish(events)
+
+
+class BlockingEventSink(IEventSink):
+    def __init__(self):
+        self.publishing = asyncio.Event()
+
+    async def publish(self, events: Sequence[EntityEvent]) -> None:
+        self.publishing.set()
+        await asyncio.Event().wait()
+
+
+@pytest_asyncio.fixture
+async def emitting_entity_repo(pg_client, pg_db) -> PGEntityRepo:
+    return PGEntityRepo(PGClient(pg_client), emit_events=True)
+
+
+def new_entity() -> Entity:
+    return Entity(
+        bar_value=BarValueObject(attribute_0="0", attribute_1=0),
+        child_entities=(
+            ChildEntity(attribute_a="a", attribute_b=1, attribute_c="1.5"),
+        ),
+        is_active=True,
+    )
+
+
+async def test_publish_batch__publishes_events_of_writes(
+    pg_client, emitting_entity_repo
+):
+    sink = InMemoryEventSink()
+    publisher = OutboxPublisher(PGClient(pg_client), sink, batch_size=2)
+    created_entity = await emitting_entity_repo.create(new_entity())
+    updated_entity = await emitting_entity_repo.create_or_update(
+        created_entity.copy(update={"is_active": False})
+    )
+    await emitting_entity_repo.delete(created_entity.entity_id)
+
+    # Assert events are published in the order recorded, a batch at a time
+    assert await publisher.publish_batch() == 2
+    assert await publisher.publish_batch() == 1
+    assert await publisher.publish_batch() == 0
+    events = sink.drain()
+    assert [event.event_type for event in events] == [
+        EntityEventType.CREATED,
+        EntityEventType.UPDATED,
+        EntityEventType.DELETED,
+    ]
+    # Assert each payload is the aggregate as left by the write
+    assert [Entity.parse_obj(event.payload) for event in events] == [
+        created_entity,
+        updated_entity,
+        updated_entity,
+    ]
+
+
+async def test_publish_batch__keeps_events_the_sink_failed(
+    pg_client, emitting_entity_repo
+):
+    sink = InMemoryEventSink()
+    publisher = OutboxPublisher(
+        PGClient(pg_client), FailingEventSink(failures=1, sink=sink)
+    )
+    entity = await emitting_entity_repo.create(new_entity())
+
+    with pytest.raises(ConnectionError):
+        await publisher.publish_batch()
+    assert await publisher.publish_batch() == 1
+    assert [event.entity_id for event in sink.drain()] == [entity.entity_id]
+
+
+async def test_start__retries_in_background(pg_client, emitting_entity_repo):
+    sink = InMemoryEventSink()
+    publisher = OutboxPublisher(
+        PGClient(pg_client),
+        FailingEventSink(failures=2, sink=sink),
+        poll_interval=0.01,
+        max_retry_delay=0.02,
+    )
+    entity = await emitting_entity_repo.create(new_entity())
+
+    await publisher.start()
+    try:
+        event = await asyncio.wait_for(sink.get(), timeout=5)
+    finally:
+        await publisher.stop()
+
+    assert event.entity_id == entity.entity_id
+
+
+async def test_stop__mid_batch(pg_url, pg_client, emitting_entity_repo):
+    database = databases.Database(pg_url)
+    await database.connect()
+    sink = BlockingEventSink()
+    publisher = OutboxPublisher(PGClient(database), sink, publish_timeout=0.1)
+    entity = await emitting_entity_repo.create(new_entity())
+
+    await publisher.start()
+    await asyncio.wait_for(sink.publishing.wait(), timeout=5)
+    await asyncio.wait_for(publisher.stop(), timeout=5)
+    # Assert the batch released its connection, rolled back and was left in the outbox
+    await asyncio.wait_for(database.disconnect(), timeout=5)
+    in_memory_sink = InMemoryEventSink()
+    assert (
+        await OutboxPublisher(PGClient(pg_client), in_memory_sink).publish_batch() == 1
+    )
+    assert [event.entity_id for event in in_memory_sink.drain()] == [entity.entity_id]
@@ -0,0 +1,91 @@
+import asyncio
+import subprocess
+import sys
+
+from api import main
+from api.main import create_app
+from api.tests.benchmarks.harness import ASGIClient
+
+
+def test_create_app__in_memory():
+    app = create_app({"entityRepo": {"type": "inMemory"}})
+
+    assert {"/health", "/metrics", "/api/v0/entities"} <= {
+        route.path for route in app.routes
+    }
+
+
+def test_create_app__imports_postgres_only_when_used():
+    # a fresh interpreter, as the test suite itself has long since imported the driver
+    loaded_modules = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from api.main import create_app\n"
+            "create_app({'entityRepo': {'type': 'inMemory'}})\n"
+            "print(' '.join(sys.modules))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+
+    assert not {"asyncpg", "databases", "sqlalchemy", "uvicorn"} & set(loaded_modules)
+
+
+def test_create_app__postgres_primary_address(monkeypatch):
+    addresses = []
+    create_pg_client = main._create_pg_client
+
+    def recording_create_pg_client(pg_host, pg_port, *args, **kwargs):
+        addresses.append((pg_host, pg_port))
+        return create_pg_client(pg_host, pg_port, *args, **kwargs)
+
+    monkeypatch.setattr(main, "_create_pg_client", recording_create_pg_client)
+    monkeypatch.delenv("POSTGRES_HOST", raising=False)
+    monkeypatch.delenv("POSTGRES_PORT", raising=False)
+    config = {
+        "postgres": {
+            "host": "primary.db.internal",
+            "port": 5433,
+            "replicas": {"hosts": [{"host": "replica-0.db.internal"}]},
+        }
+    }
+
+    create_app(config)
+    monkeypatch.setenv("POSTGRES_HOST", "localhost")
+    create_app(config)
+
+    # Assert the primary is configured like its replicas, and the env vars override it
+    assert addresses == [
+        ("primary.db.internal", 5433),
+        ("replica-0.db.internal", 5432),
+        ("localhost", 5433),
+        ("replica-0.db.internal", 5432),
+    ]
+
+
+def test_create_app__cache_metrics():
+    app = create_app(
+        {
+            "entityRepo": {
+                "type": "inMemory",
+                "cache": {"enabled": True, "maxSize": 10, "ttlSeconds": 30},
+            }
+        }
+    )
+
+    status, body = asyncio.run(ASGIClient(app).request("GET", "/metrics"))
+
+    assert status == 200
+    assert {
+        f"entity_repo_cache_{name} 0"
+        for name in (
+            "hits_total",
+            "misses_total",
+            "evictions_total",
+            "expirations_total",
+            "size",
+        )
+    } <= set(body.decode().splitlines())